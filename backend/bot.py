@@ -1,32 +1,240 @@
 import os
 import asyncio
+import hmac
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import django
 from telegram import Update, WebAppInfo, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes
+from telegram.error import BadRequest, Forbidden, RetryAfter
+from telegram.ext import Application, BaseUpdateProcessor, CommandHandler, CallbackQueryHandler, ContextTypes
 
 # Setup Django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
-from users.models import User
+from django.conf import settings
+from django.db import close_old_connections
+from users import outbox
+from users.snapshots import get_snapshot
+
+logger = logging.getLogger(__name__)
 
 # Get settings
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '')
 WEBAPP_URL = os.getenv('WEBAPP_URL', 'http://localhost:5173')
 
-async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Send welcome message with web app button"""
-    user = update.effective_user
-    
-    keyboard = [
-        [InlineKeyboardButton("🎮 Play Games", web_app=WebAppInfo(url=WEBAPP_URL))],
-        [InlineKeyboardButton("💰 Balance", callback_data="balance")],
-        [InlineKeyboardButton("📊 Stats", callback_data="stats")],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    welcome_text = f"""
-🎮 Welcome to Gaming Bot, {user.first_name}!
+# Updates handled at once, and threads available for their database calls
+BOT_CONCURRENT_UPDATES = int(os.getenv('BOT_CONCURRENT_UPDATES', '32'))
+BOT_DB_WORKERS = int(os.getenv('BOT_DB_WORKERS', '8'))
+# Webhook updates accepted and not yet handled; past this the webhook answers 503 and
+# Telegram delivers the update again later
+BOT_MAX_PENDING_UPDATES = int(os.getenv('BOT_MAX_PENDING_UPDATES', '1000'))
+
+# Only what the handlers use; Telegram doesn't send (or wake us for) the rest
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+# Parallel connections Telegram may open to deliver webhook updates (its maximum)
+WEBHOOK_MAX_CONNECTIONS = 100
+
+# Queued messages sent per second: Telegram allows about 30 overall, and 1 a second to one chat
+BOT_SEND_RATE = float(os.getenv('BOT_SEND_RATE', '30'))
+CHAT_SEND_INTERVAL = 1.0
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_IDLE_SECONDS = 1
+# A failed send is retried after 5s, then 10s, 20s... up to MAX_SEND_ATTEMPTS
+SEND_RETRY_DELAY = 5
+MAX_SEND_RETRY_DELAY = 600
+MAX_SEND_ATTEMPTS = 5
+
+db_executor = ThreadPoolExecutor(max_workers=BOT_DB_WORKERS, thread_name_prefix='bot-db')
+
+
+def _call_with_connection(func, *args):
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def run_db(func, *args):
+    """Run a blocking ORM call on the bounded DB pool, off the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, _call_with_connection, func, *args)
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Handles updates concurrently across chats but in order within each chat.
+
+    Up to ``workers`` handlers run at once. An update first waits for the
+    earlier updates from its chat and only then for a worker, so a busy chat
+    queues behind itself without holding workers other chats could use.
+    ``on_done`` is called after each update, handled or not.
+    """
+
+    def __init__(self, workers, max_pending, on_done=None):
+        super().__init__(max_pending)
+        self._workers = asyncio.Semaphore(workers)
+        self._on_done = on_done
+        # chat id -> [lock, updates holding or waiting for it]
+        self._chats = {}
+
+    async def do_process_update(self, update, coroutine):
+        try:
+            await self._process_in_chat_order(update, coroutine)
+        finally:
+            if self._on_done is not None:
+                self._on_done()
+
+    async def _process_in_chat_order(self, update, coroutine):
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            async with self._workers:
+                await coroutine
+            return
+        entry = self._chats.setdefault(chat.id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                async with self._workers:
+                    await coroutine
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chats[chat.id]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+
+class TokenBucket:
+    """Hands out ``rate`` tokens a second, up to ``burst`` at once; waiters are served in turn"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+    def pause(self, seconds):
+        """Hand out nothing for ``seconds``, e.g. Telegram's ``retry_after``"""
+        self._refill()
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+class OutboundSender:
+    """Sends the messages queued in ``users.outbox``, within Telegram's rate limits.
+
+    Due messages are claimed in batches. Each chat's messages go out in order,
+    at most one per ``CHAT_SEND_INTERVAL``, and every send takes a token from
+    one bucket refilled at ``rate`` a second. A 429 pauses the bucket for
+    Telegram's ``retry_after`` and the message is tried again; network errors
+    are retried later with exponential backoff, and chats that blocked the bot
+    or don't exist fail the message. Run one sender, so the limit is global.
+    """
+
+    def __init__(self, rate=BOT_SEND_RATE):
+        self.bucket = TokenBucket(rate)
+        self.throttled = 0
+        # chat id -> monotonic time its next message may be sent
+        self._chat_ready = {}
+        self._task = None
+
+    async def run(self, bot):
+        while True:
+            try:
+                messages = await run_db(outbox.claim_due, OUTBOX_BATCH_SIZE)
+                if not messages:
+                    await asyncio.sleep(OUTBOX_IDLE_SECONDS)
+                    continue
+                results = await self.send_batch(bot, messages)
+                await run_db(outbox.record_results, *results)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Claimed messages are released when their lease runs out
+                logger.exception('Sending queued messages failed')
+                await asyncio.sleep(OUTBOX_IDLE_SECONDS)
+
+    async def send_batch(self, bot, messages):
+        """Send claimed ``[(id, telegram_id, text, attempts)]``; returns ``outbox.record_results`` arguments"""
+        chats = defaultdict(list)
+        for message in messages:
+            chats[message[1]].append(message)
+        results = ([], [], [])
+        await asyncio.gather(*[self._send_chat(bot, chat_messages, *results) for chat_messages in chats.values()])
+        now = time.monotonic()
+        self._chat_ready = {chat_id: ready for chat_id, ready in self._chat_ready.items() if ready > now}
+        return results
+
+    async def _send_chat(self, bot, messages, sent, retries, failed):
+        for pk, chat_id, text, attempts in messages:
+            wait = self._chat_ready.get(chat_id, 0) - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                await self._send(bot, chat_id, text)
+            except (Forbidden, BadRequest) as error:
+                failed.append((pk, str(error)))
+            except Exception as error:
+                if attempts + 1 >= MAX_SEND_ATTEMPTS:
+                    failed.append((pk, str(error)))
+                else:
+                    retries.append((pk, min(SEND_RETRY_DELAY * 2 ** attempts, MAX_SEND_RETRY_DELAY), str(error)))
+            else:
+                sent.append(pk)
+            self._chat_ready[chat_id] = time.monotonic() + CHAT_SEND_INTERVAL
+
+    async def _send(self, bot, chat_id, text):
+        while True:
+            await self.bucket.acquire()
+            try:
+                return await bot.send_message(chat_id, text)
+            except RetryAfter as error:
+                self.throttled += 1
+                self.bucket.pause(error.retry_after)
+
+    async def start(self, application):
+        """``post_init`` hook: send in the background while the Application runs"""
+        self._task = asyncio.create_task(self.run(application.bot))
+
+    async def stop(self, application):
+        """``post_stop`` hook"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+# Replies. Keyboards are built once and shared; texts are templates filled per reply.
+START_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🎮 Play Games", web_app=WebAppInfo(url=WEBAPP_URL))],
+    [InlineKeyboardButton("💰 Balance", callback_data="balance")],
+    [InlineKeyboardButton("📊 Stats", callback_data="stats")],
+])
+PLAY_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("🎮 Play Now", web_app=WebAppInfo(url=WEBAPP_URL))]])
+
+START_TEXT = """
+🎮 Welcome to Gaming Bot, {first_name}!
 
 Play exciting games and win points!
 
@@ -43,12 +251,8 @@ Play exciting games and win points!
 
 Click "Play Games" to start!
 """
-    
-    await update.message.reply_text(welcome_text, reply_markup=reply_markup)
 
-async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Send help message"""
-    help_text = """
+HELP_TEXT = """
 🎮 Gaming Bot Help
 
 Commands:
@@ -74,21 +278,10 @@ Commands:
 
 Need help? Contact @admin
 """
-    await update.message.reply_text(help_text)
 
-async def play_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Open web app"""
-    keyboard = [[InlineKeyboardButton("🎮 Play Now", web_app=WebAppInfo(url=WEBAPP_URL))]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(
-        "Click the button below to start playing!",
-        reply_markup=reply_markup
-    )
+PLAY_TEXT = "Click the button below to start playing!"
 
-async def deposit_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show deposit instructions"""
-    deposit_text = """
+DEPOSIT_TEXT = """
 💰 Deposit Instructions
 
 To add points to your account:
@@ -102,11 +295,8 @@ Conversion Rate: 1 Birr = 1 Point
 
 Contact: @admin
 """
-    await update.message.reply_text(deposit_text)
 
-async def withdraw_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show withdrawal instructions"""
-    withdraw_text = """
+WITHDRAW_TEXT = """
 💸 Withdrawal Instructions
 
 Minimum withdrawal: 500 points
@@ -120,98 +310,261 @@ To withdraw:
 
 Processing time: 24-48 hours
 """
-    await update.message.reply_text(withdraw_text)
 
-async def balance_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Check user balance"""
-    telegram_id = update.effective_user.id
-    
-    try:
-        user = User.objects.get(telegram_id=telegram_id)
-        balance_text = f"""
+NOT_STARTED_TEXT = "You haven't started playing yet! Use /play to begin."
+
+# Filled from summary_fields()
+BALANCE_TEXT = """
 💰 Your Balance
 
-Current Balance: {user.balance:.2f} points
+Current Balance: {balance:.2f} points
 
 📊 Statistics:
-• Games Played: {user.games_played}
-• Total Wagered: {user.total_wagered:.2f}
-• Total Won: {user.total_won:.2f}
-• Total Lost: {user.total_lost:.2f}
+• Games Played: {games_played}
+• Total Wagered: {total_wagered:.2f}
+• Total Won: {total_won:.2f}
+• Total Lost: {total_lost:.2f}
 
 Use /play to start gaming!
 """
-        await update.message.reply_text(balance_text)
-    except User.DoesNotExist:
-        await update.message.reply_text(
-            "You haven't started playing yet! Use /play to begin."
-        )
 
-async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show user statistics"""
-    telegram_id = update.effective_user.id
-    
-    try:
-        user = User.objects.get(telegram_id=telegram_id)
-        
-        win_rate = 0
-        if user.games_played > 0:
-            wins = user.game_sessions.filter(result='win').count()
-            win_rate = (wins / user.games_played) * 100
-        
-        stats_text = f"""
+STATS_TEXT = """
 📊 Your Statistics
 
-🎮 Games Played: {user.games_played}
+🎮 Games Played: {games_played}
 🏆 Win Rate: {win_rate:.1f}%
 
 💰 Financial Stats:
-• Current Balance: {user.balance:.2f} pts
-• Total Wagered: {user.total_wagered:.2f} pts
-• Total Won: {user.total_won:.2f} pts
-• Total Lost: {user.total_lost:.2f} pts
-• Net Profit: {(user.total_won - user.total_lost):.2f} pts
+• Current Balance: {balance:.2f} pts
+• Total Wagered: {total_wagered:.2f} pts
+• Total Won: {total_won:.2f} pts
+• Total Lost: {total_lost:.2f} pts
+• Net Profit: {net_profit:.2f} pts
 
-📅 Member since: {user.created_at.strftime('%Y-%m-%d')}
+📅 Member since: {created_at:%Y-%m-%d}
 
 Keep playing to improve your stats!
 """
-        await update.message.reply_text(stats_text)
-    except User.DoesNotExist:
-        await update.message.reply_text(
-            "You haven't started playing yet! Use /play to begin."
-        )
+
+# Replies to the Balance and Stats buttons, by callback data
+BUTTON_TEXTS = {
+    "balance": "💰 Your current balance: {balance:.2f} points",
+    "stats": (
+        "📊 Games Played: {games_played}\n"
+        "💰 Balance: {balance:.2f} pts\n"
+        "🎯 Total Won: {total_won:.2f} pts"
+    ),
+}
+
+
+def summary_fields(user):
+    """The snapshot's fields plus the figures derived from them, for the summary templates"""
+    win_rate = 0
+    if user['games_played'] > 0:
+        win_rate = (user['games_won'] / user['games_played']) * 100
+    return {**user, 'win_rate': win_rate, 'net_profit': user['total_won'] - user['total_lost']}
+
+
+async def reply_with_summary(message, telegram_id, template):
+    """Reply with ``template`` filled from the user's cached snapshot (one read per reply)"""
+    user = await run_db(get_snapshot, telegram_id)
+    if user is None:
+        await message.reply_text(NOT_STARTED_TEXT)
+        return
+    await message.reply_text(template.format_map(summary_fields(user)))
+
+
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Send welcome message with web app button"""
+    await update.message.reply_text(
+        START_TEXT.format(first_name=update.effective_user.first_name), reply_markup=START_MARKUP
+    )
+
+async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Send help message"""
+    await update.message.reply_text(HELP_TEXT)
+
+async def play_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Open web app"""
+    await update.message.reply_text(PLAY_TEXT, reply_markup=PLAY_MARKUP)
+
+async def deposit_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show deposit instructions"""
+    await update.message.reply_text(DEPOSIT_TEXT)
+
+async def withdraw_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show withdrawal instructions"""
+    await update.message.reply_text(WITHDRAW_TEXT)
+
+async def balance_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Check user balance"""
+    await reply_with_summary(update.message, update.effective_user.id, BALANCE_TEXT)
+
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show user statistics"""
+    await reply_with_summary(update.message, update.effective_user.id, STATS_TEXT)
 
 async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle button callbacks"""
     query = update.callback_query
     await query.answer()
     
-    if query.data == "balance":
-        telegram_id = query.from_user.id
-        try:
-            user = User.objects.get(telegram_id=telegram_id)
-            await query.message.reply_text(
-                f"💰 Your current balance: {user.balance:.2f} points"
-            )
-        except User.DoesNotExist:
-            await query.message.reply_text(
-                "You haven't started playing yet! Use /play to begin."
-            )
+    template = BUTTON_TEXTS.get(query.data)
+    if template is not None:
+        await reply_with_summary(query.message, query.from_user.id, template)
+
+def build_application(token, webhook=False, sender=None, update_done=None):
+    """Application with the bot's handlers; ``webhook`` ones are fed by ``webhook_app``.
+
+    A ``sender`` (``OutboundSender``) runs alongside the Application while it does;
+    ``update_done`` is called once each update has been handled.
+    """
+    builder = (
+        Application.builder()
+        .token(token)
+        .concurrent_updates(
+            ChatOrderedUpdateProcessor(BOT_CONCURRENT_UPDATES, BOT_MAX_PENDING_UPDATES, on_done=update_done)
+        )
+    )
+    if settings.TELEGRAM_API_URL:
+        builder = (
+            builder.base_url(f'{settings.TELEGRAM_API_URL}/bot')
+            .base_file_url(f'{settings.TELEGRAM_API_URL}/file/bot')
+        )
+    if webhook:
+        builder = builder.updater(None)
+    if sender is not None:
+        builder = builder.post_init(sender.start).post_stop(sender.stop)
+    application = builder.build()
     
-    elif query.data == "stats":
-        telegram_id = query.from_user.id
+    application.add_handler(CommandHandler("start", start))
+    application.add_handler(CommandHandler("help", help_command))
+    application.add_handler(CommandHandler("play", play_command))
+    application.add_handler(CommandHandler("balance", balance_command))
+    application.add_handler(CommandHandler("stats", stats_command))
+    application.add_handler(CommandHandler("deposit", deposit_command))
+    application.add_handler(CommandHandler("withdraw", withdraw_command))
+    application.add_handler(CallbackQueryHandler(button_callback))
+    return application
+
+
+class WebhookBot:
+    """The webhook-mode Application, run on an event loop thread of its own.
+
+    The server's loop only checks and hands over updates; handlers and their
+    Bot API calls run on the bot's loop, so a burst of updates doesn't queue
+    up in front of the game API's requests. At most ``BOT_MAX_PENDING_UPDATES``
+    are held at once, from being handed over until their handler finishes.
+    """
+
+    def __init__(self):
+        self.application = None
+        self.loop = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+    def start(self):
+        """Start the Application, once per process (blocks; call off the server's loop)"""
+        with self._lock:
+            if self.application is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='bot-webhook', daemon=True).start()
+                self.loop = loop
+                self.application = asyncio.run_coroutine_threadsafe(self._start(), loop).result()
+        return self.application
+
+    def stop(self):
+        with self._lock:
+            if self.application is not None:
+                asyncio.run_coroutine_threadsafe(self._stop(self.application), self.loop).result()
+                self.loop.call_soon_threadsafe(self.loop.stop)
+                self.application = self.loop = None
+
+    def put(self, data):
+        """Queue a decoded update for the handlers; False if ``BOT_MAX_PENDING_UPDATES`` are held"""
+        with self._pending_lock:
+            if self._pending >= BOT_MAX_PENDING_UPDATES:
+                return False
+            self._pending += 1
+        self.loop.call_soon_threadsafe(self._put, data)
+        return True
+
+    def _update_done(self):
+        with self._pending_lock:
+            self._pending -= 1
+
+    async def _start(self):
+        application = build_application(settings.TELEGRAM_BOT_TOKEN, webhook=True, update_done=self._update_done)
+        await application.initialize()
+        await application.start()
+        return application
+
+    async def _stop(self, application):
+        await application.stop()
+        await application.shutdown()
+
+    def _put(self, data):
         try:
-            user = User.objects.get(telegram_id=telegram_id)
-            await query.message.reply_text(
-                f"📊 Games Played: {user.games_played}\n"
-                f"💰 Balance: {user.balance:.2f} pts\n"
-                f"🎯 Total Won: {user.total_won:.2f} pts"
-            )
-        except User.DoesNotExist:
-            await query.message.reply_text(
-                "You haven't started playing yet! Use /play to begin."
-            )
+            update = Update.de_json(data, self.application.bot)
+        except Exception:
+            self._update_done()
+            raise
+        self.application.update_queue.put_nowait(update)
+
+
+webhook_bot = WebhookBot()
+
+
+async def _receive_update(scope, receive):
+    secret = settings.BOT_WEBHOOK_SECRET
+    if not settings.BOT_WEBHOOK_URL or not secret:
+        return 404
+    if scope['method'] != 'POST':
+        return 405
+    headers = dict(scope['headers'])
+    if not hmac.compare_digest(headers.get(b'x-telegram-bot-api-secret-token', b''), secret.encode()):
+        return 403
+    
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return 400
+    
+    if webhook_bot.application is None:
+        await asyncio.to_thread(webhook_bot.start)
+    # Answer once queued, so Telegram's delivery connections aren't held while handlers run;
+    # when too many are held, Telegram keeps the update and delivers it again later
+    if not webhook_bot.put(data):
+        return 503
+    return 200
+
+
+async def webhook_app(scope, receive, send):
+    """ASGI endpoint Telegram posts updates to in webhook mode (see config/asgi.py)"""
+    status = await _receive_update(scope, receive)
+    await send({'type': 'http.response.start', 'status': status, 'headers': [(b'content-length', b'0')]})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def run_webhook_sender():
+    """Point Telegram at BOT_WEBHOOK_URL, then send queued messages"""
+    application = build_application(TELEGRAM_BOT_TOKEN, webhook=True)
+    async with application.bot:
+        await application.bot.set_webhook(
+            settings.BOT_WEBHOOK_URL,
+            allowed_updates=ALLOWED_UPDATES,
+            secret_token=settings.BOT_WEBHOOK_SECRET,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+        )
+        print(f"Webhook set to {settings.BOT_WEBHOOK_URL}; sending queued messages")
+        await OutboundSender().run(application.bot)
 
 def main():
     """Start the bot"""
@@ -219,22 +572,21 @@ def main():
         print("Error: TELEGRAM_BOT_TOKEN not set!")
         return
     
-    # Create application
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    if settings.BOT_WEBHOOK_URL:
+        if not settings.BOT_WEBHOOK_SECRET:
+            print("Error: BOT_WEBHOOK_SECRET not set!")
+            return
+        # The web server (config/asgi.py) receives and handles the updates; this process only sends
+        asyncio.run(run_webhook_sender())
+        return
     
-    # Add handlers
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(CommandHandler("help", help_command))
-    application.add_handler(CommandHandler("play", play_command))
-    application.add_handler(CommandHandler("balance", balance_command))
-    application.add_handler(CommandHandler("stats", stats_command))
-    application.add_handler(CommandHandler("deposit", deposit_command))
-    application.add_handler(CommandHandler("withdraw", withdraw_command))
-    application.add_handler(CallbackQueryHandler(button_callback))
+    # Updates from different chats are handled concurrently, each chat's in order;
+    # queued notifications and broadcasts go out alongside
+    application = build_application(TELEGRAM_BOT_TOKEN, sender=OutboundSender())
     
     # Start bot
     print("Bot started!")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    application.run_polling(allowed_updates=ALLOWED_UPDATES)
 
 if __name__ == '__main__':
     main()
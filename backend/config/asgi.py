@@ -2,4 +2,20 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
-application = get_asgi_application()
+# Set up Django before the routing imports models
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter
+from django.urls import path, re_path
+from bot import webhook_app
+from users.routing import websocket_urlpatterns
+
+# HTTP goes to Django, except Telegram's webhook (handled by the bot in this process);
+# WebSockets (/ws/...) go to the event consumers
+application = ProtocolTypeRouter({
+    'http': URLRouter([
+        path('telegram/webhook/', webhook_app),
+        re_path(r'', django_asgi_app),
+    ]),
+    'websocket': URLRouter(websocket_urlpatterns),
+})
@@ -0,0 +1,25 @@
+"""In-process channel layer for a single server process, development and tests."""
+import time
+from channels.layers import InMemoryChannelLayer
+
+
+class LocalChannelLayer(InMemoryChannelLayer):
+    """``InMemoryChannelLayer`` that sweeps expired messages and group
+    memberships at most once every ``sweep_interval`` seconds.
+
+    The stock layer sweeps every channel and group on each receive and
+    group send, so delivering one event to each of N connected clients
+    costs O(N²); here it is O(N) plus one sweep per interval.
+    """
+
+    def __init__(self, sweep_interval=1.0, **kwargs):
+        super().__init__(**kwargs)
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+
+    def _clean_expired(self):
+        now = time.monotonic()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.sweep_interval
+        super()._clean_expired()
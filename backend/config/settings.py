@@ -1,4 +1,6 @@
+from decimal import Decimal
 from pathlib import Path
+from corsheaders.defaults import default_headers
 import os
 import dj_database_url
 
@@ -9,6 +11,7 @@ DEBUG = os.getenv('DEBUG', 'True') == 'True'
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '*').split(',')
 
 INSTALLED_APPS = [
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -17,6 +20,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'corsheaders',
+    'channels',
     'users',
     'games',
 ]
@@ -31,6 +35,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'users.players.PlayerMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -52,6 +57,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 # Database - Use PostgreSQL in production, SQLite in development
 if os.getenv('DATABASE_URL'):
@@ -87,9 +93,40 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache - Redis when REDIS_URL is set (any Redis-compatible server), otherwise per-process memory
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Channel layer for WebSocket events - Redis when REDIS_URL is set, otherwise in-process
+# (one server process only; fine for development and tests)
+if os.getenv('REDIS_URL'):
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [os.getenv('REDIS_URL')]},
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {'BACKEND': 'config.layers.LocalChannelLayer'}
+    }
+
 # CORS Settings
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 # REST Framework
 REST_FRAMEWORK = {
@@ -105,9 +142,19 @@ REST_FRAMEWORK = {
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '')
 TELEGRAM_BOT_USERNAME = os.getenv('TELEGRAM_BOT_USERNAME', '')
 WEBAPP_URL = os.getenv('WEBAPP_URL', 'https://your-app.com')
+# Webhook mode: Telegram posts updates to BOT_WEBHOOK_URL (this server's /telegram/webhook/),
+# signed with BOT_WEBHOOK_SECRET. Unset, the bot polls instead.
+BOT_WEBHOOK_URL = os.getenv('BOT_WEBHOOK_URL', '')
+BOT_WEBHOOK_SECRET = os.getenv('BOT_WEBHOOK_SECRET', '')
+# Bot API server, to point the bot at a local stand-in (see fake_telegram.py)
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', '')
 
 # Game Settings
 MINIMUM_WITHDRAWAL = 500
+# Net points the house may pay out to players over any minute before bets are refused (0 = no limit)
+MAX_NET_PAYOUT_PER_MINUTE = Decimal(os.getenv('MAX_NET_PAYOUT_PER_MINUTE', '100000'))
+# Withdrawals a user may have waiting for an admin at once
+MAX_PENDING_WITHDRAWALS = int(os.getenv('MAX_PENDING_WITHDRAWALS', '3'))
 
 # Currency Settings
 CURRENCY_NAME = 'Birr'
@@ -115,9 +162,16 @@ CURRENCY_SYMBOL = 'Br'
 CURRENCY_TO_POINTS_RATE = 1  # 1 Birr = 1 Point
 POINTS_TO_CURRENCY_RATE = 1  # 1 Point = 1 Birr
 
-# Admin Telegram IDs (add your Telegram ID here)
-ADMIN_TELEGRAM_IDS = [
+# Player endpoints only accept the session token from /api/user/auth/ (Authorization: Bearer <token>);
+# off, a request without one may act for the telegram_id it names
+REQUIRE_SESSION_TOKEN = os.getenv('REQUIRE_SESSION_TOKEN', str(not DEBUG)) == 'True'
+
+# Admin Telegram IDs (add your Telegram ID here, or set ADMIN_TELEGRAM_IDS=id1,id2)
+# A frozenset so membership checks are O(1)
+ADMIN_TELEGRAM_IDS = frozenset(
+    int(telegram_id) for telegram_id in os.getenv('ADMIN_TELEGRAM_IDS', '').split(',') if telegram_id.strip()
+) or frozenset([
     2069801576,  # Your Telegram ID
     12345,       # Test user for development
     # Add more admin IDs here
-]
+])
@@ -0,0 +1,255 @@
+"""A local stand-in for the Telegram Bot API.
+
+Answers the methods the bot uses and records every call, so the bot can be
+run and benchmarked without Telegram. Point the bot at it with
+``TELEGRAM_API_URL=http://127.0.0.1:8081``:
+
+    python fake_telegram.py --port 8081
+
+``GET /calls?since=<n>`` returns the calls received after the first n, as
+``[method, params]`` pairs, for checking a bot running in another process.
+"""
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import socket
+import threading
+import time
+from http import HTTPStatus
+from urllib.parse import parse_qs, parse_qsl, urlsplit
+
+BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'Gaming Bot', 'username': 'fake_gaming_bot'}
+
+
+class FakeTelegram:
+    """Serves the Bot API on ``host:port`` (0 picks a free port), with ``latency`` seconds per call.
+
+    Like Telegram, it answers 429 to more than ``rate_limit`` messages in a
+    second, or to a second message to one chat within ``chat_interval``
+    seconds (0 disables either), and 403 to messages for ``blocked_chats``.
+    ``start()`` serves from a background thread; ``serve_forever()`` from this one.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0, rate_limit=0, chat_interval=0):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.chat_interval = chat_interval
+        self.blocked_chats = set()
+        self.throttled = 0
+        self._recent_sends = collections.deque()
+        self._chat_sends = {}
+        self.calls = []
+        self.updates = []
+        self.webhook = {}
+        self._lock = threading.Lock()
+        self._message_ids = itertools.count(1)
+        # Bound now, so the URL is known before serving; a deep backlog for the bot's connection burst
+        self._socket = socket.create_server((host, port), backlog=1024)
+        self._server = None
+        self._loop = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._socket.getsockname()[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self._listen())
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self._listen())
+        self._loop.run_forever()
+
+    def stop(self):
+        if self._thread is not None:
+            asyncio.run_coroutine_threadsafe(self._close(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+        self._socket.close()
+
+    async def _listen(self):
+        self._server = await asyncio.start_server(self._serve_connection, sock=self._socket)
+
+    async def _close(self):
+        self._server.close()
+        connections = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in connections:
+            task.cancel()
+        await asyncio.gather(*connections, return_exceptions=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def sent(self, method='sendMessage'):
+        """Parameters of every ``method`` call so far, in arrival order"""
+        with self._lock:
+            return [params for name, params in self.calls if name == method]
+
+    def push_update(self, update):
+        """Queue an update for ``getUpdates`` (polling mode)"""
+        with self._lock:
+            self.updates.append(update)
+
+    def call(self, method, params):
+        with self._lock:
+            self.calls.append((method, params))
+        if method == 'sendMessage':
+            error = self._send_error(int(params['chat_id']))
+            if error:
+                return error
+        handler = getattr(self, f'api_{method}', None)
+        if handler is None:
+            return {'ok': False, 'error_code': 404, 'description': 'Not Found: method not found'}
+        return {'ok': True, 'result': handler(params)}
+
+    def _send_error(self, chat_id):
+        if chat_id in self.blocked_chats:
+            return {'ok': False, 'error_code': 403, 'description': 'Forbidden: bot was blocked by the user'}
+        now = time.monotonic()
+        with self._lock:
+            while self._recent_sends and self._recent_sends[0] <= now - 1:
+                self._recent_sends.popleft()
+            too_many = self.rate_limit and len(self._recent_sends) >= self.rate_limit
+            too_soon = self.chat_interval and now - self._chat_sends.get(chat_id, -self.chat_interval) < self.chat_interval
+            if too_many or too_soon:
+                self.throttled += 1
+                return {
+                    'ok': False,
+                    'error_code': 429,
+                    'description': 'Too Many Requests: retry after 1',
+                    'parameters': {'retry_after': 1},
+                }
+            self._recent_sends.append(now)
+            self._chat_sends[chat_id] = now
+        return None
+
+    def api_getMe(self, params):
+        return BOT_USER
+
+    def api_sendMessage(self, params):
+        message = {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': int(params['chat_id']), 'type': 'private'},
+            'from': BOT_USER,
+            'text': str(params.get('text', '')),
+        }
+        if 'reply_to_message_id' in params:
+            message['reply_to_message'] = {
+                'message_id': int(params['reply_to_message_id']),
+                'date': message['date'],
+                'chat': message['chat'],
+            }
+        return message
+
+    def api_answerCallbackQuery(self, params):
+        return True
+
+    def api_setWebhook(self, params):
+        self.webhook = params
+        return True
+
+    def api_deleteWebhook(self, params):
+        self.webhook = {}
+        return True
+
+    def api_getWebhookInfo(self, params):
+        return {'url': self.webhook.get('url', ''), 'has_custom_certificate': False, 'pending_update_count': 0}
+
+    def api_getUpdates(self, params):
+        offset = int(params.get('offset') or 0)
+        with self._lock:
+            self.updates = [update for update in self.updates if update['update_id'] >= offset]
+            return list(self.updates[:int(params.get('limit') or 100)])
+
+    async def _respond(self, path, content_type, body):
+        if path.startswith('/calls'):
+            since = int(parse_qs(urlsplit(path).query).get('since', ['0'])[0])
+            with self._lock:
+                return self.calls[since:]
+        # Paths look like /bot<token>/<method>
+        method = path.rstrip('/').rsplit('/', 1)[-1]
+        if content_type.startswith('application/json'):
+            params = json.loads(body or '{}')
+        else:
+            params = {key: _decode(value) for key, value in parse_qsl(body)}
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if method == 'getUpdates':
+            # Long polling: hold the request until there is an update or the timeout passes
+            deadline = time.monotonic() + float(params.get('timeout') or 0)
+            while not self.api_getUpdates(params) and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+        return self.call(method, params)
+
+    async def _serve_connection(self, reader, writer):
+        # Just enough HTTP/1.1 for the bot's client: keep-alive and Content-Length bodies
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                path = request_line.decode('latin-1').split(' ')[1]
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length') or 0))
+                result = await self._respond(path, headers.get('content-type', ''), body.decode())
+                # Errors carry their code as the HTTP status too, which is what clients check
+                status = 200 if isinstance(result, list) or result['ok'] else result['error_code']
+                payload = json.dumps(result).encode()
+                writer.write(
+                    b'HTTP/1.1 %d %s\r\nContent-Type: application/json\r\n'
+                    b'Content-Length: %d\r\n\r\n%s'
+                    % (status, HTTPStatus(status).phrase.encode(), len(payload), payload)
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Cancelled by stop(); ending quietly keeps asyncio from logging every open connection
+            pass
+        finally:
+            writer.close()
+
+
+def _decode(value):
+    # Parameters arrive form-encoded, with objects and lists JSON-encoded
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0, help='Seconds each call takes')
+    parser.add_argument('--rate-limit', type=int, default=0, help='Messages allowed per second (0 = no limit)')
+    parser.add_argument('--chat-interval', type=float, default=0, help='Seconds between messages to one chat')
+    args = parser.parse_args()
+    server = FakeTelegram(args.host, args.port, args.latency, args.rate_limit, args.chat_interval)
+    print(f'Fake Telegram Bot API on {server.url}', flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import GameSession
+from .models import GameConfig, GameSession
 
 @admin.register(GameSession)
 class GameSessionAdmin(admin.ModelAdmin):
@@ -14,3 +14,14 @@ class GameSessionAdmin(admin.ModelAdmin):
     
     def has_change_permission(self, request, obj=None):
         return False
+
+
+@admin.register(GameConfig)
+class GameConfigAdmin(admin.ModelAdmin):
+    list_display = ['game_type', 'is_enabled', 'min_bet', 'max_bet', 'max_payout', 'payout_version', 'updated_at', 'updated_by']
+    list_editable = ['is_enabled', 'min_bet', 'max_bet', 'max_payout']
+    readonly_fields = ['updated_at', 'updated_by']
+    
+    def save_model(self, request, obj, form, change):
+        obj.updated_by = request.user.get_username()
+        super().save_model(request, obj, form, change)
@@ -3,3 +3,10 @@ from django.apps import AppConfig
 class GamesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'games'
+
+    def ready(self):
+        from django.db.models.signals import post_save, post_delete
+        from .models import GameConfig
+        from .config import config_changed
+        post_save.connect(config_changed, sender=GameConfig, dispatch_uid='games.config_saved')
+        post_delete.connect(config_changed, sender=GameConfig, dispatch_uid='games.config_deleted')
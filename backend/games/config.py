@@ -0,0 +1,84 @@
+"""Per-game switches and bet limits without a query per bet.
+
+Every ``GameConfig`` row is loaded into process memory. Saving or deleting
+one stores a new version token in the cache once it commits; each process
+compares its token with the cached one at most every
+``CONFIG_CHECK_INTERVAL`` seconds and reloads when they differ. Copies older
+than ``CONFIG_MAX_AGE`` are reloaded regardless, for caches that are not
+shared between processes.
+"""
+import hashlib
+import json
+import time
+import uuid
+from django.core.cache import cache
+from django.db import transaction
+from .engines import ENGINES
+from .models import GameConfig
+
+CONFIG_VERSION_KEY = 'games:config:version'
+CONFIG_CHECK_INTERVAL = 2
+CONFIG_MAX_AGE = 60
+
+_local = {'configs': None, 'statuses': None, 'etag': None, 'version': None, 'checked': 0.0, 'loaded': 0.0}
+
+
+def config_status(config):
+    return {
+        'is_enabled': config.is_enabled,
+        'maintenance_message': config.maintenance_message,
+        'min_bet': float(config.min_bet) if config.min_bet is not None else None,
+        'max_bet': float(config.max_bet) if config.max_bet is not None else None,
+        'max_payout': float(config.max_payout) if config.max_payout is not None else None,
+        'payout_version': config.payout_version,
+    }
+
+
+def _load(now, version):
+    configs = {game_type: GameConfig(game_type=game_type) for game_type in ENGINES}
+    configs.update((config.game_type, config) for config in GameConfig.objects.filter(game_type__in=ENGINES))
+    statuses = {game_type: config_status(config) for game_type, config in configs.items()}
+    body = json.dumps(statuses, sort_keys=True).encode()
+    _local.update(
+        configs=configs,
+        statuses=statuses,
+        etag=hashlib.sha1(body).hexdigest()[:16],
+        version=version,
+        loaded=now,
+    )
+
+
+def _current():
+    now = time.monotonic()
+    if _local['configs'] is not None and now < _local['checked'] + CONFIG_CHECK_INTERVAL:
+        return _local
+
+    version = cache.get(CONFIG_VERSION_KEY)
+    if version is None:
+        cache.add(CONFIG_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(CONFIG_VERSION_KEY)
+    if _local['configs'] is None or version != _local['version'] or now >= _local['loaded'] + CONFIG_MAX_AGE:
+        _load(now, version)
+    _local['checked'] = now
+    return _local
+
+
+def game_config(game_type):
+    """The ``GameConfig`` of a registered game (an unsaved default if it has no row)"""
+    return _current()['configs'][game_type]
+
+
+def game_statuses():
+    """``({game_type: status}, etag)`` as served by ``game_status``"""
+    current = _current()
+    return current['statuses'], current['etag']
+
+
+def _bump_version():
+    cache.set(CONFIG_VERSION_KEY, uuid.uuid4().hex, None)
+    _local['checked'] = 0.0
+
+
+def config_changed(sender, **kwargs):
+    """post_save / post_delete receiver: make every process reload the configs"""
+    transaction.on_commit(_bump_version)
@@ -0,0 +1,213 @@
+"""Game engine registry.
+
+Each game is a ``GameEngine`` subclass registered by its ``game_type``.
+Payout tables are built once at import as Decimal constants, so settling a
+round is a dict lookup plus a table lookup. ``GameSession.GAME_TYPES``,
+``game_status`` and ``play_game`` are all driven from ``ENGINES``.
+
+Outcomes are decided on the server from ``rng`` (a ``FairRNG`` in
+production, anything with ``random()`` and ``randrange(n)`` elsewhere);
+``params`` only carries the player's choices, never the result.
+"""
+from decimal import ROUND_DOWN, Decimal
+from math import comb
+
+ZERO = Decimal('0')
+CENT = Decimal('0.01')
+
+ENGINES = {}
+
+
+class InvalidGameData(ValueError):
+    """Raised when the parameters sent for a round are out of range"""
+
+
+def register(engine_class):
+    """Class decorator adding an engine instance to the registry"""
+    ENGINES[engine_class.game_type] = engine_class()
+    return engine_class
+
+
+def get_engine(game_type):
+    """Return the engine for a game type, or None if it is unknown"""
+    return ENGINES.get(game_type)
+
+
+def game_choices():
+    """Model field choices for every registered game"""
+    return [(engine.game_type, engine.label) for engine in ENGINES.values()]
+
+
+def _int_param(params, name, default, low, high):
+    try:
+        value = int(params.get(name, default))
+    except (TypeError, ValueError):
+        raise InvalidGameData(f'{name} must be an integer')
+    if not low <= value <= high:
+        raise InvalidGameData(f'{name} must be between {low} and {high}')
+    return value
+
+
+def _picks_param(params, tiles, max_picks):
+    picks = params.get('picks')
+    if not isinstance(picks, list) or not picks:
+        raise InvalidGameData('picks must be a non-empty list of tiles')
+    try:
+        picks = {int(tile) for tile in picks}
+    except (TypeError, ValueError):
+        raise InvalidGameData('picks must be a non-empty list of tiles')
+    if len(picks) > max_picks or min(picks) < 0 or max(picks) >= tiles:
+        raise InvalidGameData(f'picks must be up to {max_picks} distinct tiles between 0 and {tiles - 1}')
+    return picks
+
+
+class GameEngine:
+    """Base class for a game's settlement rules"""
+    game_type = None
+    label = None
+
+    # Best multiplier the game can pay
+    MAX_MULTIPLIER = None
+
+    def settle(self, bet, params, rng):
+        """Return ``{'result', 'multiplier', 'extra_data'}`` for one round"""
+        raise NotImplementedError
+
+    def max_multiplier(self, params):
+        """Best multiplier a round with these ``params`` can pay"""
+        return self.MAX_MULTIPLIER
+
+    @staticmethod
+    def win(multiplier, **extra_data):
+        return {'result': 'win', 'multiplier': multiplier, 'extra_data': extra_data}
+
+    @staticmethod
+    def loss(**extra_data):
+        return {'result': 'loss', 'multiplier': ZERO, 'extra_data': extra_data}
+
+
+@register
+class PlinkoEngine(GameEngine):
+    game_type = 'plinko'
+    label = 'Plinko'
+
+    ROWS = 12
+
+    # Payout per landing slot; slots paying below 1x settle as a loss
+    PAYOUTS = tuple(Decimal(m) for m in (
+        '10', '5', '2', '1.5', '1', '0.5', '0.3', '0.5', '1', '1.5', '2', '5', '10'
+    ))
+    MAX_MULTIPLIER = max(PAYOUTS)
+
+    def settle(self, bet, params, rng):
+        # One left/right bounce per row; the slot is the number of rights
+        path = [1 if rng.random() < 0.5 else 0 for _ in range(self.ROWS)]
+        slot = sum(path)
+        multiplier = self.PAYOUTS[slot]
+        if multiplier >= 1:
+            return self.win(multiplier, path=path, final_slot=slot)
+        return self.loss(path=path, final_slot=slot)
+
+
+@register
+class SlotsEngine(GameEngine):
+    game_type = 'slots'
+    label = 'Slots'
+
+    # (cumulative probability, multiplier): 1% x10, 4% x3, 10% x1.5
+    PAYTABLE = (
+        (0.01, Decimal('10')),
+        (0.05, Decimal('3')),
+        (0.15, Decimal('1.5')),
+    )
+    MAX_MULTIPLIER = max(multiplier for _, multiplier in PAYTABLE)
+
+    def settle(self, bet, params, rng):
+        rand = rng.random()
+        for threshold, multiplier in self.PAYTABLE:
+            if rand < threshold:
+                return self.win(multiplier)
+        return self.loss()
+
+
+@register
+class WheelEngine(GameEngine):
+    game_type = 'wheel'
+    label = 'Wheel'
+
+    # Equally likely segments averaging 0.95x, so the wheel returns 95% of stakes
+    SEGMENTS = tuple(Decimal(m) for m in (
+        '0', '1.5', '0.5', '2', '0', '1.2', '0', '0.5',
+        '3', '0.5', '0', '5', '0', '0.5', '0.5', '0',
+    ))
+    MAX_MULTIPLIER = max(SEGMENTS)
+
+    def settle(self, bet, params, rng):
+        segment = rng.randrange(len(self.SEGMENTS))
+        multiplier = self.SEGMENTS[segment]
+        if multiplier > 0:
+            return self.win(multiplier, segment=segment)
+        return self.loss(segment=segment)
+
+
+@register
+class CardsEngine(GameEngine):
+    game_type = 'cards'
+    label = 'Cards'
+
+    CARDS = 3
+    MULTIPLIER = Decimal('2.5')
+    MAX_MULTIPLIER = MULTIPLIER
+
+    def settle(self, bet, params, rng):
+        selected = _int_param(params, 'selected_position', None, 0, self.CARDS - 1)
+        joker = rng.randrange(self.CARDS)
+        if selected == joker:
+            return self.win(self.MULTIPLIER, joker_position=joker)
+        return self.loss(joker_position=joker)
+
+
+MINING_TILES = 25
+# Share of stakes a mining round returns on average, whatever the mines and picks
+MINING_RTP = Decimal('0.97')
+
+
+def _mining_multipliers(tiles):
+    """table[mines][revealed] = MINING_RTP / P(no mine among ``revealed`` picks), rounded down to the cent"""
+    return {
+        mines: tuple(
+            (MINING_RTP * comb(tiles, revealed) / comb(tiles - mines, revealed)).quantize(CENT, ROUND_DOWN)
+            for revealed in range(tiles - mines + 1)
+        )
+        for mines in range(1, tiles)
+    }
+
+
+@register
+class MiningEngine(GameEngine):
+    game_type = 'mining'
+    label = 'Mining'
+
+    TILES = MINING_TILES
+    MULTIPLIERS = _mining_multipliers(MINING_TILES)
+    MAX_MULTIPLIER = max(max(row) for row in MULTIPLIERS.values())
+
+    def settle(self, bet, params, rng):
+        mines = _int_param(params, 'mines', 3, 1, self.TILES - 1)
+        picks = _picks_param(params, self.TILES, self.TILES - mines)
+        layout = self.mine_layout(mines, rng)
+        if layout.isdisjoint(picks):
+            return self.win(self.MULTIPLIERS[mines][len(picks)], mines=sorted(layout))
+        return self.loss(mines=sorted(layout))
+
+    def max_multiplier(self, params):
+        mines = _int_param(params, 'mines', 3, 1, self.TILES - 1)
+        return self.MULTIPLIERS[mines][len(_picks_param(params, self.TILES, self.TILES - mines))]
+
+    def mine_layout(self, mines, rng):
+        """First ``mines`` tiles of a Fisher-Yates shuffle of the grid"""
+        tiles = list(range(self.TILES))
+        for i in range(mines):
+            j = i + rng.randrange(self.TILES - i)
+            tiles[i], tiles[j] = tiles[j], tiles[i]
+        return set(tiles[:mines])
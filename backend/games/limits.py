@@ -0,0 +1,119 @@
+"""Bet limits and the house exposure limit, enforced by settlement.
+
+Per-game limits come from ``GameConfig`` (held in memory by
+``games.config``): minimum and maximum bet, and ``max_payout``, checked
+against the bet times the best multiplier the round's parameters allow.
+
+House exposure is the net amount paid to players (wins minus stakes) over
+the last ``EXPOSURE_WINDOW`` across all processes. Each process adds the
+rounds it settles to an in-memory counter; every ``EXPOSURE_SYNC_INTERVAL``
+it writes what it accumulated as one ``ExposureSample`` and re-reads the
+window's total. Checking a bet is therefore a comparison of two numbers.
+Once exposure reaches ``settings.MAX_NET_PAYOUT_PER_MINUTE`` new bets are
+refused, and an auto-bet stops at the round that reaches it, until the
+window rolls past the losses.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from .models import ExposureSample
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0')
+EXPOSURE_WINDOW = timedelta(minutes=1)
+EXPOSURE_SYNC_INTERVAL = 5
+# Samples are kept this long, for inspection, then deleted during a sync
+EXPOSURE_SAMPLE_RETENTION = timedelta(hours=1)
+
+
+class BetRejected(Exception):
+    """Raised when a bet is outside the game's limits"""
+
+
+class ExposureLimitReached(Exception):
+    """Raised while the house has paid out its limit over the last minute"""
+
+
+class ExposureCounter:
+    """Rolling net payout, shared across processes through ``ExposureSample`` rows"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._synced = ZERO
+        self._pending = ZERO
+        self._next_refresh = 0.0
+        self._next_flush = 0.0
+        self._syncing = False
+
+    def current(self):
+        """Net payout over the last minute, as of the latest sync plus what is not flushed yet"""
+        if time.monotonic() >= self._next_refresh:
+            self._sync(flush=False)
+        with self._lock:
+            return self._synced + self._pending
+
+    def record(self, net_payout):
+        """Add settled rounds; call once they have committed"""
+        with self._lock:
+            self._pending += net_payout
+        if time.monotonic() >= self._next_flush:
+            self._sync(flush=True)
+
+    def _sync(self, flush):
+        with self._lock:
+            if self._syncing:
+                return
+            self._syncing = True
+            pending = ZERO
+            if flush:
+                pending, self._pending = self._pending, ZERO
+        try:
+            # A savepoint when called inside a bet's transaction, so a failure here rolls
+            # back only the sync and leaves the bet's transaction usable
+            with transaction.atomic():
+                now = timezone.now()
+                if pending:
+                    ExposureSample.objects.create(created_at=now, net_payout=pending)
+                    ExposureSample.objects.filter(created_at__lt=now - EXPOSURE_SAMPLE_RETENTION).delete()
+                synced = ExposureSample.objects.filter(created_at__gte=now - EXPOSURE_WINDOW).aggregate(
+                    total=Sum('net_payout')
+                )['total'] or ZERO
+        except DatabaseError:
+            # Keep the last total and retry on the next call rather than fail the bet
+            logger.exception('Syncing house exposure failed')
+            with self._lock:
+                self._pending += pending
+                self._syncing = False
+            return
+        with self._lock:
+            self._syncing = False
+            self._synced = synced
+            deadline = time.monotonic() + EXPOSURE_SYNC_INTERVAL
+            self._next_refresh = deadline
+            if flush:
+                self._next_flush = deadline
+
+
+house_exposure = ExposureCounter()
+
+
+def exposure_limit():
+    """``settings.MAX_NET_PAYOUT_PER_MINUTE``, or None when there is no limit"""
+    return settings.MAX_NET_PAYOUT_PER_MINUTE or None
+
+
+def check_bet(engine, config, bet_amount, game_data):
+    """Raise ``BetRejected`` or ``ExposureLimitReached`` if the bet may not be played"""
+    error = config.bet_error(bet_amount, engine.max_multiplier(game_data))
+    if error:
+        raise BetRejected(error)
+    limit = exposure_limit()
+    if limit is not None and house_exposure.current() >= limit:
+        raise ExposureLimitReached()
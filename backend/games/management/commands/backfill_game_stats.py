@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+from users.models import User
+from users.snapshots import invalidate
+from games.models import GameSession, UserGameStats
+
+
+class Command(BaseCommand):
+    help = 'Recompute games_won and the per-game win/loss counters from recorded game sessions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Users recomputed per transaction')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk = 0
+        users = 0
+        while True:
+            with transaction.atomic():
+                # Locking the batch holds off settle_bet for these users, so the
+                # counters written match the sessions counted
+                locked = dict(
+                    User.objects.select_for_update()
+                    .filter(pk__gt=last_pk)
+                    .order_by('pk')
+                    .values_list('pk', 'telegram_id')[:batch_size]
+                )
+                if not locked:
+                    break
+                pks = list(locked)
+                self.backfill(pks)
+                invalidate(locked.values())
+            last_pk = pks[-1]
+            users += len(pks)
+            self.stdout.write(f'{users} users backfilled')
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled game stats for {users} users'))
+
+    def backfill(self, pks):
+        rows = (
+            GameSession.objects.filter(user_id__in=pks)
+            .order_by()
+            .values('user_id', 'game_type')
+            .annotate(wins=Count('id', filter=Q(result='win')), losses=Count('id', filter=Q(result='loss')))
+        )
+        stats = [UserGameStats(**row) for row in rows]
+
+        games_won = dict.fromkeys(pks, 0)
+        for row in stats:
+            games_won[row.user_id] += row.wins
+
+        UserGameStats.objects.filter(user_id__in=pks).delete()
+        UserGameStats.objects.bulk_create(stats)
+        User.objects.bulk_update(
+            [User(pk=pk, games_won=won) for pk, won in games_won.items()],
+            ['games_won']
+        )
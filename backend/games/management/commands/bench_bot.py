@@ -0,0 +1,113 @@
+import asyncio
+import itertools
+import time
+from types import SimpleNamespace
+from django.core.management.base import BaseCommand
+from users.models import User
+
+BENCH_TELEGRAM_ID_BASE = -1000
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2] * 1000, samples[int(len(samples) * 0.99)] * 1000
+
+
+class FakeMessage:
+    """Stands in for a Telegram message; replying costs ``latency`` seconds like an API call"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    async def reply_text(self, text, **kwargs):
+        await asyncio.sleep(self.latency)
+
+
+class FakeCallbackQuery:
+    """A press of one of the /start buttons"""
+
+    def __init__(self, telegram_id, data, latency):
+        self.data = data
+        self.from_user = SimpleNamespace(id=telegram_id)
+        self.message = FakeMessage(latency)
+
+    async def answer(self):
+        await asyncio.sleep(self.message.latency)
+
+
+def fake_update(telegram_id, latency, button=None):
+    return SimpleNamespace(
+        effective_user=SimpleNamespace(id=telegram_id, first_name='bench'),
+        message=FakeMessage(latency),
+        callback_query=FakeCallbackQuery(telegram_id, button, latency),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Feed a stream of fake /balance and /stats updates through the bot handlers and '
+        'report updates/sec per concurrency level (mirrors concurrent_updates), then the '
+        'latency of each handler on its own, with replies costing nothing.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--updates', type=int, default=2000, help='Updates per concurrency level')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--reply-latency', type=float, default=20, help='Simulated Telegram API latency in ms')
+        parser.add_argument('--latency-updates', type=int, default=2000, help='Updates per handler for latencies')
+
+    def handle(self, *args, **options):
+        import bot
+
+        ids = [BENCH_TELEGRAM_ID_BASE - i for i in range(options['users'])]
+        User.objects.filter(telegram_id__in=ids).delete()
+        User.objects.bulk_create(
+            User(telegram_id=telegram_id, username=f'bench{-telegram_id}', balance=1000) for telegram_id in ids
+        )
+        handlers = [bot.balance_command, bot.stats_command]
+        latency = options['reply_latency'] / 1000
+
+        async def run(concurrency):
+            slots = asyncio.Semaphore(concurrency)
+            stream = zip(range(options['updates']), itertools.cycle(ids), itertools.cycle(handlers))
+
+            async def handle_update(handler, telegram_id):
+                async with slots:
+                    await handler(fake_update(telegram_id, latency), None)
+
+            await asyncio.gather(*(handle_update(handler, telegram_id) for _, telegram_id, handler in stream))
+
+        async def measure(handler, button):
+            # Every user's first update misses the snapshot cache, the rest hit it
+            latencies = []
+            for _, telegram_id in zip(range(options['latency_updates']), itertools.cycle(ids)):
+                update = fake_update(telegram_id, 0, button)
+                start = time.perf_counter()
+                await handler(update, None)
+                latencies.append(time.perf_counter() - start)
+            return latencies
+
+        try:
+            for concurrency in options['concurrency']:
+                start = time.perf_counter()
+                asyncio.run(run(concurrency))
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f'{concurrency:>3} concurrent: {options["updates"] / elapsed:,.0f} updates/sec '
+                    f'({options["updates"]} updates in {elapsed:.2f}s)'
+                )
+            for name, handler, button in [
+                ('/start', bot.start, None),
+                ('/help', bot.help_command, None),
+                ('/play', bot.play_command, None),
+                ('/balance', bot.balance_command, None),
+                ('/stats', bot.stats_command, None),
+                ('Balance button', bot.button_callback, 'balance'),
+                ('Stats button', bot.button_callback, 'stats'),
+            ]:
+                p50, p99 = percentiles(asyncio.run(measure(handler, button)))
+                self.stdout.write(f'{name:>14}: p50 {p50 * 1000:.0f}µs, p99 {p99 * 1000:.0f}µs')
+        finally:
+            bot.db_executor.shutdown()
+            User.objects.filter(telegram_id__in=ids).delete()
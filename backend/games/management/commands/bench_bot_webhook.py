@@ -0,0 +1,209 @@
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from users.models import User
+
+# Bench chats use telegram IDs from here up, away from real ones
+BENCH_TELEGRAM_ID_BASE = 2 * 10 ** 12
+WEBHOOK_SECRET = 'bench-secret'
+# Seconds a delivery connection waits before sending an update the server refused with 503 again
+WEBHOOK_RETRY_DELAY = 0.1
+
+
+def command_update(update_id, chat_id, message_id):
+    """A /balance message in a group chat, so the bot's reply quotes it"""
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'group', 'title': 'bench'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'bench'},
+            'text': '/balance',
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': 8}],
+        },
+    }
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2] * 1000, samples[int(len(samples) * 0.99)] * 1000
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Start the ASGI server (daphne) in webhook mode against a local fake Telegram, post a '
+        'burst of /balance updates to its webhook the way Telegram does, and report throughput, '
+        'per-chat ordering and the game API latency during the burst'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--updates', type=int, default=10_000)
+        parser.add_argument('--chats', type=int, default=500)
+        parser.add_argument('--connections', type=int, default=100, help='Parallel webhook deliveries')
+        parser.add_argument('--reply-latency', type=float, default=20, help='Fake Telegram API latency in ms')
+        parser.add_argument('--timeout', type=float, default=600)
+
+    def handle(self, *args, **options):
+        ids = [BENCH_TELEGRAM_ID_BASE + i for i in range(options['chats'])]
+        User.objects.filter(telegram_id__in=ids).delete()
+        User.objects.bulk_create(
+            User(telegram_id=telegram_id, username=f'bench{telegram_id}', balance=1000) for telegram_id in ids
+        )
+        # Server, bot and fake Telegram each get a process, as in production
+        processes = []
+        try:
+            telegram = subprocess.Popen(
+                [
+                    sys.executable, str(settings.BASE_DIR / 'fake_telegram.py'),
+                    '--port', '0', '--latency', str(options['reply_latency'] / 1000),
+                ],
+                stdout=subprocess.PIPE, text=True,
+            )
+            processes.append(telegram)
+            telegram_url = telegram.stdout.readline().split()[-1]
+
+            port = free_port()
+            processes.append(subprocess.Popen(
+                [sys.executable, '-m', 'daphne', '-v', '0', '--port', str(port), 'config.asgi:application'],
+                cwd=settings.BASE_DIR,
+                env={
+                    **os.environ,
+                    'TELEGRAM_BOT_TOKEN': '1:bench',
+                    'TELEGRAM_API_URL': telegram_url,
+                    'BOT_WEBHOOK_URL': 'https://bench.invalid/telegram/webhook/',
+                    'BOT_WEBHOOK_SECRET': WEBHOOK_SECRET,
+                },
+            ))
+            asyncio.run(self.run(port, telegram_url, ids, options))
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait()
+            User.objects.filter(telegram_id__in=ids).delete()
+
+    async def wait_for_server(self, client, deadline):
+        while True:
+            try:
+                return await client.get('/games/api/status/')
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.1)
+
+    async def probe_api(self, client, telegram_id, done):
+        latencies = []
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get(f'/api/user/{telegram_id}/balance/')
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    async def post(self, reader, writer, body):
+        writer.write(
+            b'POST /telegram/webhook/ HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n'
+            b'X-Telegram-Bot-Api-Secret-Token: %s\r\nContent-Length: %d\r\n\r\n%s'
+            % (WEBHOOK_SECRET.encode(), len(body), body)
+        )
+        status = (await reader.readline()).split()[1]
+        length = 0
+        while (line := await reader.readline()) not in (b'\r\n', b''):
+            name, _, value = line.partition(b':')
+            if name.strip().lower() == b'content-length':
+                length = int(value)
+        await reader.readexactly(length)
+        return status
+
+    async def deliver(self, port, updates, acks, retries):
+        # Like one of Telegram's delivery connections: one update at a time on a kept-alive connection,
+        # sending it again a little later while the server is full (503)
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            for update in updates:
+                body = json.dumps(update).encode()
+                start = time.perf_counter()
+                while (status := await self.post(reader, writer, body)) == b'503':
+                    retries.append(update['update_id'])
+                    await asyncio.sleep(WEBHOOK_RETRY_DELAY)
+                if status != b'200':
+                    raise RuntimeError(f'Webhook answered {status.decode()}')
+                acks.append(time.perf_counter() - start)
+        finally:
+            writer.close()
+
+    async def wait_for_replies(self, telegram, total, deadline):
+        calls = []
+        replies = []
+        while len(replies) < total:
+            if time.perf_counter() > deadline:
+                raise RuntimeError(f'Only {len(replies)} of {total} replies before the timeout')
+            await asyncio.sleep(0.05)
+            new_calls = (await telegram.get('/calls', params={'since': len(calls)})).json()
+            calls += new_calls
+            replies += [params for method, params in new_calls if method == 'sendMessage']
+        return replies
+
+    async def run(self, port, telegram_url, ids, options):
+        total = options['updates']
+        # Telegram sends a chat's updates in order, so each chat sticks to one connection
+        streams = defaultdict(list)
+        for i in range(total):
+            chat_id = ids[i % len(ids)]
+            streams[chat_id % options['connections']].append(command_update(i + 1, chat_id, i + 1))
+
+        async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}') as client, \
+                httpx.AsyncClient(base_url=telegram_url) as telegram:
+            await self.wait_for_server(client, time.monotonic() + 30)
+
+            idle = asyncio.Event()
+            idle_task = asyncio.create_task(self.probe_api(client, ids[0], idle))
+            await asyncio.sleep(1)
+            idle.set()
+            idle_latencies = await idle_task
+
+            done = asyncio.Event()
+            busy_task = asyncio.create_task(self.probe_api(client, ids[0], done))
+            acks = []
+            retries = []
+            start = time.perf_counter()
+            await asyncio.gather(*[self.deliver(port, updates, acks, retries) for updates in streams.values()])
+            delivered = time.perf_counter() - start
+            sent = await self.wait_for_replies(telegram, total, start + options['timeout'])
+            processed = time.perf_counter() - start
+            done.set()
+            busy_latencies = await busy_task
+
+        replies = defaultdict(list)
+        for params in sent:
+            replies[params['chat_id']].append(params['reply_to_message_id'])
+        out_of_order = sum(1 for quoted in replies.values() if quoted != sorted(quoted))
+
+        ack_p50, ack_p99 = percentiles(acks)
+        self.stdout.write(
+            f'Webhook: {total} updates acknowledged in {delivered:.2f}s '
+            f'(p50 {ack_p50:.1f}ms, p99 {ack_p99:.1f}ms), {len(retries)} sent again after a 503'
+        )
+        self.stdout.write(
+            f'Handled: all {total} replies sent in {processed:.2f}s ({total / processed:,.0f} updates/sec), '
+            f'{out_of_order} of {len(replies)} chats out of order'
+        )
+        for label, latencies in [('idle', idle_latencies), ('during burst', busy_latencies)]:
+            p50, p99 = percentiles(latencies)
+            self.stdout.write(
+                f'Game API {label}: {len(latencies)} requests, p50 {p50:.1f}ms, p99 {p99:.1f}ms, '
+                f'max {max(latencies) * 1000:.1f}ms'
+            )
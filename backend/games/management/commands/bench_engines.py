@@ -0,0 +1,35 @@
+import random
+import timeit
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from games.engines import ENGINES
+from games.fairness import FairRNG, new_server_seed, new_client_seed
+
+SAMPLE_PARAMS = {
+    'cards': {'selected_position': 1},
+    'mining': {'mines': 5, 'picks': [0, 6, 12, 18]},
+}
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark the per-call settle cost of every game engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=200000)
+
+    def handle(self, *args, **options):
+        rounds = options['rounds']
+        bet = Decimal('10')
+        rng = random.Random(0)
+        server_seed, client_seed = new_server_seed(), new_client_seed()
+
+        for game_type, engine in ENGINES.items():
+            params = SAMPLE_PARAMS.get(game_type, {})
+            elapsed = timeit.timeit(lambda: engine.settle(bet, params, rng), number=rounds)
+            fair_elapsed = timeit.timeit(
+                lambda: engine.settle(bet, params, FairRNG(server_seed, client_seed, 0)), number=rounds
+            )
+            self.stdout.write(
+                f'{game_type:<8} {elapsed / rounds * 1e9:>8.0f} ns/settle'
+                f' {fair_elapsed / rounds * 1e9:>8.0f} ns/settle with FairRNG'
+            )
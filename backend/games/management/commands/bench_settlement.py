@@ -0,0 +1,51 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import connection
+from users.models import User
+from games.engines import get_engine
+from games.settlement import settle_bet
+
+BENCH_TELEGRAM_ID = -1
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure settled bets/sec for concurrent clients betting on one account. '
+        'Run against PostgreSQL; SQLite allows one writer and fails concurrent clients with "database is locked".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bets', type=int, default=2000, help='Bets per concurrency level')
+        parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 64])
+
+    def handle(self, *args, **options):
+        bet = Decimal('1')
+        engine = get_engine('slots')
+        User.objects.filter(telegram_id=BENCH_TELEGRAM_ID).delete()
+        user = User.objects.create(telegram_id=BENCH_TELEGRAM_ID, username='bench', balance=10 ** 9)
+
+        def worker(count):
+            try:
+                for _ in range(count):
+                    settle_bet(user, engine, bet, {})
+            finally:
+                connection.close()
+
+        settled = 0
+        try:
+            for clients in options['clients']:
+                per_client = max(1, options['bets'] // clients)
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=clients) as pool:
+                    list(pool.map(worker, [per_client] * clients))
+                elapsed = time.perf_counter() - start
+                total = per_client * clients
+                settled += total
+                self.stdout.write(f'{clients:>3} clients: {total / elapsed:,.0f} bets/sec ({total} bets in {elapsed:.2f}s)')
+
+            user.refresh_from_db()
+            self.stdout.write(f'games_played={user.games_played}, bets settled={settled}')
+        finally:
+            user.delete()
@@ -0,0 +1,71 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from games.engines import ENGINES, MINING_TILES
+
+
+class Command(BaseCommand):
+    help = 'Monte-Carlo estimate of RTP, variance, hit frequency and max drawdown for each game'
+
+    def add_arguments(self, parser):
+        parser.add_argument('games', nargs='*', help='Game types to simulate (default: all)')
+        parser.add_argument('--rounds', type=int, default=10_000_000, help='Rounds per game')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes')
+        parser.add_argument('--batch-size', type=int, default=1_000_000, help='Rounds drawn per NumPy batch')
+        parser.add_argument('--seed', type=int, default=None, help='Seed for a reproducible run')
+        parser.add_argument('--mines', type=int, default=3, help='Mining: mines on the board')
+        parser.add_argument('--picks', type=int, default=3, help='Mining: tiles picked before cashing out')
+
+    def handle(self, *args, **options):
+        try:
+            import numpy as np
+            from games.simulation import BatchStats, simulate
+        except ImportError:
+            raise CommandError('simulate_rtp requires numpy (pip install numpy)')
+
+        games = options['games'] or list(ENGINES)
+        unknown = set(games) - set(ENGINES)
+        if unknown:
+            raise CommandError(f'Unknown game types: {", ".join(sorted(unknown))}')
+        if not 1 <= options['mines'] < MINING_TILES or not 1 <= options['picks'] <= MINING_TILES - options['mines']:
+            raise CommandError('--mines/--picks do not fit on the mining board')
+
+        workers = max(1, options['workers'])
+        sim_options = {'mines': options['mines'], 'picks': options['picks']}
+        # A few chunks per worker keeps processes busy when games finish unevenly
+        chunks = workers * 4
+        seeds = np.random.SeedSequence(options['seed']).spawn(len(games) * chunks)
+
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {}
+            for game_index, game_type in enumerate(games):
+                per_chunk, remainder = divmod(options['rounds'], chunks)
+                futures[game_type] = [
+                    pool.submit(
+                        simulate, game_type, per_chunk + (i < remainder),
+                        seeds[game_index * chunks + i], options['batch_size'], sim_options,
+                    )
+                    for i in range(chunks)
+                ]
+
+            for game_type in games:
+                stats = BatchStats()
+                for future in futures[game_type]:
+                    stats = stats.merge(future.result())
+                self.report(game_type, stats)
+
+        elapsed = time.perf_counter() - start
+        total = options['rounds'] * len(games)
+        self.stdout.write(f'{total:,} rounds in {elapsed:.1f}s ({total / elapsed:,.0f} rounds/sec, {workers} workers)')
+
+    def report(self, game_type, stats):
+        rtp_low, rtp_high = stats.rtp_interval()
+        hit_low, hit_high = stats.hit_frequency_interval()
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{game_type} ({stats.rounds:,} rounds)'))
+        self.stdout.write(f'  RTP            {stats.rtp:.4%}  (95% CI {rtp_low:.4%} - {rtp_high:.4%})')
+        self.stdout.write(f'  House edge     {1 - stats.rtp:.4%}')
+        self.stdout.write(f'  Variance       {stats.variance:.4f} (per unit bet)')
+        self.stdout.write(f'  Hit frequency  {stats.hit_frequency:.4%}  (95% CI {hit_low:.4%} - {hit_high:.4%})')
+        self.stdout.write(f'  Max drawdown   {stats.max_drawdown:,.0f} units')
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('games', '0002_remove_game_control'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamesession',
+            name='nonce',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ServerSeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('server_seed', models.CharField(max_length=64)),
+                ('server_seed_hash', models.CharField(max_length=64)),
+                ('client_seed', models.CharField(max_length=64)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('revealed_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='server_seeds', to='users.user')),
+            ],
+            options={
+                'db_table': 'server_seeds',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='gamesession',
+            name='seed',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='game_sessions', to='games.serverseed'),
+        ),
+        migrations.AddConstraint(
+            model_name='serverseed',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('user',), name='one_active_server_seed_per_user'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_user_games_won'),
+        ('games', '0003_server_seeds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserGameStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game_type', models.CharField(choices=[('plinko', 'Plinko'), ('slots', 'Slots'), ('wheel', 'Wheel'), ('cards', 'Cards'), ('mining', 'Mining')], max_length=20)),
+                ('wins', models.IntegerField(default=0)),
+                ('losses', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_stats', to='users.user')),
+            ],
+            options={
+                'db_table': 'user_game_stats',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='usergamestats',
+            constraint=models.UniqueConstraint(fields=('user', 'game_type'), name='one_game_stats_row_per_user_game'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_user_games_won'),
+        ('games', '0004_user_game_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyGameStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('game_type', models.CharField(choices=[('plinko', 'Plinko'), ('slots', 'Slots'), ('wheel', 'Wheel'), ('cards', 'Cards'), ('mining', 'Mining')], max_length=20)),
+                ('bucket', models.PositiveSmallIntegerField(default=0)),
+                ('rounds', models.IntegerField(default=0)),
+                ('wins', models.IntegerField(default=0)),
+                ('wagered', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('paid_out', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('players', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_game_stats', to='users.user')),
+            ],
+            options={
+                'db_table': 'daily_game_stats',
+                'ordering': ['-date', 'game_type'],
+                'indexes': [models.Index(fields=['user', '-date'], name='daily_game__user_id_5463bf_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailygamestats',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('date', 'game_type', 'bucket'), name='one_house_stats_row_per_day_game_bucket'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailygamestats',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('date', 'game_type', 'user'), name='one_user_stats_row_per_day_game'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0005_daily_game_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameConfig',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game_type', models.CharField(choices=[('plinko', 'Plinko'), ('slots', 'Slots'), ('wheel', 'Wheel'), ('cards', 'Cards'), ('mining', 'Mining')], max_length=20, unique=True)),
+                ('is_enabled', models.BooleanField(default=True)),
+                ('maintenance_message', models.TextField(default='This game is temporarily under maintenance. Please try again later.', help_text='Message shown to users when game is disabled')),
+                ('min_bet', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('max_bet', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('payout_version', models.PositiveIntegerField(default=1, help_text='Bump when the payout table changes so clients refresh what they show')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('updated_by', models.CharField(blank=True, max_length=255)),
+            ],
+            options={
+                'verbose_name': 'Game Config',
+                'verbose_name_plural': 'Game Configs',
+                'db_table': 'game_configs',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0006_game_configs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExposureSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(db_index=True)),
+                ('net_payout', models.DecimalField(decimal_places=2, max_digits=14)),
+            ],
+            options={
+                'db_table': 'exposure_samples',
+            },
+        ),
+        migrations.AddField(
+            model_name='gameconfig',
+            name='max_payout',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Most one round may pay; bets that could win more are refused', max_digits=12, null=True),
+        ),
+    ]
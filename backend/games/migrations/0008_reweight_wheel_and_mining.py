@@ -0,0 +1,25 @@
+from django.db import migrations
+from django.db.models import F
+
+# Games whose payout tables were reweighted to a house edge
+REWEIGHTED = ['wheel', 'mining']
+
+
+def bump_payout_version(apps, schema_editor):
+    GameConfig = apps.get_model('games', 'GameConfig')
+    GameConfig.objects.filter(game_type__in=REWEIGHTED).update(payout_version=F('payout_version') + 1)
+    existing = set(GameConfig.objects.filter(game_type__in=REWEIGHTED).values_list('game_type', flat=True))
+    GameConfig.objects.bulk_create(
+        GameConfig(game_type=game_type, payout_version=2) for game_type in REWEIGHTED if game_type not in existing
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0007_bet_limits_and_exposure'),
+    ]
+
+    operations = [
+        migrations.RunPython(bump_payout_version, migrations.RunPython.noop),
+    ]
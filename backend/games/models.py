@@ -1,14 +1,57 @@
 from django.db import models
 from users.models import User
+from .engines import game_choices
+from .fairness import new_server_seed, new_client_seed, hash_seed, FairRNG
+
+
+class ServerSeedManager(models.Manager):
+    def active_for(self, user):
+        """Return the user's active seed pair, creating one on first use"""
+        seed = self.filter(user_id=user.pk, is_active=True).first()
+        if seed is None:
+            server_seed = new_server_seed()
+            seed, _ = self.get_or_create(
+                user_id=user.pk,
+                is_active=True,
+                defaults={
+                    'server_seed': server_seed,
+                    'server_seed_hash': hash_seed(server_seed),
+                    'client_seed': new_client_seed(),
+                }
+            )
+        return seed
+
+
+class ServerSeed(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='server_seeds')
+    server_seed = models.CharField(max_length=64)
+    server_seed_hash = models.CharField(max_length=64)
+    client_seed = models.CharField(max_length=64)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    revealed_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ServerSeedManager()
+
+    class Meta:
+        db_table = 'server_seeds'
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=models.Q(is_active=True),
+                name='one_active_server_seed_per_user',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.server_seed_hash[:16]}"
+
+    def rng(self, nonce):
+        return FairRNG(self.server_seed, self.client_seed, nonce)
 
 class GameSession(models.Model):
-    GAME_TYPES = [
-        ('plinko', 'Plinko'),
-        ('slots', 'Slots'),
-        ('wheel', 'Wheel'),
-        ('cards', 'Cards'),
-        ('mining', 'Mining'),
-    ]
+    GAME_TYPES = game_choices()
     
     RESULT_CHOICES = [
         ('win', 'Win'),
@@ -23,6 +66,8 @@ class GameSession(models.Model):
     points_change = models.DecimalField(max_digits=10, decimal_places=2)
     balance_after = models.DecimalField(max_digits=12, decimal_places=2)
     game_data = models.JSONField(default=dict, blank=True)
+    seed = models.ForeignKey(ServerSeed, on_delete=models.CASCADE, null=True, blank=True, related_name='game_sessions')
+    nonce = models.PositiveIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     class Meta:
@@ -35,3 +80,127 @@ class GameSession(models.Model):
 
     def __str__(self):
         return f"{self.user.telegram_id} - {self.game_type} - {self.result}"
+
+
+class UserGameStats(models.Model):
+    """Per-game win/loss counters, maintained by ``settle_bet``"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='game_stats')
+    game_type = models.CharField(max_length=20, choices=GameSession.GAME_TYPES)
+    wins = models.IntegerField(default=0)
+    losses = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'user_game_stats'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'game_type'], name='one_game_stats_row_per_user_game'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.game_type}: {self.wins}W/{self.losses}L"
+
+
+# House rows of DailyGameStats are split by user id across this many buckets
+STATS_BUCKETS = 16
+
+
+class DailyGameStats(models.Model):
+    """Per-day, per-game totals kept current by ``settle_bet``.
+
+    Rows with a ``user`` hold one player's day. House rows (no user) are
+    split across ``STATS_BUCKETS`` buckets by user id so concurrent bets do
+    not all queue on one row; ``players`` counts distinct players and is
+    only kept on house rows.
+    """
+    date = models.DateField()
+    game_type = models.CharField(max_length=20, choices=GameSession.GAME_TYPES)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='daily_game_stats')
+    bucket = models.PositiveSmallIntegerField(default=0)
+    rounds = models.IntegerField(default=0)
+    wins = models.IntegerField(default=0)
+    wagered = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    paid_out = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    players = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'daily_game_stats'
+        ordering = ['-date', 'game_type']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'game_type', 'bucket'],
+                condition=models.Q(user__isnull=True),
+                name='one_house_stats_row_per_day_game_bucket',
+            ),
+            models.UniqueConstraint(
+                fields=['date', 'game_type', 'user'],
+                condition=models.Q(user__isnull=False),
+                name='one_user_stats_row_per_day_game',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-date']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.game_type} - {self.user_id or 'house'}"
+
+
+class GameConfig(models.Model):
+    """Admin switches and bet limits for one game; games without a row use the defaults.
+
+    Read through ``games.config``, which keeps every row in process memory.
+    """
+    game_type = models.CharField(max_length=20, choices=GameSession.GAME_TYPES, unique=True)
+    is_enabled = models.BooleanField(default=True)
+    maintenance_message = models.TextField(
+        default='This game is temporarily under maintenance. Please try again later.',
+        help_text='Message shown to users when game is disabled'
+    )
+    min_bet = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_bet = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_payout = models.DecimalField(
+        max_digits=12, decimal_places=2, null=True, blank=True,
+        help_text='Most one round may pay; bets that could win more are refused'
+    )
+    payout_version = models.PositiveIntegerField(
+        default=1,
+        help_text='Bump when the payout table changes so clients refresh what they show'
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    updated_by = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        db_table = 'game_configs'
+        verbose_name = 'Game Config'
+        verbose_name_plural = 'Game Configs'
+
+    def __str__(self):
+        return f"{self.game_type} - {'enabled' if self.is_enabled else 'disabled'}"
+
+    def bet_error(self, bet_amount, max_multiplier):
+        """Why ``bet_amount`` is not accepted for this game, or None.
+
+        ``max_multiplier`` is the best the round can pay, for ``max_payout``.
+        """
+        if self.min_bet is not None and bet_amount < self.min_bet:
+            return f'Minimum bet is {self.min_bet}'
+        if self.max_bet is not None and bet_amount > self.max_bet:
+            return f'Maximum bet is {self.max_bet}'
+        if self.max_payout is not None and bet_amount * max_multiplier > self.max_payout:
+            return f'This bet could pay more than the maximum payout of {self.max_payout}'
+        return None
+
+
+class ExposureSample(models.Model):
+    """Net payout to players (wins minus stakes) settled by one process since its previous sample.
+
+    Written by ``games.limits`` every few seconds; the samples of the last
+    minute add up to the house exposure across processes.
+    """
+    created_at = models.DateTimeField(db_index=True)
+    net_payout = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        db_table = 'exposure_samples'
+
+    def __str__(self):
+        return f"{self.created_at} - {self.net_payout}"
@@ -0,0 +1,191 @@
+from decimal import Decimal
+from functools import partial
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from users.balances import CENT
+from users.models import User, LedgerEntry
+from users.events import publish_rounds
+from users.snapshots import SNAPSHOT_FIELDS, update_after_rounds
+from .config import game_config
+from .limits import check_bet, exposure_limit, house_exposure
+from .models import GameSession, ServerSeed, UserGameStats, DailyGameStats, STATS_BUCKETS
+
+ZERO = Decimal('0')
+
+
+class InsufficientBalance(Exception):
+    """Raised when the balance no longer covers the bet at settlement time"""
+
+
+def increment(model, lookup, **deltas):
+    """Add ``deltas`` to the row matching ``lookup``, creating it if missing.
+
+    Returns True if the row was created.
+    """
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(**updates):
+        return False
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+        return True
+    except IntegrityError:
+        # Created by a concurrent transaction since the UPDATE
+        model.objects.filter(**lookup).update(**updates)
+        return False
+
+
+def settle_bet(user, engine, bet_amount, game_data):
+    """Draw, settle and record one round; returns ``(game_session, result_data)``"""
+    sessions, results, _ = settle_rounds(user, engine, bet_amount, game_data, 1)
+    return sessions[0], results[0]
+
+
+def settle_rounds(user, engine, bet_amount, game_data, rounds, stop_loss=None, take_profit=None):
+    """Draw, settle and record up to ``rounds`` rounds of the same bet.
+
+    Each round's outcome comes from the user's active server seed with the
+    user's ``games_played`` at that round as the nonce. The user row is
+    locked while the seed is read and the outcomes are drawn, then balance and all counters are
+    applied in one conditional UPDATE (``WHERE balance >= bet``) touching
+    only those columns, so concurrent bets on the same account queue instead
+    of overdrawing it, losing updates or reusing a nonce. The per-game
+    win/loss counters and daily rollups get one aggregated update, and the
+    sessions and ledger entries one bulk insert each, in the same transaction;
+    the user's cached snapshot is updated and the rounds are pushed to their
+    WebSocket channel once it commits.
+
+    The game's bet limits and the house exposure limit are checked first
+    (``BetRejected``, ``ExposureLimitReached``; see ``games.limits``). Play
+    stops early once the balance no longer covers the bet, the net loss
+    reaches ``stop_loss``, the net win reaches ``take_profit`` or the house
+    exposure reaches its limit. Raises ``InsufficientBalance`` if not even
+    the first round is covered. Returns ``(game_sessions, results,
+    stop_reason)``, ``stop_reason`` being one of ``completed``,
+    ``insufficient_balance``, ``stop_loss``, ``take_profit`` and ``house_limit``.
+    """
+    check_bet(engine, game_config(engine.game_type), bet_amount, game_data)
+    limit = exposure_limit()
+    exposure = house_exposure.current() if limit is not None else ZERO
+
+    with transaction.atomic():
+        locked = (
+            User.objects.select_for_update()
+            .filter(pk=user.pk)
+            .values('telegram_id', *SNAPSHOT_FIELDS)
+            .get()
+        )
+        # Read under the user's lock, which rotate_seed also takes, so the seed
+        # cannot be revealed while these rounds are drawn from it
+        seed = ServerSeed.objects.active_for(user)
+        balance = locked['balance']
+        nonce = locked['games_played']
+        if balance < bet_amount:
+            raise InsufficientBalance()
+
+        sessions = []
+        results = []
+        wins = 0
+        won_total = ZERO
+        lost_total = ZERO
+        net = ZERO
+        stop_reason = 'completed'
+        for round_nonce in range(nonce, nonce + rounds):
+            if balance + net < bet_amount:
+                stop_reason = 'insufficient_balance'
+                break
+
+            result_data = engine.settle(bet_amount, game_data, seed.rng(round_nonce))
+            multiplier = result_data['multiplier']
+            if result_data['result'] == 'win':
+                wins += 1
+                # Rounded per round, so the sessions, ledger entries and balance add up exactly
+                win_amount = (bet_amount * multiplier).quantize(CENT)
+                won_total += win_amount
+            else:
+                win_amount = ZERO
+                lost_total += bet_amount
+            points_change = win_amount - bet_amount
+            net += points_change
+
+            results.append(result_data)
+            sessions.append(GameSession(
+                user_id=user.pk,
+                game_type=engine.game_type,
+                bet_amount=bet_amount,
+                result=result_data['result'],
+                multiplier=multiplier,
+                points_change=points_change,
+                balance_after=balance + net,
+                game_data=game_data,
+                seed=seed,
+                nonce=round_nonce
+            ))
+
+            if stop_loss is not None and -net >= stop_loss:
+                stop_reason = 'stop_loss'
+                break
+            if take_profit is not None and net >= take_profit:
+                stop_reason = 'take_profit'
+                break
+            if limit is not None and exposure + net >= limit:
+                stop_reason = 'house_limit'
+                break
+
+        played = len(sessions)
+        wagered = bet_amount * played
+        now = timezone.now()
+
+        updated = User.objects.filter(pk=user.pk, balance__gte=-min(net, ZERO)).update(
+            balance=F('balance') + net,
+            total_wagered=F('total_wagered') + wagered,
+            total_won=F('total_won') + won_total,
+            total_lost=F('total_lost') + lost_total,
+            games_played=F('games_played') + played,
+            games_won=F('games_won') + wins,
+            updated_at=now,
+        )
+        if not updated:
+            raise InsufficientBalance()
+        update_after_rounds(
+            locked['telegram_id'],
+            locked['updated_at'],
+            {
+                'balance': balance + net,
+                'total_wagered': locked['total_wagered'] + wagered,
+                'total_won': locked['total_won'] + won_total,
+                'total_lost': locked['total_lost'] + lost_total,
+                'games_played': nonce + played,
+                'games_won': locked['games_won'] + wins,
+                'updated_at': now,
+            },
+            engine.game_type, wins, played - wins
+        )
+
+        increment(UserGameStats, {'user_id': user.pk, 'game_type': engine.game_type}, wins=wins, losses=played - wins)
+
+        today = timezone.localdate(now)
+        bucket = user.pk % STATS_BUCKETS
+        totals = {'rounds': played, 'wins': wins, 'wagered': wagered, 'paid_out': won_total}
+        first_round_today = increment(
+            DailyGameStats,
+            {'date': today, 'game_type': engine.game_type, 'user_id': user.pk, 'bucket': bucket},
+            **totals
+        )
+        increment(
+            DailyGameStats,
+            {'date': today, 'game_type': engine.game_type, 'user_id': None, 'bucket': bucket},
+            players=int(first_round_today),
+            **totals
+        )
+
+        GameSession.objects.bulk_create(sessions)
+        LedgerEntry.objects.record(
+            LedgerEntry(user_id=user.pk, kind='game', amount=session.points_change, reference=f'game:{session.pk}')
+            for session in sessions
+        )
+        publish_rounds(locked['telegram_id'], sessions)
+        transaction.on_commit(partial(house_exposure.record, net))
+
+    return sessions, results, stop_reason
@@ -0,0 +1,143 @@
+"""Vectorized Monte-Carlo samplers for the game engines.
+
+Each sampler draws a whole batch of rounds with NumPy and returns the payout
+multiplier of every round (0 for a loss), using the payout tables of the
+engine it mirrors so the two cannot drift apart. Batches are reduced to a
+small ``BatchStats`` so results from many processes can be merged.
+
+NumPy is only needed here, not by the web app.
+"""
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from .engines import PlinkoEngine, SlotsEngine, WheelEngine, CardsEngine, MiningEngine
+
+SAMPLERS = {}
+
+
+def sampler(game_type):
+    def decorator(func):
+        SAMPLERS[game_type] = func
+        return func
+    return decorator
+
+
+def _floats(values):
+    return np.array([float(v) for v in values])
+
+
+PLINKO_PAYOUTS = _floats(m if m >= 1 else 0 for m in PlinkoEngine.PAYOUTS)
+SLOTS_THRESHOLDS = np.array([threshold for threshold, _ in SlotsEngine.PAYTABLE])
+SLOTS_PAYOUTS = _floats([m for _, m in SlotsEngine.PAYTABLE] + [0])
+WHEEL_PAYOUTS = _floats(WheelEngine.SEGMENTS)
+
+
+@sampler('plinko')
+def sample_plinko(rng, size, options):
+    return PLINKO_PAYOUTS[rng.binomial(PlinkoEngine.ROWS, 0.5, size)]
+
+
+@sampler('slots')
+def sample_slots(rng, size, options):
+    return SLOTS_PAYOUTS[np.searchsorted(SLOTS_THRESHOLDS, rng.random(size), side='right')]
+
+
+@sampler('wheel')
+def sample_wheel(rng, size, options):
+    return WHEEL_PAYOUTS[rng.integers(0, len(WHEEL_PAYOUTS), size)]
+
+
+@sampler('cards')
+def sample_cards(rng, size, options):
+    # The player's pick is irrelevant: the joker is uniform over the cards
+    hits = rng.integers(0, CardsEngine.CARDS, size) == 0
+    return np.where(hits, float(CardsEngine.MULTIPLIER), 0.0)
+
+
+@sampler('mining')
+def sample_mining(rng, size, options):
+    mines, picks = options['mines'], options['picks']
+    # Number of mines among the picked tiles is hypergeometric
+    mines_hit = rng.hypergeometric(mines, MiningEngine.TILES - mines, picks, size)
+    return np.where(mines_hit == 0, float(MiningEngine.MULTIPLIERS[mines][picks]), 0.0)
+
+
+@dataclass
+class BatchStats:
+    """Mergeable summary of a sequence of rounds at a bet of 1"""
+    rounds: int = 0
+    hits: int = 0
+    payout_sum: float = 0.0
+    payout_sq_sum: float = 0.0
+    # Player net P&L over the sequence: total, extreme prefixes, worst drawdown
+    net: float = 0.0
+    max_prefix: float = 0.0
+    min_prefix: float = 0.0
+    max_drawdown: float = 0.0
+
+    @classmethod
+    def from_payouts(cls, payouts):
+        cumulative = np.cumsum(payouts - 1.0)
+        peaks = np.maximum.accumulate(np.maximum(cumulative, 0.0))
+        return cls(
+            rounds=len(payouts),
+            hits=int(np.count_nonzero(payouts)),
+            payout_sum=float(payouts.sum()),
+            payout_sq_sum=float(np.dot(payouts, payouts)),
+            net=float(cumulative[-1]),
+            max_prefix=max(0.0, float(cumulative.max())),
+            min_prefix=min(0.0, float(cumulative.min())),
+            max_drawdown=float((peaks - cumulative).max()),
+        )
+
+    def merge(self, other):
+        """Stats of ``self`` followed by ``other``"""
+        return BatchStats(
+            rounds=self.rounds + other.rounds,
+            hits=self.hits + other.hits,
+            payout_sum=self.payout_sum + other.payout_sum,
+            payout_sq_sum=self.payout_sq_sum + other.payout_sq_sum,
+            net=self.net + other.net,
+            max_prefix=max(self.max_prefix, self.net + other.max_prefix),
+            min_prefix=min(self.min_prefix, self.net + other.min_prefix),
+            max_drawdown=max(
+                self.max_drawdown,
+                other.max_drawdown,
+                self.max_prefix - (self.net + other.min_prefix),
+            ),
+        )
+
+    @property
+    def rtp(self):
+        return self.payout_sum / self.rounds
+
+    @property
+    def variance(self):
+        return self.payout_sq_sum / self.rounds - self.rtp ** 2
+
+    @property
+    def hit_frequency(self):
+        return self.hits / self.rounds
+
+    def rtp_interval(self, z=1.96):
+        half_width = z * math.sqrt(self.variance / self.rounds)
+        return self.rtp - half_width, self.rtp + half_width
+
+    def hit_frequency_interval(self, z=1.96):
+        p = self.hit_frequency
+        half_width = z * math.sqrt(p * (1 - p) / self.rounds)
+        return p - half_width, p + half_width
+
+
+def simulate(game_type, rounds, seed, batch_size, options):
+    """Simulate ``rounds`` rounds of one game in batches; safe to run in a worker process"""
+    rng = np.random.default_rng(seed)
+    sample = SAMPLERS[game_type]
+    stats = BatchStats()
+    while rounds > 0:
+        size = min(batch_size, rounds)
+        stats = stats.merge(BatchStats.from_payouts(sample(rng, size, options)))
+        rounds -= size
+    return stats
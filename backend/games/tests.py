@@ -0,0 +1,201 @@
+import json
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Sum
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from users.balances import adjust_balances
+from users.models import LedgerEntry, User
+from users.webapp_auth import issue_session_token
+from . import config
+from .engines import ENGINES, get_engine
+from .fairness import FairRNG, hash_seed
+from .models import GameConfig, GameSession, ServerSeed
+from .settlement import InsufficientBalance, settle_rounds
+
+PLAYER_ID = 444
+SERVER_SEED = 'a' * 64
+
+
+@override_settings(MAX_NET_PAYOUT_PER_MINUTE=0)
+class GameTestCase(TestCase):
+    """A player with a deposit in the ledger and a known seed, signed in through the API"""
+
+    def setUp(self):
+        cache.clear()
+        config._local['configs'] = None
+        self.user = User.objects.create(telegram_id=PLAYER_ID)
+        adjust_balances({self.user.pk: Decimal('1000')}, 'test')
+        ServerSeed.objects.create(
+            user=self.user, server_seed=SERVER_SEED, server_seed_hash=hash_seed(SERVER_SEED), client_seed='test'
+        )
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {issue_session_token(self.user)}'}
+
+    def post(self, path, body):
+        return self.client.post(path, body, content_type='application/json', **self.headers)
+
+    def play(self, game_type='slots', bet_amount='10', **body):
+        return self.post('/games/api/play/', {'game_type': game_type, 'bet_amount': bet_amount, **body})
+
+    def play_batch(self, rounds, bet_amount='10', **limits):
+        return self.post(
+            '/games/api/play/batch/', {'game_type': 'slots', 'bet_amount': bet_amount, 'rounds': rounds, **limits}
+        )
+
+    def assertLedgerMatchesBalance(self):
+        self.user.refresh_from_db()
+        ledger = LedgerEntry.objects.filter(user=self.user).aggregate(total=Sum('amount'))['total']
+        self.assertEqual(ledger, self.user.balance)
+        played = GameSession.objects.filter(user=self.user).aggregate(total=Sum('points_change'))['total']
+        self.assertEqual(Decimal('1000') + played, self.user.balance)
+
+
+class SettlementTests(GameTestCase):
+
+    def test_bet_above_balance_is_refused(self):
+        response = self.play(bet_amount='1000.01')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(GameSession.objects.exists())
+
+    def test_conditional_update_refuses_a_drained_balance(self):
+        # Another request spends the balance after it was read: only the UPDATE's WHERE can catch it
+        active_for = ServerSeed.objects.active_for
+
+        def drain_then_seed(user):
+            User.objects.filter(pk=user.pk).update(balance=5)
+            return active_for(user)
+
+        with mock.patch.object(ServerSeed.objects, 'active_for', side_effect=drain_then_seed):
+            with self.assertRaises(InsufficientBalance):
+                settle_rounds(self.user, get_engine('slots'), Decimal('10'), {}, 1)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.balance, self.user.games_played), (Decimal('1000'), 0))
+        self.assertFalse(GameSession.objects.exists())
+        self.assertFalse(LedgerEntry.objects.filter(kind='game').exists())
+
+    def test_ledger_matches_balance_after_play(self):
+        for game_type, body in [
+            ('slots', {}), ('plinko', {}), ('wheel', {}),
+            ('cards', {'game_data': {'selected_position': 1}}),
+            ('mining', {'game_data': {'mines': 3, 'picks': [0, 1, 2]}}),
+        ]:
+            self.assertEqual(self.play(game_type, '7.5', **body).status_code, 200, game_type)
+        self.assertLedgerMatchesBalance()
+
+    def test_ledger_matches_balance_after_batches(self):
+        # The seed is fixed, so nonce 10 is a 3x win and a loss follows within a few rounds
+        completed = self.play_batch(10, '3.33')
+        take_profit = self.play_batch(100, take_profit='1')
+        stop_loss = self.play_batch(100, stop_loss='10')
+
+        self.assertEqual(completed.json()['stop_reason'], 'completed')
+        self.assertEqual(len(completed.json()['rounds']), 10)
+        self.assertEqual(stop_loss.json()['stop_reason'], 'stop_loss')
+        self.assertLessEqual(stop_loss.json()['net'], -10)
+        self.assertEqual(take_profit.json()['stop_reason'], 'take_profit')
+        self.assertGreaterEqual(take_profit.json()['net'], 1)
+        self.assertLedgerMatchesBalance()
+
+    def test_batch_stops_when_the_balance_runs_out(self):
+        # The first two rounds lose, leaving 200 for a bet of 400
+        response = self.play_batch(100, bet_amount='400')
+        self.assertEqual(response.json()['stop_reason'], 'insufficient_balance')
+        self.assertEqual(len(response.json()['rounds']), 2)
+        self.assertLedgerMatchesBalance()
+        self.assertGreaterEqual(self.user.balance, 0)
+
+
+class BetLimitTests(GameTestCase):
+
+    def configure(self, **limits):
+        with self.captureOnCommitCallbacks(execute=True):
+            GameConfig.objects.create(game_type='slots', **limits)
+
+    def test_min_bet(self):
+        self.configure(min_bet=Decimal('5'))
+        response = self.play(bet_amount='4.99')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Minimum bet is 5.00')
+        self.assertEqual(self.play(bet_amount='5').status_code, 200)
+
+    def test_max_payout(self):
+        # Slots pays up to 10x, so a bet of 10 could pay 100
+        self.configure(max_payout=Decimal('99'))
+        response = self.play(bet_amount='10')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('maximum payout', response.json()['error'])
+        self.assertEqual(self.play(bet_amount='9.9').status_code, 200)
+        self.assertFalse(GameSession.objects.filter(bet_amount=10).exists())
+
+
+class FairRNGTests(SimpleTestCase):
+
+    def test_deterministic(self):
+        draws = [FairRNG(SERVER_SEED, 'client', 7).random() for _ in range(3)]
+        rng = FairRNG(SERVER_SEED, 'client', 7)
+        # Past the eight floats of the first HMAC block too
+        sequence = [rng.random() for _ in range(20)]
+        again = FairRNG(SERVER_SEED, 'client', 7)
+
+        self.assertEqual(draws, [sequence[0]] * 3)
+        self.assertEqual(sequence, [again.random() for _ in range(20)])
+        self.assertTrue(all(0 <= value < 1 for value in sequence))
+        self.assertNotEqual(sequence[0], FairRNG(SERVER_SEED, 'client', 8).random())
+        self.assertNotEqual(sequence[0], FairRNG(SERVER_SEED, 'other', 7).random())
+
+    def test_engines_settle_the_same_from_the_same_seed(self):
+        params = {'cards': {'selected_position': 0}, 'mining': {'mines': 5, 'picks': [3, 9]}}
+        for game_type, engine in ENGINES.items():
+            for nonce in range(50):
+                first = engine.settle(Decimal('1'), params.get(game_type, {}), FairRNG(SERVER_SEED, 'c', nonce))
+                second = engine.settle(Decimal('1'), params.get(game_type, {}), FairRNG(SERVER_SEED, 'c', nonce))
+                self.assertEqual(first, second)
+
+
+class VerifyRoundsTests(GameTestCase):
+
+    def verify(self):
+        out = StringIO()
+        call_command('verify_rounds', stdout=out)
+        return out.getvalue()
+
+    def test_rounds_re_derive(self):
+        self.play_batch(30)
+        self.play('mining', game_data={'mines': 3, 'picks': [4, 5]})
+        self.assertIn('Verified 31 rounds, 0 mismatches', self.verify())
+
+    def test_tampered_round_is_reported(self):
+        self.play_batch(10)
+        session = GameSession.objects.filter(result='loss').first()
+        GameSession.objects.filter(pk=session.pk).update(result='win', multiplier=Decimal('10'))
+        output = self.verify()
+        self.assertIn(f'Round {session.pk} does not re-derive from its seed', output)
+        self.assertIn('Verified 10 rounds, 1 mismatches', output)
+
+    def test_tampered_seed_is_reported(self):
+        self.play_batch(5)
+        ServerSeed.objects.filter(user=self.user).update(server_seed='b' * 64)
+        self.assertIn('1 seeds do not match their committed hash', self.verify())
+
+
+class HistoryExportTests(GameTestCase):
+
+    def test_stream_matches_the_handler(self):
+        self.play_batch(25)
+        path = f'/games/api/history/{PLAYER_ID}/?stream=1'
+        response = self.client.get(path, **self.headers)
+        self.assertFalse(response.is_async)
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 25)
+        self.assertEqual(json.loads(lines[0])['id'], GameSession.objects.latest('id').pk)
+
+        async def export():
+            response = await AsyncClient().get(path, **self.headers)
+            return response.is_async, [chunk async for chunk in response.streaming_content]
+
+        is_async, chunks = async_to_sync(export)()
+        self.assertTrue(is_async)
+        self.assertEqual(b''.join(chunks).splitlines(), lines)
@@ -3,6 +3,10 @@ from . import views
 
 urlpatterns = [
     path('play/', views.play_game, name='play-game'),
+    path('play/batch/', views.play_batch, name='play-batch'),
     path('history/<int:telegram_id>/', views.game_history, name='game-history'),
     path('status/', views.game_status, name='game-status'),
+    path('admin/config/', views.admin_update_game_config, name='admin-update-game-config'),
+    path('fairness/<int:telegram_id>/', views.fairness_seed, name='fairness-seed'),
+    path('fairness/rotate/', views.rotate_seed, name='rotate-seed'),
 ]
@@ -1,162 +1,289 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework import serializers, status
+from rest_framework.utils.encoders import JSONEncoder
+from django.core.handlers.asgi import ASGIRequest
 from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from config.pagination import InvalidCursor, akeyset_chunks, keyset_chunks, keyset_page, parse_limit
+from users.idempotency import idempotent
+from users.balances import parse_points
 from users.models import User
-from .models import GameSession
+from users.permissions import admin_session_required, admin_name
+from users.players import player_required
+from .config import config_status, game_config, game_statuses
+from .limits import BetRejected, ExposureLimitReached, EXPOSURE_WINDOW
+from .models import GameConfig, GameSession, ServerSeed
 from .serializers import GameSessionSerializer
-import random
-from decimal import Decimal
+from .settlement import settle_bet, settle_rounds, InsufficientBalance
+from .engines import ENGINES, InvalidGameData, get_engine
+from .fairness import new_server_seed, hash_seed
+import json
+
+HISTORY_FIELDS = GameSessionSerializer.Meta.fields
+MAX_BATCH_ROUNDS = 100
+# Seconds the Lobby may reuse game_status before revalidating it with its ETag
+STATUS_MAX_AGE = 15
+
+def game_disabled(engine):
+    """Maintenance response if an admin has disabled the game"""
+    config = game_config(engine.game_type)
+    if not config.is_enabled:
+        return Response(
+            {'error': config.maintenance_message, 'maintenance': True},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    return None
+
+
+def house_limit_response():
+    response = Response(
+        {'error': 'Betting is paused for a moment. Please try again shortly.'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+    response['Retry-After'] = str(int(EXPOSURE_WINDOW.total_seconds()))
+    return response
 
 @api_view(['POST'])
+@player_required
+@idempotent('play')
 def play_game(request):
     """Main endpoint for playing games"""
-    telegram_id = request.data.get('telegram_id')
     game_type = request.data.get('game_type')
-    bet_amount = Decimal(str(request.data.get('bet_amount', 0)))
+    bet_amount = parse_points(request.data.get('bet_amount', 0))
     game_data = request.data.get('game_data', {})
     
-    try:
-        user = User.objects.get(telegram_id=telegram_id)
-    except User.DoesNotExist:
-        return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+    if bet_amount is None or bet_amount <= 0:
+        return Response({'error': 'Bet amount must be positive'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Check if user is banned
-    if user.is_banned:
+    if request.player.is_banned:
         return Response({'error': 'Your account has been banned'}, status=status.HTTP_403_FORBIDDEN)
     
-    # Check balance
-    if user.balance < bet_amount:
-        return Response({'error': 'Insufficient balance'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    # Process game based on type
-    if game_type == 'plinko':
-        result_data = process_plinko(bet_amount, game_data)
-    elif game_type == 'slots':
-        result_data = process_slots(bet_amount)
-    elif game_type == 'wheel':
-        result_data = process_wheel(bet_amount, game_data)
-    elif game_type == 'cards':
-        result_data = process_cards(bet_amount, game_data)
-    elif game_type == 'mining':
-        result_data = process_mining(bet_amount, game_data)
-    else:
+    engine = get_engine(game_type)
+    if engine is None:
         return Response({'error': 'Invalid game type'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Update user balance and stats
-    with transaction.atomic():
-        user.balance -= bet_amount
-        user.total_wagered += bet_amount
-        user.games_played += 1
-        
-        if result_data['result'] == 'win':
-            win_amount = bet_amount * result_data['multiplier']
-            user.balance += win_amount
-            user.total_won += win_amount
-            points_change = win_amount - bet_amount
-        else:
-            user.total_lost += bet_amount
-            points_change = -bet_amount
-        
-        user.save()
-        
-        # Create game session
-        game_session = GameSession.objects.create(
-            user=user,
-            game_type=game_type,
-            bet_amount=bet_amount,
-            result=result_data['result'],
-            multiplier=result_data['multiplier'],
-            points_change=points_change,
-            balance_after=user.balance,
-            game_data=game_data
-        )
+    disabled = game_disabled(engine)
+    if disabled:
+        return disabled
+    
+    # Draw and settle the round on the server; the balance is re-checked in the UPDATE
+    try:
+        game_session, result_data = settle_bet(request.player, engine, bet_amount, game_data)
+    except (InvalidGameData, BetRejected) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except ExposureLimitReached:
+        return house_limit_response()
+    except InsufficientBalance:
+        return Response({'error': 'Insufficient balance'}, status=status.HTTP_400_BAD_REQUEST)
     
     return Response({
-        'result': result_data['result'],
-        'multiplier': float(result_data['multiplier']),
-        'points_change': float(points_change),
-        'new_balance': float(user.balance),
-        'game_data': result_data.get('extra_data', {})
+        'result': game_session.result,
+        'multiplier': float(game_session.multiplier),
+        'points_change': float(game_session.points_change),
+        'new_balance': float(game_session.balance_after),
+        'game_data': result_data['extra_data'],
+        'nonce': game_session.nonce
     })
 
-def process_plinko(bet_amount, game_data):
-    """Process plinko game"""
-    multiplier = Decimal(str(game_data.get('multiplier', 0)))
-    won = game_data.get('won', False)
-    
-    if won and multiplier >= 1:
-        return {'result': 'win', 'multiplier': multiplier}
-    
-    return {'result': 'loss', 'multiplier': Decimal('0')}
+@api_view(['POST'])
+@player_required
+@idempotent('play_batch')
+def play_batch(request):
+    """Auto-bet: play up to ``rounds`` rounds of one bet in a single request.
 
-def process_slots(bet_amount):
-    """Process slots game"""
-    # Random outcome
-    rand = random.random()
+    Optional ``stop_loss`` / ``take_profit`` end the run once the net loss or
+    win reaches them; it also ends when the balance no longer covers the bet.
+    """
+    game_type = request.data.get('game_type')
+    game_data = request.data.get('game_data', {})
+    bet_amount = parse_points(request.data.get('bet_amount', 0))
+    limits = {}
+    for name in ('stop_loss', 'take_profit'):
+        if request.data.get(name) is not None:
+            limits[name] = parse_points(request.data[name])
+            if limits[name] is None or limits[name] <= 0:
+                return Response({'error': f'{name} must be a positive number'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        rounds = int(request.data.get('rounds', 0))
+    except (TypeError, ValueError):
+        rounds = 0
     
-    if rand < 0.01:  # 1% chance for jackpot
-        return {'result': 'win', 'multiplier': Decimal('10')}
-    elif rand < 0.05:  # 4% chance for 3x
-        return {'result': 'win', 'multiplier': Decimal('3')}
-    elif rand < 0.15:  # 10% chance for 1.5x
-        return {'result': 'win', 'multiplier': Decimal('1.5')}
+    if bet_amount is None or bet_amount <= 0:
+        return Response({'error': 'Bet amount must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= rounds <= MAX_BATCH_ROUNDS:
+        return Response({'error': f'rounds must be between 1 and {MAX_BATCH_ROUNDS}'}, status=status.HTTP_400_BAD_REQUEST)
     
-    return {'result': 'loss', 'multiplier': Decimal('0')}
-
-def process_wheel(bet_amount, game_data):
-    """Process wheel game"""
-    multiplier = Decimal(str(game_data.get('multiplier', 0)))
-    won = game_data.get('won', False)
+    if request.player.is_banned:
+        return Response({'error': 'Your account has been banned'}, status=status.HTTP_403_FORBIDDEN)
     
-    if won and multiplier > 0:
-        return {'result': 'win', 'multiplier': multiplier}
+    engine = get_engine(game_type)
+    if engine is None:
+        return Response({'error': 'Invalid game type'}, status=status.HTTP_400_BAD_REQUEST)
     
-    return {'result': 'loss', 'multiplier': Decimal('0')}
-
-def process_cards(bet_amount, game_data):
-    """Process cards game"""
-    won = game_data.get('won', False)
+    disabled = game_disabled(engine)
+    if disabled:
+        return disabled
     
-    if won:
-        return {'result': 'win', 'multiplier': Decimal('2.5')}
+    try:
+        game_sessions, results, stop_reason = settle_rounds(
+            request.player, engine, bet_amount, game_data, rounds, **limits
+        )
+    except (InvalidGameData, BetRejected) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except ExposureLimitReached:
+        return house_limit_response()
+    except InsufficientBalance:
+        return Response({'error': 'Insufficient balance'}, status=status.HTTP_400_BAD_REQUEST)
     
-    return {'result': 'loss', 'multiplier': Decimal('0')}
+    return Response({
+        'rounds': [
+            {
+                'result': game_session.result,
+                'multiplier': float(game_session.multiplier),
+                'points_change': float(game_session.points_change),
+                'balance_after': float(game_session.balance_after),
+                'game_data': result_data['extra_data'],
+                'nonce': game_session.nonce
+            }
+            for game_session, result_data in zip(game_sessions, results)
+        ],
+        'rounds_played': len(game_sessions),
+        'stop_reason': stop_reason,
+        'net': float(sum(game_session.points_change for game_session in game_sessions)),
+        'new_balance': float(game_sessions[-1].balance_after)
+    })
+
+
+def history_ndjson(sessions):
+    """One JSON line per round, as the history export streams them"""
+    return ''.join(json.dumps(GameSessionSerializer(session).data, cls=JSONEncoder) + '\n' for session in sessions)
 
-def process_mining(bet_amount, game_data):
-    """Process mining game"""
-    hit_mine = game_data.get('hit_mine', False)
-    revealed = game_data.get('revealed', 0)
-    mines = game_data.get('mines', 3)
-    
-    if not hit_mine and revealed > 0:
-        multiplier = Decimal('1.0') + (Decimal(str(revealed)) * Decimal('0.2') * (Decimal(str(mines)) / Decimal('3')))
-        return {'result': 'win', 'multiplier': multiplier}
-    
-    return {'result': 'loss', 'multiplier': Decimal('0')}
 
 @api_view(['GET'])
+@player_required
 def game_history(request, telegram_id):
-    """Get user game history"""
+    """Get user game history, newest first.
+
+    Pages with ``?before=<next_before>&limit=<n>``; ``?stream=1`` exports the
+    full history as NDJSON without loading it into memory.
+    """
+    sessions = GameSession.objects.filter(user_id=request.player.id).only(*HISTORY_FIELDS)
+    
+    if request.GET.get('stream'):
+        # Each handler only streams its own kind of iterator; the other is read into memory first
+        chunks = akeyset_chunks if isinstance(request._request, ASGIRequest) else keyset_chunks
+        response = StreamingHttpResponse(chunks(sessions, history_ndjson), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="history-{telegram_id}.ndjson"'
+        return response
+    
     try:
-        user = User.objects.get(telegram_id=telegram_id)
-        sessions = user.game_sessions.all()[:50]
-        serializer = GameSessionSerializer(sessions, many=True)
-        return Response(serializer.data)
-    except User.DoesNotExist:
-        return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+        limit = parse_limit(request.GET.get('limit'))
+        page, next_before = keyset_page(sessions, request.GET.get('before'), limit)
+    except InvalidCursor as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = GameSessionSerializer(page, many=True)
+    return Response({
+        'username': request.player.username,
+        'results': serializer.data,
+        'next_before': next_before
+    })
 
 
+@cache_control(public=True, max_age=STATUS_MAX_AGE)
+@condition(etag_func=lambda request: game_statuses()[1])
 @api_view(['GET'])
 def game_status(request):
-    """Get status of all games - all games always enabled"""
-    game_types = ['plinko', 'slots', 'wheel', 'cards', 'mining']
-    statuses = {}
+    """Get status and bet limits of all games; answers 304 to a matching If-None-Match"""
+    statuses, _ = game_statuses()
+    return Response(statuses)
+
+
+@api_view(['POST'])
+@admin_session_required
+def admin_update_game_config(request):
+    """Enable/disable a game or change its maintenance message, bet and payout limits or payout version"""
+    game_type = request.data.get('game_type')
+    if game_type not in ENGINES:
+        return Response({'error': 'Invalid game type'}, status=status.HTTP_400_BAD_REQUEST)
     
-    for game_type in game_types:
-        statuses[game_type] = {
-            'is_enabled': True,
-            'maintenance_message': ''
-        }
+    config, _ = GameConfig.objects.get_or_create(game_type=game_type)
+    if 'is_enabled' in request.data:
+        # true/false, or the strings a form or query would send ("false", "0", "off", ...)
+        try:
+            config.is_enabled = serializers.BooleanField().to_internal_value(request.data['is_enabled'])
+        except serializers.ValidationError:
+            return Response({'error': 'is_enabled must be true or false'}, status=status.HTTP_400_BAD_REQUEST)
+    if 'maintenance_message' in request.data:
+        config.maintenance_message = str(request.data['maintenance_message'])
+    for field in ('min_bet', 'max_bet', 'max_payout'):
+        if field in request.data:
+            value = request.data[field]
+            if value in (None, ''):
+                setattr(config, field, None)
+                continue
+            points = parse_points(value)
+            if points is None or points <= 0:
+                return Response({'error': f'{field} must be a positive number'}, status=status.HTTP_400_BAD_REQUEST)
+            setattr(config, field, points)
+    if config.min_bet is not None and config.max_bet is not None and config.min_bet > config.max_bet:
+        return Response({'error': 'min_bet cannot exceed max_bet'}, status=status.HTTP_400_BAD_REQUEST)
+    if request.data.get('bump_payout_version'):
+        config.payout_version += 1
     
-    return Response(statuses)
+    config.updated_by = admin_name(request.admin_id)
+    config.save()
+    return Response({'game_type': game_type, 'status': config_status(config)})
+
+
+@api_view(['GET'])
+@player_required
+def fairness_seed(request, telegram_id):
+    """Get the committed server seed hash, client seed and next nonce"""
+    seed = ServerSeed.objects.active_for(request.player)
+    return Response({
+        'server_seed_hash': seed.server_seed_hash,
+        'client_seed': seed.client_seed,
+        'next_nonce': User.objects.values_list('games_played', flat=True).get(pk=request.player.id)
+    })
+
+
+@api_view(['POST'])
+@player_required
+def rotate_seed(request):
+    """Reveal the current server seed and commit to a new one"""
+    client_seed = str(request.data.get('client_seed', '')).strip()
+    
+    if not client_seed or len(client_seed) > 64:
+        return Response({'error': 'client_seed must be 1-64 characters'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    with transaction.atomic():
+        # The user's row lock orders this against settle_rounds, so no round is drawn from a revealed seed
+        User.objects.select_for_update().filter(pk=request.player.id).values_list('pk', flat=True).get()
+        previous = ServerSeed.objects.select_for_update().filter(user_id=request.player.id, is_active=True).first()
+        if previous:
+            previous.is_active = False
+            previous.revealed_at = timezone.now()
+            previous.save(update_fields=['is_active', 'revealed_at'])
+        
+        server_seed = new_server_seed()
+        seed = ServerSeed.objects.create(
+            user_id=request.player.id,
+            server_seed=server_seed,
+            server_seed_hash=hash_seed(server_seed),
+            client_seed=client_seed
+        )
+    
+    return Response({
+        'previous_server_seed': previous.server_seed if previous else None,
+        'previous_server_seed_hash': previous.server_seed_hash if previous else None,
+        'previous_client_seed': previous.client_seed if previous else None,
+        'server_seed_hash': seed.server_seed_hash,
+        'client_seed': seed.client_seed,
+        'next_nonce': User.objects.values_list('games_played', flat=True).get(pk=request.player.id)
+    })
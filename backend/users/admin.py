@@ -1,58 +1,94 @@
+from decimal import Decimal
+from django import forms
 from django.contrib import admin
-from django.utils import timezone
+from django.contrib.admin.helpers import ActionForm
 from django.contrib import messages
-from .models import User, Deposit, Withdrawal
+from .models import User, Deposit, Withdrawal, LedgerEntry, OutboundMessage
+from . import balances
+from .balances import adjust_balances_where, advance_requests, parse_points
+from .outbox import DEPOSIT_REJECTED, WITHDRAWAL_APPROVED, WITHDRAWAL_PAID
+from .players import set_banned
+
+class BalanceActionForm(ActionForm):
+    amount = forms.DecimalField(required=False, max_digits=12, decimal_places=2, help_text="Points for \"Adjust balance\"")
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
-    list_display = ['telegram_id', 'username', 'balance', 'games_played', 'is_active', 'is_banned', 'created_at']
-    list_filter = ['is_active', 'is_banned', 'created_at']
+    action_form = BalanceActionForm
+    list_display = ['telegram_id', 'username', 'balance', 'games_played', 'is_active', 'is_banned', 'is_admin', 'created_at']
+    list_filter = ['is_active', 'is_banned', 'is_admin', 'created_at']
     search_fields = ['telegram_id', 'username', 'first_name', 'last_name']
-    readonly_fields = ['created_at', 'updated_at', 'last_login', 'total_wagered', 'total_won', 'total_lost', 'games_played']
+    # Balances change only through the actions below, which lock and record them in the ledger
+    readonly_fields = ['balance', 'created_at', 'updated_at', 'last_login', 'total_wagered', 'total_won', 'total_lost', 'games_played', 'games_won']
     
     fieldsets = (
         ('User Info', {
             'fields': ('telegram_id', 'username', 'first_name', 'last_name')
         }),
         ('Balance & Stats', {
-            'fields': ('balance', 'total_wagered', 'total_won', 'total_lost', 'games_played')
+            'fields': ('balance', 'total_wagered', 'total_won', 'total_lost', 'games_played', 'games_won')
         }),
         ('Status', {
-            'fields': ('is_active', 'is_banned')
+            'fields': ('is_active', 'is_banned', 'is_admin')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at', 'last_login')
         }),
     )
     
-    actions = ['add_points', 'remove_points', 'ban_users', 'unban_users']
+    actions = ['add_points', 'remove_points', 'adjust_balance', 'ban_users', 'unban_users']
+    
+    def save_model(self, request, obj, form, change):
+        if not change:
+            super().save_model(request, obj, form, change)
+            return
+        # Write only the edited fields, so balances and counters changed meanwhile by play are kept
+        if form.changed_data:
+            obj.save(update_fields=[*form.changed_data, 'updated_at'])
     
     def add_points(self, request, queryset):
-        points = 100  # You can make this dynamic
-        for user in queryset:
-            user.balance += points
-            user.save()
-        self.message_user(request, f"Added {points} points to {queryset.count()} users", messages.SUCCESS)
+        points = Decimal('100')  # You can make this dynamic
+        adjusted = adjust_balances_where(queryset, points, f'admin:{request.user.username}')
+        self.message_user(request, f"Added {points} points to {adjusted} users", messages.SUCCESS)
     add_points.short_description = "Add 100 points to selected users"
     
     def remove_points(self, request, queryset):
-        points = 100
-        for user in queryset:
-            user.balance = max(0, user.balance - points)
-            user.save()
-        self.message_user(request, f"Removed {points} points from {queryset.count()} users", messages.SUCCESS)
+        points = Decimal('100')
+        adjusted = adjust_balances_where(queryset, -points, f'admin:{request.user.username}')
+        self.message_user(request, f"Removed {points} points from {adjusted} users", messages.SUCCESS)
     remove_points.short_description = "Remove 100 points from selected users"
     
+    def adjust_balance(self, request, queryset):
+        points = parse_points(request.POST.get('amount'))
+        if points is None:
+            self.message_user(request, "Enter the amount of points to add (negative to remove)", messages.ERROR)
+            return
+        adjusted = adjust_balances_where(queryset, points, f'admin:{request.user.username}')
+        self.message_user(request, f"Adjusted {adjusted} balances by {points} points", messages.SUCCESS)
+    adjust_balance.short_description = "Adjust balance of selected users by the amount entered"
+    
     def ban_users(self, request, queryset):
-        queryset.update(is_banned=True, is_active=False)
-        self.message_user(request, f"Banned {queryset.count()} users", messages.WARNING)
+        banned = set_banned(queryset, True)
+        self.message_user(request, f"Banned {banned} users", messages.WARNING)
     ban_users.short_description = "Ban selected users"
     
     def unban_users(self, request, queryset):
-        queryset.update(is_banned=False, is_active=True)
-        self.message_user(request, f"Unbanned {queryset.count()} users", messages.SUCCESS)
+        unbanned = set_banned(queryset, False)
+        self.message_user(request, f"Unbanned {unbanned} users", messages.SUCCESS)
     unban_users.short_description = "Unban selected users"
 
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'kind', 'amount', 'reference', 'created_at']
+    list_filter = ['kind', 'created_at']
+    search_fields = ['user__telegram_id', 'user__username', 'reference']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
 @admin.register(Deposit)
 class DepositAdmin(admin.ModelAdmin):
     list_display = ['id', 'user', 'amount', 'points', 'status', 'created_at', 'processed_at']
@@ -75,26 +111,13 @@ class DepositAdmin(admin.ModelAdmin):
     actions = ['approve_deposits', 'reject_deposits']
     
     def approve_deposits(self, request, queryset):
-        for deposit in queryset.filter(status='pending'):
-            deposit.status = 'approved'
-            deposit.processed_at = timezone.now()
-            deposit.processed_by = request.user.username
-            deposit.save()
-            
-            # Add points to user
-            deposit.user.balance += deposit.points
-            deposit.user.save()
-        
-        self.message_user(request, f"Approved {queryset.count()} deposits", messages.SUCCESS)
+        processed, skipped = balances.approve_deposits(queryset, request.user.username)
+        self.message_user(request, f"Approved {processed} deposits, skipped {skipped} already processed or in progress", messages.SUCCESS)
     approve_deposits.short_description = "Approve selected deposits"
     
     def reject_deposits(self, request, queryset):
-        queryset.filter(status='pending').update(
-            status='rejected',
-            processed_at=timezone.now(),
-            processed_by=request.user.username
-        )
-        self.message_user(request, f"Rejected {queryset.count()} deposits", messages.WARNING)
+        rejected = advance_requests(queryset, 'pending', 'rejected', DEPOSIT_REJECTED, processed_by=request.user.username)
+        self.message_user(request, f"Rejected {rejected} deposits", messages.WARNING)
     reject_deposits.short_description = "Reject selected deposits"
 
 @admin.register(Withdrawal)
@@ -119,32 +142,25 @@ class WithdrawalAdmin(admin.ModelAdmin):
     actions = ['approve_withdrawals', 'reject_withdrawals', 'mark_as_paid']
     
     def approve_withdrawals(self, request, queryset):
-        queryset.filter(status='pending').update(
-            status='approved',
-            processed_at=timezone.now(),
-            processed_by=request.user.username
+        approved = advance_requests(
+            queryset, 'pending', 'approved', WITHDRAWAL_APPROVED, processed_by=request.user.username
         )
-        self.message_user(request, f"Approved {queryset.count()} withdrawals", messages.SUCCESS)
+        self.message_user(request, f"Approved {approved} withdrawals", messages.SUCCESS)
     approve_withdrawals.short_description = "Approve selected withdrawals"
     
     def reject_withdrawals(self, request, queryset):
-        for withdrawal in queryset.filter(status='pending'):
-            withdrawal.status = 'rejected'
-            withdrawal.processed_at = timezone.now()
-            withdrawal.processed_by = request.user.username
-            withdrawal.save()
-            
-            # Refund points to user
-            withdrawal.user.balance += withdrawal.points
-            withdrawal.user.save()
-        
-        self.message_user(request, f"Rejected {queryset.count()} withdrawals", messages.WARNING)
+        processed, skipped = balances.reject_withdrawals(queryset, request.user.username)
+        self.message_user(request, f"Rejected and refunded {processed} withdrawals, skipped {skipped} already processed or in progress", messages.WARNING)
     reject_withdrawals.short_description = "Reject selected withdrawals"
     
     def mark_as_paid(self, request, queryset):
-        queryset.filter(status='approved').update(
-            status='paid',
-            processed_at=timezone.now()
-        )
-        self.message_user(request, f"Marked {queryset.count()} withdrawals as paid", messages.SUCCESS)
+        paid = advance_requests(queryset, 'approved', 'paid', WITHDRAWAL_PAID)
+        self.message_user(request, f"Marked {paid} withdrawals as paid", messages.SUCCESS)
     mark_as_paid.short_description = "Mark as paid"
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'telegram_id', 'status', 'attempts', 'send_after', 'created_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['telegram_id']
+    readonly_fields = ['attempts', 'error', 'created_at', 'sent_at']
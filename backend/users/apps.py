@@ -3,3 +3,16 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        from django.db.models.signals import post_save, post_delete
+        from .models import User
+        from .permissions import admin_saved, admin_deleted
+        from .players import player_saved
+        from .snapshots import user_saved
+        post_save.connect(admin_saved, sender=User, dispatch_uid='users.admin_saved')
+        post_delete.connect(admin_deleted, sender=User, dispatch_uid='users.admin_deleted')
+        post_save.connect(user_saved, sender=User, dispatch_uid='users.snapshot_saved')
+        post_delete.connect(user_saved, sender=User, dispatch_uid='users.snapshot_deleted')
+        post_save.connect(player_saved, sender=User, dispatch_uid='users.player_saved')
+        post_delete.connect(player_saved, sender=User, dispatch_uid='users.player_deleted')
@@ -0,0 +1,251 @@
+"""Set-based balance changes for many users at once.
+
+Each batch locks its rows, applies ``balance = GREATEST(balance + delta, 0)``
+in one UPDATE and records the amounts actually applied as ledger entries in
+one bulk insert, so crediting a large audience costs a few statements per
+``BATCH_SIZE`` users instead of a save per user. Deposit approvals and
+withdrawal refunds work the same way, batch by batch of requests. The new
+balances are written through to the cached snapshots and pushed to the
+users' WebSocket channels once each batch commits; processed requests also
+queue a Telegram notification to their owner.
+"""
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Count, DecimalField, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.lookups import LessThan
+from django.utils import timezone
+from .models import User, LedgerEntry, Withdrawal
+from .events import publish_balances, publish_request
+from .outbox import DEPOSIT_APPROVED, WITHDRAWAL_REFUNDED, queue_messages
+from .snapshots import update_snapshots
+
+ZERO = Decimal('0')
+CENT = Decimal('0.01')
+BATCH_SIZE = 1000
+
+
+class InsufficientBalance(Exception):
+    """Raised when the balance does not cover a withdrawal"""
+
+
+class PendingWithdrawalLimit(Exception):
+    """Raised when the user already has ``MAX_PENDING_WITHDRAWALS`` pending withdrawals"""
+
+
+def parse_points(value):
+    """Points from request or form data as a 2-place Decimal, or None if not a finite number"""
+    try:
+        points = Decimal(str(value)).quantize(CENT)
+    except (InvalidOperation, ValueError):
+        return None
+    return points if points.is_finite() else None
+
+
+def _adjust_batch(pks, delta_for, apply, reference):
+    """Lock ``pks``, run ``apply(users, now)`` to update them and record what changed"""
+    users = User.objects.filter(pk__in=pks)
+    now = timezone.now()
+    with transaction.atomic():
+        # Locking in pk order keeps concurrent batches from deadlocking
+        locked = list(users.select_for_update().order_by('pk').values_list('pk', 'telegram_id', 'balance'))
+        apply(users, now)
+        new_balances = {pk: max(balance + delta_for(pk), ZERO) for pk, _, balance in locked}
+        LedgerEntry.objects.record(
+            LedgerEntry(user_id=pk, kind='adjustment', amount=new_balances[pk] - balance, reference=reference)
+            for pk, _, balance in locked
+        )
+        update_snapshots({
+            telegram_id: {'balance': new_balances[pk], 'updated_at': now}
+            for pk, telegram_id, _ in locked
+        })
+        publish_balances({telegram_id: new_balances[pk] for pk, telegram_id, _ in locked}, 'adjustment')
+    return len(locked)
+
+
+def _update_per_user(users, deltas, now):
+    """Apply ``{pk: delta}`` to ``users`` in one UPDATE"""
+    pks = list(deltas)
+    if connection.vendor == 'postgresql':
+        # A VALUES join stays linear where a CASE is compared row by row
+        table = connection.ops.quote_name(User._meta.db_table)
+        rows = ', '.join(['(%s, %s::numeric)'] * len(pks))
+        params = [value for pk in pks for value in (pk, deltas[pk])]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET balance = GREATEST({table}.balance + v.delta, 0), updated_at = %s '
+                f'FROM (VALUES {rows}) AS v(id, delta) WHERE {table}.id = v.id',
+                [now, *params]
+            )
+        return
+    by_delta = {}
+    for pk in pks:
+        by_delta.setdefault(deltas[pk], []).append(pk)
+    delta = Case(
+        *[When(pk__in=group, then=Value(value)) for value, group in by_delta.items()],
+        output_field=DecimalField(max_digits=12, decimal_places=2)
+    )
+    users.update(balance=Greatest(F('balance') + delta, Value(ZERO)), updated_at=now)
+
+
+def adjust_balances(deltas, reference, batch_size=BATCH_SIZE):
+    """Add ``{user_id: Decimal delta}`` to balances, never below zero; returns users adjusted"""
+    pks = sorted(deltas)
+    adjusted = 0
+    for start in range(0, len(pks), batch_size):
+        batch = {pk: deltas[pk] for pk in pks[start:start + batch_size]}
+        adjusted += _adjust_batch(batch, batch.get, lambda users, now: _update_per_user(users, batch, now), reference)
+    return adjusted
+
+
+def adjust_balances_where(queryset, amount, reference, batch_size=BATCH_SIZE):
+    """Add ``amount`` to the balance of every user in ``queryset``, never below zero; returns users adjusted"""
+    last_pk = 0
+    adjusted = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return adjusted
+        adjusted += _adjust_batch(
+            batch,
+            lambda pk: amount,
+            lambda users, now: users.update(balance=Greatest(F('balance') + amount, Value(ZERO)), updated_at=now),
+            reference
+        )
+        last_pk = batch[-1]
+
+
+def _credit_pending(queryset, status, kind, notice, processed_by, batch_size):
+    """Move the pending requests in ``queryset`` to ``status``, credit their points and send ``notice``.
+
+    Returns ``(processed, skipped)``: selected requests that were not pending,
+    or were locked by a concurrent run, are skipped.
+    """
+    model = queryset.model
+    selected = queryset.count()
+    processed = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            requests = list(
+                queryset.filter(status='pending', pk__gt=last_pk)
+                .select_for_update(skip_locked=True, of=('self',))
+                .order_by('pk')
+                .values_list('pk', 'user_id', 'points')[:batch_size]
+            )
+            if not requests:
+                return processed, selected - processed
+            
+            now = timezone.now()
+            model.objects.filter(pk__in=[pk for pk, _, _ in requests]).update(
+                status=status,
+                processed_at=now,
+                processed_by=processed_by
+            )
+            credits = {}
+            for _, user_id, points in requests:
+                credits[user_id] = credits.get(user_id, ZERO) + points
+            users = User.objects.filter(pk__in=credits)
+            locked = list(users.select_for_update().order_by('pk').values_list('pk', 'telegram_id', 'balance'))
+            _update_per_user(users, credits, now)
+            new_balances = {telegram_id: max(balance + credits[pk], ZERO) for pk, telegram_id, balance in locked}
+            update_snapshots({
+                telegram_id: {'balance': new_balance, 'updated_at': now}
+                for telegram_id, new_balance in new_balances.items()
+            })
+            publish_balances(new_balances, kind)
+            LedgerEntry.objects.record(
+                LedgerEntry(user_id=user_id, kind=kind, amount=points, reference=f'{model._meta.model_name}:{pk}')
+                for pk, user_id, points in requests
+            )
+            telegram_ids = {pk: telegram_id for pk, telegram_id, _ in locked}
+            queue_messages(
+                (
+                    telegram_ids[user_id],
+                    notice.format(points=points, balance=new_balances[telegram_ids[user_id]]),
+                )
+                for _, user_id, points in requests
+            )
+        processed += len(requests)
+        last_pk = requests[-1][0]
+
+
+def advance_requests(queryset, from_status, to_status, notice, **fields):
+    """Move the requests in ``queryset`` from ``from_status`` to ``to_status`` and queue ``notice`` to each owner.
+
+    For status changes that move no points (approving or paying a
+    withdrawal, rejecting a deposit). The rows are locked and the UPDATE is
+    conditional on the status, so of two admins acting at once only one
+    moves a request; returns how many were moved.
+    """
+    fields.update(status=to_status, processed_at=timezone.now())
+    with transaction.atomic():
+        requests = list(
+            queryset.filter(status=from_status)
+            .select_for_update(of=('self',))
+            .order_by('pk')
+            .values_list('pk', 'user__telegram_id', 'points', 'amount')
+        )
+        moved = queryset.model.objects.filter(pk__in=[pk for pk, _, _, _ in requests], status=from_status).update(**fields)
+        queue_messages(
+            (telegram_id, notice.format(points=points, amount=amount)) for _, telegram_id, points, amount in requests
+        )
+    return moved
+
+
+def approve_deposits(queryset, processed_by, batch_size=BATCH_SIZE):
+    """Approve the pending deposits in ``queryset``, crediting their points; returns ``(processed, skipped)``"""
+    return _credit_pending(queryset, 'approved', 'deposit', DEPOSIT_APPROVED, processed_by, batch_size)
+
+
+def reject_withdrawals(queryset, processed_by, batch_size=BATCH_SIZE):
+    """Reject the pending withdrawals in ``queryset``, refunding their points; returns ``(processed, skipped)``"""
+    return _credit_pending(queryset, 'rejected', 'refund', WITHDRAWAL_REFUNDED, processed_by, batch_size)
+
+
+def create_withdrawal(user_pk, points, payment_method, payment_details):
+    """Deduct ``points`` and create the pending ``Withdrawal`` in one transaction.
+
+    The user row is locked first, so concurrent requests for one account
+    queue; the deduction is then a single UPDATE conditional on both the
+    balance and the number of pending withdrawals, and the withdrawal and its
+    ledger entry are inserted before the lock is released.
+    """
+    pending = (
+        Withdrawal.objects.filter(user=OuterRef('pk'), status='pending')
+        .order_by()
+        .values('user')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    with transaction.atomic():
+        telegram_id, balance = (
+            User.objects.select_for_update().filter(pk=user_pk).values_list('telegram_id', 'balance').get()
+        )
+        now = timezone.now()
+        updated = (
+            User.objects.filter(pk=user_pk, balance__gte=points)
+            .filter(LessThan(Coalesce(Subquery(pending), 0), settings.MAX_PENDING_WITHDRAWALS))
+            .update(balance=F('balance') - points, updated_at=now)
+        )
+        if not updated:
+            if balance < points:
+                raise InsufficientBalance()
+            raise PendingWithdrawalLimit()
+        update_snapshots({telegram_id: {'balance': balance - points, 'updated_at': now}})
+        publish_balances({telegram_id: balance - points}, 'withdrawal')
+        
+        # 1 point = 1 Birr
+        withdrawal = Withdrawal.objects.create(
+            user_id=user_pk,
+            points=points,
+            amount=points * settings.POINTS_TO_CURRENCY_RATE,
+            payment_method=payment_method,
+            payment_details=payment_details
+        )
+        LedgerEntry.objects.record([
+            LedgerEntry(user_id=user_pk, kind='withdrawal', amount=-points, reference=f'withdrawal:{withdrawal.pk}')
+        ])
+        publish_request('withdrawal', withdrawal, telegram_id)
+    return withdrawal
@@ -0,0 +1,58 @@
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from .events import ADMIN_GROUP, user_group
+from .permissions import is_admin_player
+from .players import get_player
+from .webapp_auth import read_session_token
+
+# Close code sent when a channel is refused
+CLOSE_UNAUTHORIZED = 4403
+
+
+def _token(scope):
+    return parse_qs(scope['query_string'].decode()).get('token', [''])[0]
+
+
+def _is_admin_session(token):
+    session = read_session_token(token)
+    return session is not None and is_admin_player(get_player(session['tg']))
+
+
+class EventsConsumer(AsyncJsonWebsocketConsumer):
+    """Forwards the events published to ``self.group`` to the client"""
+    group = None
+
+    async def join(self, group):
+        self.group = group
+        await self.channel_layer.group_add(group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if self.group is not None:
+            await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def push(self, message):
+        await self.send_json(message['event'])
+
+
+class UserEventsConsumer(EventsConsumer):
+    """Balance changes and settled rounds of one user, for their session token (``?token=``)"""
+
+    async def connect(self):
+        telegram_id = self.scope['url_route']['kwargs']['telegram_id']
+        session = read_session_token(_token(self.scope))
+        if session is None or session['tg'] != telegram_id:
+            await self.close(code=CLOSE_UNAUTHORIZED)
+            return
+        await self.join(user_group(telegram_id))
+
+
+class AdminEventsConsumer(EventsConsumer):
+    """New deposit and withdrawal requests, for an unbanned admin's session token (``?token=``)"""
+
+    async def connect(self):
+        if not await database_sync_to_async(_is_admin_session)(_token(self.scope)):
+            await self.close(code=CLOSE_UNAUTHORIZED)
+            return
+        await self.join(ADMIN_GROUP)
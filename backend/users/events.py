@@ -0,0 +1,91 @@
+"""Real-time events pushed to WebSocket clients.
+
+Each user has a channel group for balance changes and settled rounds, and
+admins share one for new deposit and withdrawal requests (see
+``users.consumers``). Events are published once the transaction that
+caused them commits, and everything one commit publishes goes out in a
+single trip to the channel layer. Publishing never fails the request: the
+REST endpoints stay the source of truth and clients re-sync from them.
+"""
+import asyncio
+import logging
+from functools import partial
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+ADMIN_GROUP = 'admins'
+
+
+def user_group(telegram_id):
+    return f'user.{telegram_id}'
+
+
+async def _send_all(layer, messages):
+    results = await asyncio.gather(
+        *[layer.group_send(group, {'type': 'push', 'event': event}) for group, event in messages],
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+
+
+def send(messages):
+    """Send ``[(group, event)]`` now; returns False if the channel layer failed"""
+    layer = get_channel_layer()
+    if layer is None or not messages:
+        return True
+    try:
+        async_to_sync(_send_all)(layer, messages)
+    except Exception:
+        logger.exception('Publishing %d events failed', len(messages))
+        return False
+    return True
+
+
+def publish(messages):
+    """Send ``[(group, event)]`` once the current transaction commits"""
+    transaction.on_commit(partial(send, list(messages)))
+
+
+def publish_balances(balances, reason):
+    """Tell each user in ``{telegram_id: balance}`` their new balance"""
+    publish(
+        (user_group(telegram_id), {'type': 'balance', 'balance': str(balance), 'reason': reason})
+        for telegram_id, balance in balances.items()
+    )
+
+
+def publish_rounds(telegram_id, sessions):
+    """Tell the user about rounds just settled, and their balance after them"""
+    publish([(user_group(telegram_id), {
+        'type': 'rounds',
+        'game_type': sessions[0].game_type,
+        'rounds': [
+            {
+                'id': session.pk,
+                'nonce': session.nonce,
+                'result': session.result,
+                'multiplier': str(session.multiplier),
+                'points_change': str(session.points_change),
+                'balance_after': str(session.balance_after),
+            }
+            for session in sessions
+        ],
+        'balance': str(sessions[-1].balance_after),
+    })])
+
+
+def publish_request(kind, request, telegram_id):
+    """Tell admins about a new pending ``deposit`` or ``withdrawal``"""
+    publish([(ADMIN_GROUP, {
+        'type': kind,
+        'id': request.pk,
+        'telegram_id': telegram_id,
+        'points': str(request.points),
+        'amount': str(request.amount),
+        'created_at': request.created_at.isoformat(),
+    })])
@@ -0,0 +1,90 @@
+"""``Idempotency-Key`` support for POST endpoints that move points.
+
+Keys are the player's: the same key from two players is two requests.
+The first request with a key runs inside a transaction that also inserts the
+key's row, so its effects and its stored response commit together. A retry
+with the same key and body gets the stored response back from one indexed
+lookup; a concurrent duplicate waits on the unique index and then replays.
+5xx responses and exceptions roll back, leaving the key free for a retry.
+Rows older than ``IDEMPOTENCY_KEY_TTL`` are ignored and removed by
+``purge_idempotency_keys``.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from .models import IdempotencyKey
+
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+KEY_MAX_LENGTH = 64
+
+
+def _request_hash(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _replay(record, request_hash):
+    if record.request_hash != request_hash:
+        return Response(
+            {'error': 'Idempotency-Key was already used for a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    response = Response(record.response, status=record.status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(endpoint):
+    """Honor an ``Idempotency-Key`` header on the view; use below ``@player_required``.
+
+    Keys are scoped to ``request.player``, so players cannot replay each other's responses.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key = request.headers.get('Idempotency-Key')
+            if not key:
+                return view(request, *args, **kwargs)
+            if len(key) > KEY_MAX_LENGTH:
+                return Response(
+                    {'error': f'Idempotency-Key must be at most {KEY_MAX_LENGTH} characters'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            request_hash = _request_hash(request)
+            user_id = request.player.id
+            keys = IdempotencyKey.objects.filter(user_id=user_id, endpoint=endpoint, key=key)
+            record = keys.first()
+            if record is not None:
+                if record.created_at >= timezone.now() - IDEMPOTENCY_KEY_TTL:
+                    return _replay(record, request_hash)
+                keys.delete()
+            
+            with transaction.atomic():
+                try:
+                    with transaction.atomic():
+                        record = IdempotencyKey.objects.create(
+                            user_id=user_id, endpoint=endpoint, key=key, request_hash=request_hash
+                        )
+                except IntegrityError:
+                    record = None
+                
+                if record is not None:
+                    response = view(request, *args, **kwargs)
+                    if response.status_code >= 500:
+                        transaction.set_rollback(True)
+                        return response
+                    record.status_code = response.status_code
+                    record.response = response.data
+                    record.save(update_fields=['status_code', 'response'])
+                    return response
+            
+            # A concurrent request with this key committed first
+            return _replay(keys.get(), request_hash)
+        return wrapper
+    return decorator
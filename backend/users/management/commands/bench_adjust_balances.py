@@ -0,0 +1,40 @@
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from users.models import User, LedgerEntry
+from users.balances import adjust_balances, adjust_balances_where
+
+# Bench accounts get telegram IDs below this, away from real ones
+BENCH_TELEGRAM_ID_BASE = -1_000_000
+
+
+class Command(BaseCommand):
+    help = 'Time crediting many users with a filter plus an amount, and with per-user deltas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = options['users']
+        bench_users = User.objects.filter(telegram_id__lte=BENCH_TELEGRAM_ID_BASE)
+        bench_users.delete()
+        User.objects.bulk_create(
+            (User(telegram_id=BENCH_TELEGRAM_ID_BASE - i, username=f'bench{i}') for i in range(count)),
+            batch_size=5000
+        )
+
+        try:
+            start = time.perf_counter()
+            adjusted = adjust_balances_where(bench_users, Decimal('10'), 'bench', options['batch_size'])
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f'filter + amount: {adjusted} users in {elapsed:.2f}s ({adjusted / elapsed:,.0f} users/sec)')
+
+            deltas = {pk: Decimal(pk % 7 - 3) for pk in bench_users.values_list('pk', flat=True)}
+            start = time.perf_counter()
+            adjusted = adjust_balances(deltas, 'bench', options['batch_size'])
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f'per-user deltas: {adjusted} users in {elapsed:.2f}s ({adjusted / elapsed:,.0f} users/sec)')
+        finally:
+            LedgerEntry.objects.filter(user__in=bench_users).delete()
+            bench_users.delete()
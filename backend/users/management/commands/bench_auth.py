@@ -0,0 +1,71 @@
+import itertools
+import time
+from collections import Counter
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from users.models import User
+from users.webapp_auth import sign_init_data, validate_init_data
+
+BENCH_TELEGRAM_ID_BASE = 4 * 10 ** 12
+BENCH_BOT_TOKEN = '1:bench'
+
+
+class Command(BaseCommand):
+    help = (
+        'Open the web app many times as a few users (POST /api/user/auth/ with Telegram-signed '
+        'initData) and report sign-ins/sec, database writes per sign-in and the cost of checking '
+        'the signature'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--launches', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        ids = [BENCH_TELEGRAM_ID_BASE + i for i in range(options['users'])]
+        User.objects.filter(telegram_id__in=ids).delete()
+        init_data = {
+            telegram_id: sign_init_data(
+                {'id': telegram_id, 'first_name': 'bench', 'username': f'bench{telegram_id}'}, BENCH_BOT_TOKEN
+            )
+            for telegram_id in ids
+        }
+        client = Client()
+        # Statements run, by their first word
+        statements = Counter()
+
+        def count(execute, sql, params, many, context):
+            statements[sql.split(None, 1)[0].upper()] += 1
+            return execute(sql, params, many, context)
+
+        try:
+            with override_settings(TELEGRAM_BOT_TOKEN=BENCH_BOT_TOKEN, DEBUG=False), \
+                    connection.execute_wrapper(count):
+                start = time.perf_counter()
+                for _, telegram_id in zip(range(options['launches']), itertools.cycle(ids)):
+                    response = client.post(
+                        '/api/user/auth/', {'init_data': init_data[telegram_id]}, content_type='application/json'
+                    )
+                    assert response.status_code == 200, response.content
+                elapsed = time.perf_counter() - start
+
+            launches = options['launches']
+            writes = statements['INSERT'] + statements['UPDATE']
+            self.stdout.write(
+                f'{launches} sign-ins by {len(ids)} users in {elapsed:.2f}s ({launches / elapsed:,.0f}/sec)'
+            )
+            self.stdout.write(
+                f'Writes: {writes} ({statements["INSERT"]} new users, {statements["UPDATE"]} updates), '
+                f'{writes / launches:.3f} per sign-in; {sum(statements.values()) / launches:.2f} statements '
+                f'per sign-in ({dict(statements)})'
+            )
+
+            sample = init_data[ids[0]]
+            rounds = 10_000
+            start = time.perf_counter()
+            for _ in range(rounds):
+                validate_init_data(sample, BENCH_BOT_TOKEN)
+            self.stdout.write(f'initData check: {(time.perf_counter() - start) / rounds * 1e6:.1f}µs')
+        finally:
+            User.objects.filter(telegram_id__in=ids).delete()
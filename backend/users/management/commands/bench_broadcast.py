@@ -0,0 +1,68 @@
+import asyncio
+import time
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from users.models import OutboundMessage, User
+from users.outbox import queue_broadcast
+
+# Bench users use telegram IDs from here up, away from real ones
+BENCH_TELEGRAM_ID_BASE = 3 * 10 ** 12
+
+
+class Command(BaseCommand):
+    help = (
+        'Queue a broadcast to many bench users and send it through the bot\'s outbound sender to '
+        'a local fake Telegram that enforces the same rate limit, reporting the rate achieved and '
+        'how often the fake answered 429'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=3000)
+        parser.add_argument('--rate', type=float, default=30, help='Messages per second (Telegram allows about 30)')
+        parser.add_argument('--blocked', type=int, default=10, help='Users who blocked the bot (their messages fail)')
+        parser.add_argument('--reply-latency', type=float, default=20, help='Fake Telegram API latency in ms')
+
+    def handle(self, *args, **options):
+        from fake_telegram import FakeTelegram
+
+        ids = [BENCH_TELEGRAM_ID_BASE + i for i in range(options['users'])]
+        User.objects.filter(telegram_id__in=ids).delete()
+        User.objects.bulk_create(
+            (User(telegram_id=telegram_id, username=f'bench{telegram_id}') for telegram_id in ids), batch_size=5000
+        )
+        messages = OutboundMessage.objects.filter(telegram_id__gte=ids[0], telegram_id__lte=ids[-1])
+        try:
+            start = time.perf_counter()
+            queued = queue_broadcast('📣 Bench broadcast', User.objects.filter(telegram_id__gte=ids[0]))
+            self.stdout.write(f'Queued {queued} messages in {time.perf_counter() - start:.2f}s')
+
+            server = FakeTelegram(
+                latency=options['reply_latency'] / 1000, rate_limit=int(options['rate']), chat_interval=1
+            )
+            server.blocked_chats.update(ids[:options['blocked']])
+            with server, override_settings(TELEGRAM_API_URL=server.url):
+                elapsed, throttled = asyncio.run(self.send(messages, options['rate']))
+
+            sent = messages.filter(status='sent').count()
+            failed = messages.filter(status='failed').count()
+            self.stdout.write(
+                f'Sent {sent} in {elapsed:.2f}s ({sent / elapsed:.1f}/s against a limit of {options["rate"]:g}/s), '
+                f'{failed} failed (blocked), {server.throttled} answered 429, {throttled} sends retried after a 429'
+            )
+        finally:
+            messages.delete()
+            User.objects.filter(telegram_id__gte=ids[0], telegram_id__lte=ids[-1]).delete()
+
+    async def send(self, messages, rate):
+        import bot
+
+        sender = bot.OutboundSender(rate)
+        application = bot.build_application('1:bench', webhook=True)
+        async with application.bot:
+            start = time.perf_counter()
+            task = asyncio.create_task(sender.run(application.bot))
+            while await bot.run_db(messages.filter(status='pending').exists):
+                await asyncio.sleep(0.2)
+            elapsed = time.perf_counter() - start
+            task.cancel()
+        return elapsed, sender.throttled
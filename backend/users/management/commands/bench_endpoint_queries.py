@@ -0,0 +1,73 @@
+import re
+from collections import Counter
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from users.models import User
+
+BENCH_TELEGRAM_ID = 6 * 10 ** 12
+USER_LOOKUP = re.compile(r'^SELECT .* FROM "users" ')
+
+
+class Command(BaseCommand):
+    help = (
+        'Sign a bench user in, call every player endpoint with the session token and count the '
+        'SQL statements each one runs, and how many of them read the user row, once caches are warm'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-token', action='store_true', help='Name the user by telegram_id instead')
+
+    def handle(self, *args, **options):
+        telegram_id = BENCH_TELEGRAM_ID
+        User.objects.filter(telegram_id=telegram_id).delete()
+        user = User.objects.create(telegram_id=telegram_id, username='bench', balance=100_000)
+        client = Client()
+        # Statements of the request being measured, by first word, plus user lookups
+        statements = Counter()
+
+        def count(execute, sql, params, many, context):
+            statements[sql.split(None, 1)[0].upper()] += 1
+            if USER_LOOKUP.match(sql):
+                statements['user lookups'] += 1
+            return execute(sql, params, many, context)
+
+        endpoints = [
+            ('GET', f'/api/user/{telegram_id}/balance/', None),
+            ('GET', f'/api/user/{telegram_id}/stats/', None),
+            ('GET', f'/api/user/{telegram_id}/deposits/', None),
+            ('GET', f'/api/user/{telegram_id}/withdrawals/', None),
+            ('GET', f'/games/api/history/{telegram_id}/', None),
+            ('GET', f'/games/api/fairness/{telegram_id}/', None),
+            ('POST', '/games/api/play/', {'game_type': 'slots', 'bet_amount': 10}),
+            ('POST', '/games/api/play/batch/', {'game_type': 'slots', 'bet_amount': 10, 'rounds': 10}),
+            ('POST', '/api/user/deposit/', {'amount': 100, 'points': 100}),
+            ('POST', '/api/user/withdrawal/', {'points': 500, 'payment_method': 'bench', 'payment_details': 'bench'}),
+        ]
+        try:
+            with override_settings(DEBUG=True):
+                response = client.post('/api/user/auth/', {'telegram_id': telegram_id}, content_type='application/json')
+            headers = {}
+            if not options['no_token']:
+                headers['HTTP_AUTHORIZATION'] = f'Bearer {response.json()["token"]}'
+
+            self.stdout.write(f'{"endpoint":<40} {"statements":>10} {"user row reads":>15}  by kind')
+            for method, path, body in endpoints:
+                body = {**body, 'telegram_id': telegram_id} if body else None
+                # The first call warms the caches; the second is measured
+                for _ in range(2):
+                    statements.clear()
+                    with connection.execute_wrapper(count):
+                        if method == 'GET':
+                            response = client.get(path, **headers)
+                        else:
+                            response = client.post(path, body, content_type='application/json', **headers)
+                    if response.status_code >= 400:
+                        raise CommandError(f'{method} {path} answered {response.status_code}: {response.content[:200]}')
+                lookups = statements.pop('user lookups', 0)
+                self.stdout.write(
+                    f'{method + " " + path.replace(str(telegram_id), "<id>"):<40} '
+                    f'{sum(statements.values()):>10} {lookups:>15}  {dict(statements)}'
+                )
+        finally:
+            user.delete()
@@ -0,0 +1,88 @@
+import asyncio
+import time
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand
+from users.events import ADMIN_GROUP, _send_all, user_group
+from users.models import User
+from users.players import Player
+from users.routing import websocket_urlpatterns
+from users.webapp_auth import issue_session_token
+
+# Bench clients use telegram IDs from here up, away from real ones; the admin is the one below
+BENCH_TELEGRAM_ID_BASE = 10 ** 12
+BENCH_ADMIN_ID = BENCH_TELEGRAM_ID_BASE - 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Connect many in-process WebSocket clients to their user channels, then time pushing '
+        'a balance event to every one of them and one admin event to the admin clients'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=10_000)
+        parser.add_argument('--admins', type=int, default=100)
+        parser.add_argument('--timeout', type=float, default=60, help='Seconds to wait for each delivery')
+
+    def handle(self, *args, **options):
+        User.objects.filter(telegram_id=BENCH_ADMIN_ID).delete()
+        admin = User.objects.create(telegram_id=BENCH_ADMIN_ID, username='bench-admin', is_admin=True)
+        try:
+            asyncio.run(self.run(issue_session_token(admin), options))
+        finally:
+            admin.delete()
+
+    def token(self, telegram_id):
+        # Bench clients have no user rows; the token only has to name their telegram_id
+        return issue_session_token(Player(None, telegram_id, 'bench', False))
+
+    async def connect(self, app, path, timeout):
+        communicator = WebsocketCommunicator(app, path)
+        connected, _ = await communicator.connect(timeout)
+        if not connected:
+            raise RuntimeError(f'{path} refused the connection')
+        return communicator
+
+    async def deliver(self, layer, messages, clients, timeout):
+        start = time.perf_counter()
+        await _send_all(layer, messages)
+        sent = time.perf_counter() - start
+        await asyncio.gather(*[client.receive_json_from(timeout) for client in clients])
+        return sent, time.perf_counter() - start
+
+    async def run(self, admin_token, options):
+        app = URLRouter(websocket_urlpatterns)
+        layer = get_channel_layer()
+        telegram_ids = range(BENCH_TELEGRAM_ID_BASE, BENCH_TELEGRAM_ID_BASE + options['clients'])
+        self.stdout.write(f'Channel layer: {type(layer).__name__}')
+
+        start = time.perf_counter()
+        clients = await asyncio.gather(*[
+            self.connect(app, f'/ws/user/{telegram_id}/?token={self.token(telegram_id)}', options['timeout'])
+            for telegram_id in telegram_ids
+        ])
+        admins = await asyncio.gather(*[
+            self.connect(app, f'/ws/admin/?token={admin_token}', options['timeout']) for _ in range(options['admins'])
+        ])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'Connected {len(clients)} users and {len(admins)} admins in {elapsed:.2f}s')
+
+        try:
+            messages = [
+                (user_group(telegram_id), {'type': 'balance', 'balance': '100.00', 'reason': 'deposit'})
+                for telegram_id in telegram_ids
+            ]
+            sent, delivered = await self.deliver(layer, messages, clients, options['timeout'])
+            self.stdout.write(
+                f'Per-user events: {len(messages)} sent in {sent * 1000:.0f}ms, all delivered in '
+                f'{delivered * 1000:.0f}ms ({len(messages) / delivered:,.0f} events/sec)'
+            )
+
+            if admins:
+                broadcast = [(ADMIN_GROUP, {'type': 'deposit', 'id': 0})]
+                _, delivered = await self.deliver(layer, broadcast, admins, options['timeout'])
+                self.stdout.write(f'Admin broadcast: {len(admins)} clients reached in {delivered * 1000:.1f}ms')
+        finally:
+            await asyncio.gather(*[client.disconnect() for client in [*clients, *admins]])
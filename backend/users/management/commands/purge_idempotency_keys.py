@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from users.idempotency import IDEMPOTENCY_KEY_TTL
+from users.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Delete stored idempotent responses older than the key TTL; run periodically'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - IDEMPOTENCY_KEY_TTL
+        deleted = 0
+        while True:
+            pks = list(
+                IdempotencyKey.objects.filter(created_at__lt=cutoff)
+                .values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not pks:
+                break
+            deleted += IdempotencyKey.objects.filter(pk__in=pks).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys'))
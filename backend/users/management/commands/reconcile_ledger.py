@@ -0,0 +1,97 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from functools import partial
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import DecimalField, F, Max, Min, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from users.models import User, LedgerEntry, BalanceSnapshot
+
+ZERO = Value(Decimal('0'), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def check_range(bounds, write_snapshots):
+    """Reconcile the accounts with ``lo <= pk < hi``; return ``(checked, mismatches, snapshots written)``"""
+    lo, hi = bounds
+    try:
+        since_snapshot = LedgerEntry.objects.filter(
+            user=OuterRef('pk'),
+            id__gt=Coalesce(OuterRef('balance_snapshot__last_entry_id'), 0)
+        ).order_by()
+        # One statement, so balance, snapshot and entries are read consistently
+        accounts = User.objects.filter(pk__gte=lo, pk__lt=hi).annotate(
+            opening=Coalesce(F('balance_snapshot__balance'), ZERO),
+            movement=Coalesce(
+                Subquery(since_snapshot.values('user').annotate(total=Sum('amount')).values('total')),
+                ZERO
+            ),
+            last_entry_id=Subquery(since_snapshot.order_by('-id').values('id')[:1]),
+        ).values_list('pk', 'balance', 'opening', 'movement', 'last_entry_id')
+
+        checked = 0
+        mismatches = []
+        snapshots = []
+        now = timezone.now()
+        for pk, balance, opening, movement, last_entry_id in accounts:
+            checked += 1
+            if balance != opening + movement:
+                mismatches.append((pk, balance, opening + movement))
+            elif last_entry_id is not None:
+                snapshots.append(BalanceSnapshot(user_id=pk, balance=balance, last_entry_id=last_entry_id, created_at=now))
+
+        if write_snapshots and snapshots:
+            BalanceSnapshot.objects.bulk_create(
+                snapshots,
+                update_conflicts=True,
+                unique_fields=['user'],
+                update_fields=['balance', 'last_entry_id', 'created_at'],
+                batch_size=1000,
+            )
+        return checked, mismatches, len(snapshots) if write_snapshots else 0
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Check every balance equals its last snapshot plus the ledger entries since, '
+        'in parallel chunks of accounts; --snapshot records the reconciled balances'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Accounts per chunk (by id range)')
+        parser.add_argument('--workers', type=int, default=8, help='Chunks checked at once')
+        parser.add_argument('--snapshot', action='store_true', help='Snapshot accounts that reconcile')
+        parser.add_argument('--show', type=int, default=20, help='Mismatched accounts to list')
+
+    def handle(self, *args, **options):
+        bounds = User.objects.aggregate(lo=Min('pk'), hi=Max('pk'))
+        if bounds['lo'] is None:
+            self.stdout.write('No accounts')
+            return
+
+        chunk_size = options['chunk_size']
+        ranges = [(lo, lo + chunk_size) for lo in range(bounds['lo'], bounds['hi'] + 1, chunk_size)]
+
+        checked = written = 0
+        mismatches = []
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            for chunk_checked, chunk_mismatches, chunk_written in pool.map(
+                partial(check_range, write_snapshots=options['snapshot']), ranges
+            ):
+                checked += chunk_checked
+                written += chunk_written
+                mismatches.extend(chunk_mismatches)
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(f'Checked {checked} accounts in {elapsed:.2f}s ({len(ranges)} chunks)')
+        if options['snapshot']:
+            self.stdout.write(f'Wrote {written} snapshots')
+        for pk, balance, expected in mismatches[:options['show']]:
+            self.stdout.write(f'user {pk}: balance {balance:.2f}, ledger says {expected:.2f}')
+        if mismatches:
+            raise CommandError(f'{len(mismatches)} accounts do not reconcile')
+        self.stdout.write(self.style.SUCCESS('All accounts reconcile'))
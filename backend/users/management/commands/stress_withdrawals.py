@@ -0,0 +1,70 @@
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from users.models import User, Withdrawal
+
+STRESS_TELEGRAM_ID = -2
+
+
+class Command(BaseCommand):
+    help = (
+        'Fire hundreds of simultaneous withdrawal requests at one account and check it is never '
+        'overdrawn nor over its pending-withdrawal cap. Run against PostgreSQL; SQLite allows one '
+        'writer and fails concurrent requests with "database is locked".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300)
+        parser.add_argument('--workers', type=int, default=64, help='Requests in flight at once')
+        parser.add_argument('--balance', type=Decimal, default=Decimal('1200'))
+        parser.add_argument('--points', type=Decimal, default=Decimal(settings.MINIMUM_WITHDRAWAL))
+
+    def handle(self, *args, **options):
+        balance, points = options['balance'], options['points']
+        User.objects.filter(telegram_id=STRESS_TELEGRAM_ID).delete()
+        user = User.objects.create(telegram_id=STRESS_TELEGRAM_ID, username='stress', balance=balance)
+        body = {
+            'telegram_id': STRESS_TELEGRAM_ID,
+            'points': str(points),
+            'payment_method': 'stress',
+            'payment_details': 'stress'
+        }
+        # Release every worker's first request at the same moment
+        start = threading.Barrier(min(options['workers'], options['requests']))
+
+        def fire(i):
+            try:
+                if i < start.parties:
+                    start.wait()
+                response = Client(raise_request_exception=False).post('/api/user/withdrawal/', body, content_type='application/json')
+                return response.status_code
+            finally:
+                connection.close()
+
+        try:
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                statuses = Counter(pool.map(fire, range(options['requests'])))
+
+            user.refresh_from_db()
+            created = Withdrawal.objects.filter(user=user).count()
+            expected = min(int(balance // points), settings.MAX_PENDING_WITHDRAWALS)
+            self.stdout.write(f'responses: {dict(statuses)}')
+            self.stdout.write(f'withdrawals created: {created} (expected {expected}), balance left: {user.balance}')
+
+            errors = []
+            if created != statuses[201]:
+                errors.append(f'{statuses[201]} requests succeeded but {created} withdrawals exist')
+            if created != expected:
+                errors.append(f'expected {expected} withdrawals')
+            if user.balance != balance - created * points:
+                errors.append(f'balance {user.balance} != {balance} - {created} x {points}')
+            if errors:
+                raise CommandError('; '.join(errors))
+            self.stdout.write(self.style.SUCCESS('No overdraft, cap respected'))
+        finally:
+            user.delete()
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_admin_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='is_admin',
+            field=models.BooleanField(default=False),
+        ),
+    ]
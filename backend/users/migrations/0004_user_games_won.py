@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_is_admin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='games_won',
+            field=models.IntegerField(default=0),
+        ),
+    ]
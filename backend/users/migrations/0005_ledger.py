@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def snapshot_opening_balances(apps, schema_editor):
+    """Balances from before the ledger become each account's opening snapshot"""
+    User = apps.get_model('users', 'User')
+    BalanceSnapshot = apps.get_model('users', 'BalanceSnapshot')
+    now = timezone.now()
+    BalanceSnapshot.objects.bulk_create(
+        (
+            BalanceSnapshot(user_id=pk, balance=balance, last_entry_id=0, created_at=now)
+            for pk, balance in User.objects.exclude(balance=0).values_list('pk', 'balance').iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_user_games_won'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='balance_snapshot', serialize=False, to='users.user')),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('last_entry_id', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'balance_snapshots',
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('game', 'Game'), ('deposit', 'Deposit'), ('withdrawal', 'Withdrawal'), ('refund', 'Withdrawal refund'), ('adjustment', 'Admin adjustment')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('reference', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='users.user')),
+            ],
+            options={
+                'db_table': 'ledger_entries',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['user', 'id'], name='ledger_entr_user_id_133d10_idx')],
+            },
+        ),
+        migrations.RunPython(snapshot_opening_balances, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
 
@@ -11,8 +12,10 @@ class User(models.Model):
     total_won = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     total_lost = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     games_played = models.IntegerField(default=0)
+    games_won = models.IntegerField(default=0)
     is_active = models.BooleanField(default=True)
     is_banned = models.BooleanField(default=False)
+    is_admin = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     last_login = models.DateTimeField(null=True, blank=True)
@@ -20,15 +23,13 @@ class User(models.Model):
     class Meta:
         db_table = 'users'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at']),
+        ]
 
     def __str__(self):
         return f"{self.telegram_id} - {self.username or 'No username'}"
 
-    def update_balance(self, amount):
-        """Update user balance"""
-        self.balance += amount
-        self.save()
-
 class Deposit(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -49,6 +50,10 @@ class Deposit(models.Model):
     class Meta:
         db_table = 'deposits'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-created_at']),
+            models.Index(fields=['-created_at']),
+        ]
 
     def __str__(self):
         return f"{self.user.telegram_id} - {self.amount} - {self.status}"
@@ -75,6 +80,106 @@ class Withdrawal(models.Model):
     class Meta:
         db_table = 'withdrawals'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-created_at']),
+            models.Index(fields=['-created_at']),
+        ]
 
     def __str__(self):
         return f"{self.user.telegram_id} - {self.points} pts - {self.status}"
+
+class LedgerEntryManager(models.Manager):
+    def record(self, entries):
+        """Bulk-insert the entries that change a balance.
+
+        Call inside the transaction that changed the balances, after their
+        UPDATE, so an account's entries are ordered by id.
+        """
+        return self.bulk_create([entry for entry in entries if entry.amount], batch_size=1000)
+
+class LedgerEntry(models.Model):
+    """One change to a user's balance; rows are never updated or deleted"""
+    KIND_CHOICES = [
+        ('game', 'Game'),
+        ('deposit', 'Deposit'),
+        ('withdrawal', 'Withdrawal'),
+        ('refund', 'Withdrawal refund'),
+        ('adjustment', 'Admin adjustment'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ledger_entries')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    reference = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = LedgerEntryManager()
+
+    class Meta:
+        db_table = 'ledger_entries'
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['user', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.kind} - {self.amount}"
+
+class BalanceSnapshot(models.Model):
+    """A user's reconciled balance as of ledger entry ``last_entry_id``"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='balance_snapshot')
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+    last_entry_id = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'balance_snapshots'
+
+    def __str__(self):
+        return f"{self.user_id} - {self.balance} @ {self.last_entry_id}"
+
+class IdempotencyKey(models.Model):
+    """Stored response of a POST made with an ``Idempotency-Key`` header"""
+    # Keys are the client's, so they are only unique per player
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, related_name='+')
+    endpoint = models.CharField(max_length=32)
+    key = models.CharField(max_length=64)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(default=0)
+    response = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = 'idempotency_keys'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'endpoint', 'key'], name='unique_idempotency_key_per_user_endpoint'),
+        ]
+
+    def __str__(self):
+        return f"{self.endpoint} - {self.key}"
+
+class OutboundMessage(models.Model):
+    """A Telegram message for the bot to send (see ``users.outbox``)"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    telegram_id = models.BigIntegerField()
+    text = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    send_after = models.DateTimeField(default=timezone.now)
+    error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'outbound_messages'
+        indexes = [
+            models.Index(fields=['status', 'send_after']),
+        ]
+
+    def __str__(self):
+        return f"{self.telegram_id} - {self.status}"
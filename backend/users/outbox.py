@@ -0,0 +1,86 @@
+"""Telegram messages queued for the bot to send.
+
+Notifications are inserted in the transaction that caused them, so one
+exists exactly when its change committed, and pending messages survive
+restarts. The bot's sender (``bot.OutboundSender``) claims due messages in
+batches, sends them within Telegram's rate limits and records the outcome
+here; a claim is a lease, so messages a crashed sender held are picked up
+again once ``CLAIM_TIMEOUT`` passes.
+"""
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import OutboundMessage, User
+
+CLAIM_TIMEOUT = timedelta(minutes=5)
+# Rows per INSERT when queueing a broadcast
+BROADCAST_BATCH_SIZE = 5000
+# Telegram's limit for one message
+MAX_TEXT_LENGTH = 4096
+
+DEPOSIT_APPROVED = "✅ Your deposit of {points} points was approved.\n💰 Balance: {balance} points"
+DEPOSIT_REJECTED = "❌ Your deposit of {points} points was rejected."
+WITHDRAWAL_REFUNDED = (
+    "↩️ Your withdrawal of {points} points was rejected and the points were refunded.\n"
+    "💰 Balance: {balance} points"
+)
+WITHDRAWAL_APPROVED = "✅ Your withdrawal of {points} points was approved and will be paid soon."
+WITHDRAWAL_PAID = "💸 Your withdrawal of Br {amount} has been paid."
+
+
+def queue_messages(messages):
+    """Queue ``[(telegram_id, text)]`` for sending"""
+    OutboundMessage.objects.bulk_create(
+        [OutboundMessage(telegram_id=telegram_id, text=text) for telegram_id, text in messages],
+        batch_size=BROADCAST_BATCH_SIZE
+    )
+
+
+def queue_broadcast(text, users=None):
+    """Queue ``text`` for every active, unbanned user (or those in ``users``); returns how many"""
+    if users is None:
+        users = User.objects.filter(is_active=True, is_banned=False)
+    queued = 0
+    batch = []
+    with transaction.atomic():
+        for telegram_id in users.order_by().values_list('telegram_id', flat=True).iterator(BROADCAST_BATCH_SIZE):
+            batch.append(OutboundMessage(telegram_id=telegram_id, text=text))
+            if len(batch) == BROADCAST_BATCH_SIZE:
+                OutboundMessage.objects.bulk_create(batch)
+                queued += len(batch)
+                batch = []
+        OutboundMessage.objects.bulk_create(batch)
+    return queued + len(batch)
+
+
+def claim_due(limit):
+    """Lease up to ``limit`` due messages, oldest first; returns ``[(id, telegram_id, text, attempts)]``"""
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            OutboundMessage.objects.filter(status='pending', send_after__lte=now)
+            .select_for_update(skip_locked=True)
+            .order_by('pk')
+            .values_list('pk', 'telegram_id', 'text', 'attempts')[:limit]
+        )
+        OutboundMessage.objects.filter(pk__in=[message[0] for message in messages]).update(
+            send_after=now + CLAIM_TIMEOUT
+        )
+    return messages
+
+
+def record_results(sent, retries, failed):
+    """Mark ``sent`` ids sent, retry ``[(id, delay_seconds, error)]`` later and fail ``[(id, error)]``"""
+    now = timezone.now()
+    with transaction.atomic():
+        if sent:
+            OutboundMessage.objects.filter(pk__in=sent).update(
+                status='sent', sent_at=now, attempts=F('attempts') + 1
+            )
+        for pk, delay, error in retries:
+            OutboundMessage.objects.filter(pk=pk).update(
+                send_after=now + timedelta(seconds=delay), attempts=F('attempts') + 1, error=error[:255]
+            )
+        for pk, error in failed:
+            OutboundMessage.objects.filter(pk=pk).update(status='failed', attempts=F('attempts') + 1, error=error[:255])
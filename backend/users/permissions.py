@@ -0,0 +1,130 @@
+"""Admin authorization without a User query per request.
+
+Admins are the IDs in ``settings.ADMIN_TELEGRAM_IDS`` plus users flagged
+``is_admin``. The flagged users are loaded once into the cache and mirrored
+in-process for ``ADMIN_LOCAL_TTL`` seconds, so checking an admin is a dict
+lookup. Saving or deleting a user who is or may have been an admin drops
+the cached admins once the change commits.
+
+``admin_required`` trusts the ``admin_id`` a request names, so it only
+guards admin reads; ``admin_session_required`` takes the admin from the
+session token instead and guards every admin endpoint that changes data.
+"""
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+ADMIN_CACHE_KEY = 'users:admins'
+ADMIN_CACHE_TTL = 300
+ADMIN_LOCAL_TTL = 5
+
+_local = {'admins': None, 'expires': 0.0}
+
+
+def _load_admins():
+    from .models import User
+    return dict(User.objects.filter(is_admin=True).values_list('telegram_id', 'username'))
+
+
+def get_admins():
+    """``{telegram_id: username}`` of every admin flagged in the database"""
+    now = time.monotonic()
+    if _local['admins'] is not None and now < _local['expires']:
+        return _local['admins']
+
+    admins = cache.get(ADMIN_CACHE_KEY)
+    if admins is None:
+        admins = _load_admins()
+        cache.set(ADMIN_CACHE_KEY, admins, ADMIN_CACHE_TTL)
+
+    _local['admins'] = admins
+    _local['expires'] = now + ADMIN_LOCAL_TTL
+    return admins
+
+
+def invalidate_admins():
+    cache.delete(ADMIN_CACHE_KEY)
+    _local['admins'] = None
+
+
+def _telegram_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_admin_telegram_id(telegram_id):
+    telegram_id = _telegram_id(telegram_id)
+    if telegram_id is None:
+        return False
+    return telegram_id in settings.ADMIN_TELEGRAM_IDS or telegram_id in get_admins()
+
+
+def admin_name(telegram_id):
+    """Name recorded in ``processed_by`` for actions taken by an admin"""
+    return get_admins().get(telegram_id) or str(telegram_id)
+
+
+def is_admin_player(player):
+    """True for the ``Player`` of an unbanned admin (None is not one)"""
+    return player is not None and not player.is_banned and is_admin_telegram_id(player.telegram_id)
+
+
+def admin_required(view):
+    """Reject the request unless ``admin_id`` (query or body) is an admin.
+
+    Use below ``@api_view``; the verified ID is set as ``request.admin_id``.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        admin_id = request.query_params.get('admin_id')
+        if admin_id is None and isinstance(request.data, dict):
+            admin_id = request.data.get('admin_id')
+
+        if not is_admin_telegram_id(admin_id):
+            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+
+        request.admin_id = _telegram_id(admin_id)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def admin_session_required(view):
+    """Reject the request unless its session token (``request.player``) is an unbanned admin's.
+
+    For every admin endpoint that changes data, where the ``admin_id`` a
+    client sends is not enough. Use below ``@api_view``; the
+    admin's telegram_id is set as ``request.admin_id``.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        player = getattr(request, 'player', None)
+        if not is_admin_player(player):
+            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+
+        request.admin_id = player.telegram_id
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+ADMIN_FIELDS = {'telegram_id', 'username', 'is_admin'}
+
+
+def admin_saved(sender, instance, created, update_fields=None, **kwargs):
+    """post_save receiver: drop the cached admins, once the save commits, if it may have changed them"""
+    if update_fields is not None and not ADMIN_FIELDS & set(update_fields):
+        return
+    if 'is_admin' in instance.get_deferred_fields() or (created and not instance.is_admin):
+        return
+    transaction.on_commit(invalidate_admins)
+
+
+def admin_deleted(sender, instance, **kwargs):
+    """post_delete receiver: drop the cached admins, once the delete commits, if an admin was deleted"""
+    if 'is_admin' in instance.get_deferred_fields() or instance.is_admin:
+        transaction.on_commit(invalidate_admins)
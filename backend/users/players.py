@@ -0,0 +1,127 @@
+"""Who a request is from, without a User query per request.
+
+``PlayerMiddleware`` reads the session token ``telegram_auth`` issued
+(``Authorization: Bearer <token>``) and sets ``request.player``: the
+user's id, telegram_id, username and ban flag, cached for ``PLAYER_TTL``
+seconds (local memory, or Redis when ``REDIS_URL`` is set). Saving or
+deleting a user, or ``set_banned``, drops their cached player once the
+change commits, so a ban or unban applies to the next request in every
+process.
+
+``player_required`` makes a view act for that player. Until
+``REQUIRE_SESSION_TOKEN`` is turned on, a request without a token is taken
+to be from the ``telegram_id`` it names, as before tokens existed.
+"""
+from collections import namedtuple
+from functools import partial, wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.response import Response
+from .models import User
+from .webapp_auth import read_session_token
+
+PLAYER_TTL = 600
+PLAYER_FIELDS = ('id', 'telegram_id', 'username', 'is_banned')
+
+
+class Player(namedtuple('Player', PLAYER_FIELDS)):
+    """The cached principal; passes for its User where only the pk is used"""
+    __slots__ = ()
+
+    @property
+    def pk(self):
+        return self.id
+
+
+def player_key(telegram_id):
+    return f'users:player:{telegram_id}'
+
+
+def get_player(telegram_id):
+    """The ``Player`` with this telegram_id, or None if there is no such user"""
+    key = player_key(telegram_id)
+    cached = cache.get(key)
+    if cached is not None:
+        return Player(*cached)
+    row = User.objects.filter(telegram_id=telegram_id).values_list(*PLAYER_FIELDS).first()
+    if row is None:
+        return None
+    cache.set(key, row, PLAYER_TTL)
+    return Player(*row)
+
+
+def invalidate_player(telegram_id):
+    cache.delete(player_key(telegram_id))
+
+
+def set_banned(users, banned):
+    """Ban or unban the ``users`` queryset and drop their cached players; returns how many"""
+    with transaction.atomic():
+        telegram_ids = list(users.values_list('telegram_id', flat=True))
+        count = User.objects.filter(telegram_id__in=telegram_ids).update(is_banned=banned, is_active=not banned)
+        transaction.on_commit(partial(cache.delete_many, [player_key(telegram_id) for telegram_id in telegram_ids]))
+    return count
+
+
+def player_saved(sender, instance, **kwargs):
+    """post_save / post_delete receiver: drop the user's cached player once the change commits"""
+    if 'telegram_id' not in instance.get_deferred_fields():
+        transaction.on_commit(partial(invalidate_player, instance.telegram_id))
+
+
+def _telegram_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class PlayerMiddleware:
+    """Set ``request.player`` from the request's session token (None without one)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.player = None
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme == 'Bearer' and token:
+            session = read_session_token(token)
+            if session is None:
+                return JsonResponse(
+                    {'error': 'Your session has expired, reopen the app'}, status=status.HTTP_401_UNAUTHORIZED
+                )
+            request.player = get_player(session['tg'])
+            if request.player is None:
+                return JsonResponse({'error': 'User not found'}, status=status.HTTP_401_UNAUTHORIZED)
+        return self.get_response(request)
+
+
+def player_required(view):
+    """Act for the requesting player, set as ``request.player``; use below ``@api_view``.
+
+    A ``telegram_id`` in the URL or body must be the session token's user.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        telegram_id = kwargs.get('telegram_id')
+        if telegram_id is None and isinstance(request.data, dict):
+            telegram_id = request.data.get('telegram_id')
+
+        player = request.player
+        if player is None:
+            if settings.REQUIRE_SESSION_TOKEN:
+                return Response({'error': 'Sign in through the app first'}, status=status.HTTP_401_UNAUTHORIZED)
+            telegram_id = _telegram_id(telegram_id)
+            player = get_player(telegram_id) if telegram_id is not None else None
+            if player is None:
+                return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+        elif telegram_id is not None and _telegram_id(telegram_id) != player.telegram_id:
+            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+
+        request.player = player
+        return view(request, *args, **kwargs)
+    return wrapper
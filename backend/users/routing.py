@@ -0,0 +1,7 @@
+from django.urls import path
+from . import consumers
+
+websocket_urlpatterns = [
+    path('ws/user/<int:telegram_id>/', consumers.UserEventsConsumer.as_asgi(), name='ws-user-events'),
+    path('ws/admin/', consumers.AdminEventsConsumer.as_asgi(), name='ws-admin-events'),
+]
@@ -6,7 +6,7 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'telegram_id', 'username', 'first_name', 'last_name', 
                   'balance', 'total_wagered', 'total_won', 'total_lost', 
-                  'games_played', 'is_active', 'is_banned', 'created_at']
+                  'games_played', 'games_won', 'is_active', 'is_banned', 'created_at']
         read_only_fields = ['id', 'created_at']
 
 class DepositSerializer(serializers.ModelSerializer):
@@ -22,3 +22,21 @@ class WithdrawalSerializer(serializers.ModelSerializer):
         fields = ['id', 'points', 'amount', 'payment_method', 'payment_details', 
                   'status', 'admin_note', 'created_at', 'processed_at']
         read_only_fields = ['id', 'status', 'admin_note', 'created_at', 'processed_at']
+
+class AdminDepositSerializer(serializers.ModelSerializer):
+    user = serializers.CharField(source='user.username', read_only=True)
+    telegram_id = serializers.IntegerField(source='user.telegram_id', read_only=True)
+    
+    class Meta:
+        model = Deposit
+        fields = ['id', 'user', 'telegram_id', 'amount', 'points', 'status', 'payment_proof', 
+                  'admin_note', 'created_at', 'processed_at', 'processed_by']
+
+class AdminWithdrawalSerializer(serializers.ModelSerializer):
+    user = serializers.CharField(source='user.username', read_only=True)
+    telegram_id = serializers.IntegerField(source='user.telegram_id', read_only=True)
+    
+    class Meta:
+        model = Withdrawal
+        fields = ['id', 'user', 'telegram_id', 'points', 'amount', 'payment_method', 'payment_details', 
+                  'status', 'admin_note', 'created_at', 'processed_at', 'processed_by']
@@ -0,0 +1,164 @@
+"""Cached balance and stats snapshots per user.
+
+The web app polls the balance after every round and the bot answers
+/balance and /stats, all for the same ``User`` row. Those reads are served
+from the cache framework (local memory by default, Redis when ``REDIS_URL``
+is set) and only load the row on a miss.
+
+Writes go through: once a transaction that changed balances commits, the
+snapshots already cached for those users are updated from the values it
+wrote, so the read after a round is still a hit. Snapshots carry the
+``updated_at`` they were built from and are never replaced by an older one;
+a change that cannot be merged safely drops the snapshot instead, and
+``SNAPSHOT_TTL`` bounds how long any write that bypasses this module can go
+unnoticed. Other saves of a user drop its snapshot.
+"""
+import threading
+from functools import partial
+from django.core.cache import cache
+from django.db import transaction
+from .models import User
+
+SNAPSHOT_TTL = 300
+SNAPSHOT_FIELDS = (
+    'balance', 'total_wagered', 'total_won', 'total_lost',
+    'games_played', 'games_won', 'created_at', 'updated_at',
+)
+
+HITS_KEY = 'users:snapshot:hits'
+MISSES_KEY = 'users:snapshot:misses'
+# Reads counted in-process before the totals in the cache are incremented
+COUNTS_FLUSH_EVERY = 100
+
+_counts = {HITS_KEY: 0, MISSES_KEY: 0}
+_counts_lock = threading.Lock()
+
+
+def snapshot_key(telegram_id):
+    return f'users:snapshot:{telegram_id}'
+
+
+def _load(telegram_id):
+    from games.models import UserGameStats
+    snapshot = User.objects.filter(telegram_id=telegram_id).values('pk', *SNAPSHOT_FIELDS).first()
+    if snapshot is None:
+        return None
+    snapshot['by_game'] = {
+        game_type: {'wins': wins, 'losses': losses}
+        for game_type, wins, losses in UserGameStats.objects.filter(user_id=snapshot['pk'])
+        .values_list('game_type', 'wins', 'losses')
+    }
+    return snapshot
+
+
+def _flush_counts(counts):
+    for key, count in counts.items():
+        if not count:
+            continue
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            if not cache.add(key, count, None):
+                cache.incr(key, count)
+
+
+def _count(key):
+    with _counts_lock:
+        _counts[key] += 1
+        if _counts[HITS_KEY] + _counts[MISSES_KEY] < COUNTS_FLUSH_EVERY:
+            return
+        counts = dict(_counts)
+        _counts.update(dict.fromkeys(_counts, 0))
+    _flush_counts(counts)
+
+
+def get_snapshot(telegram_id):
+    """The user's balance, totals and ``by_game`` win/loss counts, or None if there is no such user"""
+    key = snapshot_key(telegram_id)
+    snapshot = cache.get(key)
+    if snapshot is not None:
+        _count(HITS_KEY)
+        return snapshot
+
+    _count(MISSES_KEY)
+    snapshot = _load(telegram_id)
+    if snapshot is not None:
+        cache.set(key, snapshot, SNAPSHOT_TTL)
+    return snapshot
+
+
+def _merge(changes, rounds=None):
+    keys = {snapshot_key(telegram_id): telegram_id for telegram_id in changes}
+    fresh = {}
+    stale = []
+    for key, snapshot in cache.get_many(keys).items():
+        fields = changes[keys[key]]
+        if snapshot['updated_at'] >= fields['updated_at']:
+            continue
+        if rounds is not None:
+            previous, game_type, wins, losses = rounds
+            if snapshot['updated_at'] != previous:
+                # A change in between was missed, so the counts cannot be patched
+                stale.append(key)
+                continue
+            counts = snapshot['by_game'].setdefault(game_type, {'wins': 0, 'losses': 0})
+            counts['wins'] += wins
+            counts['losses'] += losses
+        snapshot.update(fields)
+        fresh[key] = snapshot
+    if fresh:
+        cache.set_many(fresh, SNAPSHOT_TTL)
+    if stale:
+        cache.delete_many(stale)
+
+
+def update_snapshots(changes):
+    """On commit, merge ``{telegram_id: {field: new value}}`` into the cached snapshots.
+
+    Every change must include the ``updated_at`` written with it.
+    """
+    transaction.on_commit(partial(_merge, changes))
+
+
+def update_after_rounds(telegram_id, previous_updated_at, fields, game_type, wins, losses):
+    """On commit, apply settled rounds to the user's cached snapshot.
+
+    ``fields`` are the new column values; ``wins``/``losses`` are added to
+    the ``game_type`` counts if the snapshot was built at ``previous_updated_at``.
+    """
+    transaction.on_commit(partial(
+        _merge, {telegram_id: fields}, (previous_updated_at, game_type, wins, losses)
+    ))
+
+
+def invalidate(telegram_ids):
+    """On commit, drop the cached snapshots of ``telegram_ids``"""
+    keys = [snapshot_key(telegram_id) for telegram_id in telegram_ids]
+    transaction.on_commit(partial(cache.delete_many, keys))
+
+
+def cache_stats():
+    """Snapshot reads served from the cache, across processes sharing it"""
+    with _counts_lock:
+        local = dict(_counts)
+    totals = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = totals.get(HITS_KEY, 0) + local[HITS_KEY]
+    misses = totals.get(MISSES_KEY, 0) + local[MISSES_KEY]
+    reads = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / reads if reads else None,
+    }
+
+
+def reset_cache_stats():
+    with _counts_lock:
+        _counts.update(dict.fromkeys(_counts, 0))
+    cache.delete_many([HITS_KEY, MISSES_KEY])
+
+
+def user_saved(sender, instance, **kwargs):
+    """post_save / post_delete receiver: drop the user's snapshot"""
+    if 'telegram_id' not in instance.get_deferred_fields():
+        invalidate([instance.telegram_id])
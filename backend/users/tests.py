@@ -0,0 +1,370 @@
+from decimal import Decimal
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Sum
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from .balances import InsufficientBalance, PendingWithdrawalLimit, adjust_balances, create_withdrawal
+from .consumers import CLOSE_UNAUTHORIZED
+from .models import Deposit, LedgerEntry, OutboundMessage, User, Withdrawal
+from .outbox import DEPOSIT_REJECTED
+from .permissions import admin_required, get_admins, invalidate_admins, is_admin_telegram_id
+from .players import Player, set_banned
+from .routing import websocket_urlpatterns
+from .webapp_auth import issue_session_token
+
+SETTINGS_ADMIN_ID = 111
+FLAGGED_ADMIN_ID = 222
+PLAYER_ID = 333
+
+
+@api_view(['GET'])
+@admin_required
+def admin_view(request):
+    return Response({'admin_id': request.admin_id})
+
+
+@override_settings(ADMIN_TELEGRAM_IDS=frozenset([SETTINGS_ADMIN_ID]))
+class AdminRequiredTests(TestCase):
+    """Once the admin set is cached, authorizing an admin request runs no queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create(telegram_id=FLAGGED_ADMIN_ID, username='flagged', is_admin=True)
+        User.objects.create(telegram_id=PLAYER_ID, username='player')
+
+    def setUp(self):
+        cache.clear()
+        invalidate_admins()
+        # Warm the cache; the first check loads the flagged admins once
+        get_admins()
+
+    def test_admin_check_runs_no_queries(self):
+        with self.assertNumQueries(0):
+            self.assertTrue(is_admin_telegram_id(SETTINGS_ADMIN_ID))
+            self.assertTrue(is_admin_telegram_id(FLAGGED_ADMIN_ID))
+            self.assertFalse(is_admin_telegram_id(PLAYER_ID))
+            self.assertFalse(is_admin_telegram_id('not a number'))
+
+    def test_admin_required_view_runs_no_queries(self):
+        factory = APIRequestFactory()
+        with self.assertNumQueries(0):
+            allowed = admin_view(factory.get('/', {'admin_id': FLAGGED_ADMIN_ID}))
+            refused = admin_view(factory.get('/', {'admin_id': PLAYER_ID}))
+        self.assertEqual(allowed.status_code, 200)
+        self.assertEqual(refused.status_code, 403)
+
+    def test_demoting_an_admin_invalidates_the_cache(self):
+        user = User.objects.get(telegram_id=FLAGGED_ADMIN_ID)
+        user.is_admin = False
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+            # Not before the demotion commits, so no other process can cache it early
+            self.assertTrue(is_admin_telegram_id(FLAGGED_ADMIN_ID))
+        self.assertFalse(is_admin_telegram_id(FLAGGED_ADMIN_ID))
+
+
+@override_settings(ADMIN_TELEGRAM_IDS=frozenset([SETTINGS_ADMIN_ID]))
+class AdminSessionRequiredTests(TestCase):
+    """Bulk adjustments take the admin from the session token, not from ``admin_id``"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(telegram_id=SETTINGS_ADMIN_ID, username='admin')
+        cls.player = User.objects.create(telegram_id=PLAYER_ID, username='player')
+
+    def setUp(self):
+        cache.clear()
+        invalidate_admins()
+
+    def adjust(self, **extra):
+        body = {'amount': '5', 'filter': {'q': str(PLAYER_ID)}, 'admin_id': SETTINGS_ADMIN_ID}
+        return self.client.post('/api/user/admin/adjust-balances/', body, content_type='application/json', **extra)
+
+    def test_admin_id_alone_is_refused(self):
+        self.assertEqual(self.adjust().status_code, 403)
+
+    def test_player_token_is_refused(self):
+        token = issue_session_token(self.player)
+        self.assertEqual(self.adjust(HTTP_AUTHORIZATION=f'Bearer {token}').status_code, 403)
+
+    def test_admin_token_is_accepted(self):
+        token = issue_session_token(self.admin)
+        response = self.adjust(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'adjusted': 1})
+
+    def test_add_points_needs_admin_token(self):
+        body = {'user_id': self.player.pk, 'points': '5', 'admin_id': SETTINGS_ADMIN_ID}
+        refused = self.client.post('/api/user/admin/add-points/', body, content_type='application/json')
+        allowed = self.client.post(
+            '/api/user/admin/add-points/', body, content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {issue_session_token(self.admin)}',
+        )
+        self.assertEqual([refused.status_code, allowed.status_code], [403, 200])
+        self.player.refresh_from_db()
+        self.assertEqual(self.player.balance, 5)
+
+
+class IdempotencyKeyTests(TestCase):
+    """An Idempotency-Key only replays responses to the player who sent it"""
+
+    def setUp(self):
+        cache.clear()
+
+    def deposit(self, user, key):
+        return self.client.post(
+            '/api/user/deposit/', {'amount': '100', 'points': '100'}, content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {issue_session_token(user)}', HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_same_key_from_two_players(self):
+        first = User.objects.create(telegram_id=PLAYER_ID)
+        second = User.objects.create(telegram_id=PLAYER_ID + 1)
+        responses = [self.deposit(first, 'same-key'), self.deposit(second, 'same-key'), self.deposit(first, 'same-key')]
+
+        self.assertEqual([response.status_code for response in responses], [201, 201, 201])
+        self.assertNotIn('Idempotent-Replayed', responses[1])
+        self.assertEqual(responses[2]['Idempotent-Replayed'], 'true')
+        self.assertEqual(first.deposits.count(), 1)
+        self.assertEqual(second.deposits.count(), 1)
+
+    def test_invalid_amounts_are_refused(self):
+        user = User.objects.create(telegram_id=PLAYER_ID)
+        bodies = [{}, {'amount': 'ten', 'points': '100'}, {'amount': '10', 'points': '0'}, {'amount': '-1', 'points': '5'}]
+        for index, body in enumerate(bodies):
+            response = self.client.post(
+                '/api/user/deposit/', body, content_type='application/json',
+                HTTP_AUTHORIZATION=f'Bearer {issue_session_token(user)}', HTTP_IDEMPOTENCY_KEY=f'key-{index}',
+            )
+            self.assertEqual(response.status_code, 400, body)
+        self.assertFalse(user.deposits.exists())
+
+
+@override_settings(ADMIN_TELEGRAM_IDS=frozenset([SETTINGS_ADMIN_ID]))
+class BanUserTests(TestCase):
+    """Banning writes only the ban flags and reads ``ban`` as a boolean"""
+
+    def setUp(self):
+        cache.clear()
+        invalidate_admins()
+        self.token = issue_session_token(User.objects.create(telegram_id=SETTINGS_ADMIN_ID, username='admin'))
+        self.player = User.objects.create(telegram_id=PLAYER_ID, username='player', balance=100)
+
+    def ban(self, user_id, ban):
+        return self.client.post(
+            '/api/user/admin/ban-user/', {'user_id': user_id, 'ban': ban},
+            content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {self.token}',
+        )
+
+    def test_ban_flags(self):
+        # self.player is now stale; banning must not write its balance back
+        User.objects.filter(pk=self.player.pk).update(balance=250)
+        self.assertEqual(self.ban(self.player.pk, True).status_code, 200)
+        self.player.refresh_from_db()
+        self.assertEqual((self.player.is_banned, self.player.balance), (True, 250))
+
+        self.assertEqual(self.ban(self.player.pk, 'false').status_code, 200)
+        self.player.refresh_from_db()
+        self.assertEqual((self.player.is_banned, self.player.is_active), (False, True))
+
+    def test_bad_input(self):
+        self.assertEqual(self.ban(self.player.pk, 'maybe').status_code, 400)
+        self.assertEqual(self.ban('nope', True).status_code, 404)
+        self.assertEqual(self.ban(self.player.pk + 100, True).status_code, 404)
+
+
+@override_settings(ADMIN_TELEGRAM_IDS=frozenset([SETTINGS_ADMIN_ID]))
+class ProcessWithdrawalTests(TestCase):
+    """Each step of a withdrawal happens once, however many admins press the button"""
+
+    def setUp(self):
+        cache.clear()
+        invalidate_admins()
+        user = User.objects.create(telegram_id=PLAYER_ID)
+        self.token = issue_session_token(User.objects.create(telegram_id=SETTINGS_ADMIN_ID, username='admin'))
+        self.withdrawal = Withdrawal.objects.create(
+            user=user, points=500, amount=5, payment_method='bank', payment_details='123'
+        )
+
+    def process(self, action):
+        return self.client.post(
+            '/api/user/admin/process-withdrawal/', {'withdrawal_id': self.withdrawal.pk, 'action': action},
+            content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {self.token}',
+        )
+
+    def test_each_step_once(self):
+        actions = ('paid', 'approve', 'approve', 'reject', 'paid', 'paid')
+        statuses = [self.process(action).status_code for action in actions]
+
+        self.assertEqual(statuses, [409, 200, 409, 409, 200, 409])
+        self.withdrawal.refresh_from_db()
+        self.assertEqual(self.withdrawal.status, 'paid')
+        self.assertEqual(OutboundMessage.objects.filter(telegram_id=PLAYER_ID).count(), 2)
+
+
+class CreateWithdrawalTests(TestCase):
+    """Withdrawals never overdraw the balance or exceed the pending cap"""
+
+    def setUp(self):
+        self.user = User.objects.create(telegram_id=PLAYER_ID)
+        adjust_balances({self.user.pk: Decimal('1000')}, 'test')
+
+    def withdraw(self, points):
+        return create_withdrawal(self.user.pk, Decimal(points), 'bank', '123')
+
+    def assertInvariant(self):
+        self.user.refresh_from_db()
+        pending = Withdrawal.objects.filter(user=self.user, status='pending')
+        withdrawn = pending.aggregate(total=Sum('points'))['total'] or 0
+        self.assertGreaterEqual(self.user.balance, 0)
+        self.assertLessEqual(pending.count(), settings.MAX_PENDING_WITHDRAWALS)
+        self.assertEqual(self.user.balance, Decimal('1000') - withdrawn)
+        ledger = LedgerEntry.objects.filter(user=self.user).aggregate(total=Sum('amount'))['total']
+        self.assertEqual(ledger, self.user.balance)
+
+    def test_insufficient_balance(self):
+        self.withdraw('600')
+        with self.assertRaises(InsufficientBalance):
+            self.withdraw('400.01')
+        self.assertEqual(Withdrawal.objects.count(), 1)
+        self.assertInvariant()
+
+    @override_settings(MAX_PENDING_WITHDRAWALS=3)
+    def test_pending_withdrawal_limit(self):
+        for _ in range(3):
+            self.withdraw('100')
+        with self.assertRaises(PendingWithdrawalLimit):
+            self.withdraw('100')
+        self.assertInvariant()
+
+        Withdrawal.objects.filter(user=self.user).update(status='paid')
+        self.withdraw('100')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.balance, Decimal('600'))
+
+    @override_settings(MAX_PENDING_WITHDRAWALS=3)
+    def test_invariant_holds_over_a_run_of_requests(self):
+        # 250 fits three times into 1000; the cap and the balance refuse the rest
+        outcomes = []
+        for points in ('250', '250', '600', '250', '250', '1'):
+            try:
+                self.withdraw(points)
+                outcomes.append('ok')
+            except InsufficientBalance:
+                outcomes.append('balance')
+            except PendingWithdrawalLimit:
+                outcomes.append('limit')
+            self.assertInvariant()
+        self.assertEqual(outcomes, ['ok', 'ok', 'balance', 'ok', 'limit', 'limit'])
+
+
+class EventsConsumerMixin:
+    @async_to_sync
+    async def connect(self, path):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), path)
+        connected, code = await communicator.connect()
+        if connected:
+            await communicator.disconnect()
+        return connected, code
+
+
+class UserEventsConsumerTests(EventsConsumerMixin, SimpleTestCase):
+    """A user's event channel only opens for their own session token"""
+
+    def test_token_required(self):
+        token = issue_session_token(Player(1, PLAYER_ID, 'player', False))
+        self.assertEqual(self.connect(f'/ws/user/{PLAYER_ID}/'), (False, CLOSE_UNAUTHORIZED))
+        self.assertEqual(self.connect(f'/ws/user/{PLAYER_ID}/?token=forged'), (False, CLOSE_UNAUTHORIZED))
+        self.assertEqual(self.connect(f'/ws/user/{PLAYER_ID + 1}/?token={token}'), (False, CLOSE_UNAUTHORIZED))
+        self.assertEqual(self.connect(f'/ws/user/{PLAYER_ID}/?token={token}'), (True, None))
+
+
+@override_settings(ADMIN_TELEGRAM_IDS=frozenset([SETTINGS_ADMIN_ID]))
+class AdminEventsConsumerTests(EventsConsumerMixin, TransactionTestCase):
+    """The admin channel only opens for an unbanned admin's session token"""
+
+    def setUp(self):
+        cache.clear()
+        invalidate_admins()
+        self.admin = User.objects.create(telegram_id=SETTINGS_ADMIN_ID, username='admin')
+        self.player = User.objects.create(telegram_id=PLAYER_ID, username='player')
+
+    def test_admin_token_required(self):
+        refused = (False, CLOSE_UNAUTHORIZED)
+        self.assertEqual(self.connect('/ws/admin/'), refused)
+        self.assertEqual(self.connect(f'/ws/admin/?admin_id={SETTINGS_ADMIN_ID}'), refused)
+        self.assertEqual(self.connect('/ws/admin/?token=forged'), refused)
+        self.assertEqual(self.connect(f'/ws/admin/?token={issue_session_token(self.player)}'), refused)
+        self.assertEqual(self.connect(f'/ws/admin/?token={issue_session_token(self.admin)}'), (True, None))
+
+    def test_banned_admin_refused(self):
+        token = issue_session_token(self.admin)
+        set_banned(User.objects.filter(pk=self.admin.pk), True)
+        self.assertEqual(self.connect(f'/ws/admin/?token={token}'), (False, CLOSE_UNAUTHORIZED))
+
+
+class UserAdminTests(TestCase):
+    """Editing a user in the Django admin leaves their balance and counters alone"""
+
+    def test_change_form_keeps_balance(self):
+        staff = get_user_model().objects.create_superuser('staff', 'staff@example.com', 'password')
+        self.client.force_login(staff)
+        user = User.objects.create(telegram_id=PLAYER_ID, username='player', balance=100)
+        # Play settles while the form is open; the posted balance is ignored
+        User.objects.filter(pk=user.pk).update(balance=250, games_played=3)
+
+        response = self.client.post(f'/admin/users/user/{user.pk}/change/', {
+            'telegram_id': PLAYER_ID, 'username': 'renamed', 'first_name': '', 'last_name': '',
+            'is_active': 'on', 'balance': '999',
+        })
+        self.assertEqual(response.status_code, 302)
+        user.refresh_from_db()
+        self.assertEqual((user.username, user.balance, user.games_played), ('renamed', 250, 3))
+
+
+class RequestAdminActionTests(TestCase):
+    """Admin actions move only requests in the expected state and notify their owners"""
+
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_superuser('staff', 'staff@example.com', 'password'))
+        self.user = User.objects.create(telegram_id=PLAYER_ID)
+
+    def act(self, model, action, requests):
+        return self.client.post(
+            f'/admin/users/{model}/', {'action': action, '_selected_action': [request.pk for request in requests]},
+            follow=True,
+        )
+
+    def withdrawal(self, status):
+        return Withdrawal.objects.create(
+            user=self.user, points=500, amount=5, payment_method='bank', payment_details='123', status=status
+        )
+
+    def test_approve_and_pay_withdrawals(self):
+        pending, paid = self.withdrawal('pending'), self.withdrawal('paid')
+        response = self.act('withdrawal', 'approve_withdrawals', [pending, paid])
+        self.assertContains(response, 'Approved 1 withdrawals')
+        response = self.act('withdrawal', 'mark_as_paid', [pending, paid])
+        self.assertContains(response, 'Marked 1 withdrawals as paid')
+
+        pending.refresh_from_db()
+        paid.refresh_from_db()
+        self.assertEqual((pending.status, paid.status), ('paid', 'paid'))
+        self.assertEqual(OutboundMessage.objects.filter(telegram_id=PLAYER_ID).count(), 2)
+
+    def test_reject_deposits(self):
+        pending = Deposit.objects.create(user=self.user, amount=1, points=100)
+        approved = Deposit.objects.create(user=self.user, amount=1, points=100, status='approved')
+        response = self.act('deposit', 'reject_deposits', [pending, approved])
+        self.assertContains(response, 'Rejected 1 deposits')
+
+        approved.refresh_from_db()
+        self.assertEqual(approved.status, 'approved')
+        self.assertEqual(OutboundMessage.objects.get(telegram_id=PLAYER_ID).text, DEPOSIT_REJECTED.format(points='100.00'))
@@ -14,9 +14,13 @@ urlpatterns = [
     path('admin/check/<int:telegram_id>/', views.check_admin, name='check-admin'),
     path('admin/users/', views.admin_get_users, name='admin-users'),
     path('admin/add-points/', views.admin_add_points, name='admin-add-points'),
+    path('admin/adjust-balances/', views.admin_adjust_balances, name='admin-adjust-balances'),
     path('admin/ban-user/', views.admin_ban_user, name='admin-ban-user'),
     path('admin/deposits/', views.admin_get_deposits, name='admin-deposits'),
     path('admin/approve-deposit/', views.admin_approve_deposit, name='admin-approve-deposit'),
     path('admin/withdrawals/', views.admin_get_withdrawals, name='admin-withdrawals'),
     path('admin/process-withdrawal/', views.admin_process_withdrawal, name='admin-process-withdrawal'),
+    path('admin/stats/', views.admin_game_stats, name='admin-game-stats'),
+    path('admin/cache-stats/', views.admin_cache_stats, name='admin-cache-stats'),
+    path('admin/broadcast/', views.admin_broadcast, name='admin-broadcast'),
 ]
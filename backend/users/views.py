@@ -1,44 +1,101 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework import serializers, status
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Sum
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.conf import settings
+from config.pagination import InvalidCursor, keyset_page, parse_limit, parse_date_filters, estimated_count
+from games.models import DailyGameStats
 from .models import User, Deposit, Withdrawal
-from .serializers import UserSerializer, DepositSerializer, WithdrawalSerializer
+from .balances import (
+    InsufficientBalance, PendingWithdrawalLimit, adjust_balances, adjust_balances_where,
+    advance_requests, approve_deposits, create_withdrawal, reject_withdrawals, parse_points,
+)
+from .events import publish_request
+from .idempotency import idempotent
+from .outbox import MAX_TEXT_LENGTH, WITHDRAWAL_APPROVED, WITHDRAWAL_PAID, queue_broadcast
+from .permissions import admin_required, admin_session_required, admin_name, is_admin_telegram_id
+from .players import player_required, set_banned
+from .snapshots import cache_stats, get_snapshot, reset_cache_stats
+from .webapp_auth import LAST_LOGIN_INTERVAL, InvalidInitData, issue_session_token, validate_init_data
+from .serializers import (
+    UserSerializer, DepositSerializer, WithdrawalSerializer,
+    AdminDepositSerializer, AdminWithdrawalSerializer,
+)
+
+ADMIN_USER_FIELDS = UserSerializer.Meta.fields
+ADMIN_DEPOSIT_FIELDS = [f for f in AdminDepositSerializer.Meta.fields if f not in ('user', 'telegram_id')]
+ADMIN_WITHDRAWAL_FIELDS = [f for f in AdminWithdrawalSerializer.Meta.fields if f not in ('user', 'telegram_id')]
+
+STATS_DEFAULT_DAYS = 30
+STATS_MAX_DAYS = 366
+STATS_TOTALS = ('rounds', 'wins', 'wagered', 'paid_out', 'players')
+
+
+def admin_page(request, queryset, serializer_class):
+    """Keyset page of an admin listing with its (possibly estimated) total"""
+    try:
+        queryset = queryset.filter(**parse_date_filters(request.GET))
+        limit = parse_limit(request.GET.get('limit'))
+        page, next_before = keyset_page(queryset, request.GET.get('before'), limit)
+    except InvalidCursor as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    count, count_is_estimate = estimated_count(queryset)
+    return Response({
+        'count': count,
+        'count_is_estimate': count_is_estimate,
+        'results': serializer_class(page, many=True).data,
+        'next_before': next_before
+    })
 
 @api_view(['POST'])
 def telegram_auth(request):
-    """Authenticate user via Telegram"""
-    telegram_id = request.data.get('telegram_id')
-    username = request.data.get('username')
-    first_name = request.data.get('first_name')
-    last_name = request.data.get('last_name')
+    """Authenticate user via Telegram WebApp ``init_data``; returns a session token"""
+    init_data = request.data.get('init_data')
+    if init_data:
+        try:
+            profile = validate_init_data(init_data, settings.TELEGRAM_BOT_TOKEN)
+        except InvalidInitData as e:
+            return Response({'error': str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+    elif settings.DEBUG:
+        # Local development outside Telegram: the client's word is taken for who it is
+        profile = {field: request.data.get(field) for field in ('username', 'first_name', 'last_name')}
+        profile['id'] = request.data.get('telegram_id')
+    else:
+        return Response({'error': 'init_data is required'}, status=status.HTTP_400_BAD_REQUEST)
     
+    telegram_id = profile.get('id')
     if not telegram_id:
         return Response({'error': 'telegram_id is required'}, status=status.HTTP_400_BAD_REQUEST)
     
-    user, created = User.objects.get_or_create(
-        telegram_id=telegram_id,
-        defaults={
-            'username': username,
-            'first_name': first_name,
-            'last_name': last_name,
-        }
-    )
+    now = timezone.now()
+    values = {
+        'username': profile.get('username'),
+        'first_name': profile.get('first_name'),
+        'last_name': profile.get('last_name'),
+        # Check if user is admin
+        'is_admin': is_admin_telegram_id(telegram_id),
+        'last_login': now,
+    }
+    user, created = User.objects.get_or_create(telegram_id=telegram_id, defaults=values)
     
     if not created:
-        # Update user info
-        user.username = username
-        user.first_name = first_name
-        user.last_name = last_name
-    
-    # Check if user is admin
-    is_admin = telegram_id in settings.ADMIN_TELEGRAM_IDS
-    if is_admin and not user.is_admin:
-        user.is_admin = True
-    
-    user.last_login = timezone.now()
-    user.save()
+        # Write only what changed, and last_login once per LAST_LOGIN_INTERVAL rather than on every app open
+        changed = [
+            field for field in ('username', 'first_name', 'last_name') if getattr(user, field) != values[field]
+        ]
+        if values['is_admin'] and not user.is_admin:
+            changed.append('is_admin')
+        if user.last_login is None or now - user.last_login >= LAST_LOGIN_INTERVAL:
+            changed.append('last_login')
+        if changed:
+            for field in changed:
+                setattr(user, field, values[field])
+            user.save(update_fields=[*changed, 'updated_at'])
     
     if user.is_banned:
         return Response({'error': 'Your account has been banned'}, status=status.HTTP_403_FORBIDDEN)
@@ -47,53 +104,59 @@ def telegram_auth(request):
     return Response({
         'user': serializer.data,
         'is_admin': user.is_admin,
+        'token': issue_session_token(user),
         'message': 'Welcome!' if created else 'Welcome back!'
     })
 
 @api_view(['GET'])
+@player_required
 def user_balance(request, telegram_id):
     """Get user balance"""
-    try:
-        user = User.objects.get(telegram_id=telegram_id)
-        return Response({'balance': float(user.balance)})
-    except User.DoesNotExist:
+    snapshot = get_snapshot(request.player.telegram_id)
+    if snapshot is None:
         return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({'balance': float(snapshot['balance'])})
 
 @api_view(['GET'])
+@player_required
 def user_stats(request, telegram_id):
     """Get user statistics"""
-    try:
-        user = User.objects.get(telegram_id=telegram_id)
-        return Response({
-            'balance': float(user.balance),
-            'total_wagered': float(user.total_wagered),
-            'total_won': float(user.total_won),
-            'total_lost': float(user.total_lost),
-            'games_played': user.games_played,
-            'profit': float(user.total_won - user.total_lost)
-        })
-    except User.DoesNotExist:
+    snapshot = get_snapshot(request.player.telegram_id)
+    if snapshot is None:
         return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    games_played = snapshot['games_played']
+    return Response({
+        'balance': float(snapshot['balance']),
+        'total_wagered': float(snapshot['total_wagered']),
+        'total_won': float(snapshot['total_won']),
+        'total_lost': float(snapshot['total_lost']),
+        'games_played': games_played,
+        'games_won': snapshot['games_won'],
+        'win_rate': snapshot['games_won'] / games_played * 100 if games_played else 0,
+        'profit': float(snapshot['total_won'] - snapshot['total_lost']),
+        'by_game': snapshot['by_game']
+    })
 
 @api_view(['POST'])
+@player_required
+@idempotent('deposit')
 def request_deposit(request):
     """Request a deposit"""
-    telegram_id = request.data.get('telegram_id')
-    amount = request.data.get('amount')
-    points = request.data.get('points')
+    amount = parse_points(request.data.get('amount'))
+    points = parse_points(request.data.get('points'))
     payment_proof = request.data.get('payment_proof', '')
     
-    try:
-        user = User.objects.get(telegram_id=telegram_id)
-    except User.DoesNotExist:
-        return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+    if amount is None or points is None or amount <= 0 or points <= 0:
+        return Response({'error': 'amount and points must be positive numbers'}, status=status.HTTP_400_BAD_REQUEST)
     
     deposit = Deposit.objects.create(
-        user=user,
+        user_id=request.player.id,
         amount=amount,
         points=points,
         payment_proof=payment_proof
     )
+    publish_request('deposit', deposit, request.player.telegram_id)
     
     serializer = DepositSerializer(deposit)
     return Response({
@@ -102,28 +165,26 @@ def request_deposit(request):
     }, status=status.HTTP_201_CREATED)
 
 @api_view(['GET'])
+@player_required
 def user_deposits(request, telegram_id):
     """Get user deposit history"""
-    try:
-        user = User.objects.get(telegram_id=telegram_id)
-        deposits = user.deposits.all()[:20]
-        serializer = DepositSerializer(deposits, many=True)
-        return Response(serializer.data)
-    except User.DoesNotExist:
-        return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+    deposits = Deposit.objects.filter(user_id=request.player.id)[:20]
+    serializer = DepositSerializer(deposits, many=True)
+    return Response(serializer.data)
 
 @api_view(['POST'])
+@player_required
+@idempotent('withdrawal')
 def request_withdrawal(request):
     """Request a withdrawal"""
-    telegram_id = request.data.get('telegram_id')
-    points = float(request.data.get('points', 0))
+    points = parse_points(request.data.get('points', 0))
     payment_method = request.data.get('payment_method')
     payment_details = request.data.get('payment_details')
     
-    try:
-        user = User.objects.get(telegram_id=telegram_id)
-    except User.DoesNotExist:
-        return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+    if points is None:
+        return Response({'error': 'points must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+    if not payment_method or not payment_details:
+        return Response({'error': 'payment_method and payment_details are required'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Validate minimum withdrawal
     if points < settings.MINIMUM_WITHDRAWAL:
@@ -131,24 +192,15 @@ def request_withdrawal(request):
             'error': f'Minimum withdrawal is {settings.MINIMUM_WITHDRAWAL} points'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Check balance
-    if user.balance < points:
+    # Balance and pending-request cap are checked under the user's row lock
+    try:
+        withdrawal = create_withdrawal(request.player.id, points, payment_method, payment_details)
+    except InsufficientBalance:
         return Response({'error': 'Insufficient balance'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    # Deduct points from balance
-    user.balance -= points
-    user.save()
-    
-    # Calculate amount in Birr (1 point = 1 Birr)
-    amount = points
-    
-    withdrawal = Withdrawal.objects.create(
-        user=user,
-        points=points,
-        amount=amount,
-        payment_method=payment_method,
-        payment_details=payment_details
-    )
+    except PendingWithdrawalLimit:
+        return Response({
+            'error': f'You already have {settings.MAX_PENDING_WITHDRAWALS} pending withdrawals'
+        }, status=status.HTTP_400_BAD_REQUEST)
     
     serializer = WithdrawalSerializer(withdrawal)
     return Response({
@@ -157,197 +209,284 @@ def request_withdrawal(request):
     }, status=status.HTTP_201_CREATED)
 
 @api_view(['GET'])
+@player_required
 def user_withdrawals(request, telegram_id):
     """Get user withdrawal history"""
-    try:
-        user = User.objects.get(telegram_id=telegram_id)
-        withdrawals = user.withdrawals.all()[:20]
-        serializer = WithdrawalSerializer(withdrawals, many=True)
-        return Response(serializer.data)
-    except User.DoesNotExist:
-        return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+    withdrawals = Withdrawal.objects.filter(user_id=request.player.id)[:20]
+    serializer = WithdrawalSerializer(withdrawals, many=True)
+    return Response(serializer.data)
 
 
 @api_view(['GET'])
 def check_admin(request, telegram_id):
     """Check if user is admin"""
-    try:
-        user = User.objects.get(telegram_id=telegram_id)
-        return Response({
-            'is_admin': user.is_admin,
-            'telegram_id': telegram_id
-        })
-    except User.DoesNotExist:
-        return Response({'is_admin': False}, status=status.HTTP_404_NOT_FOUND)
+    return Response({
+        'is_admin': is_admin_telegram_id(telegram_id),
+        'telegram_id': telegram_id
+    })
+
+def filter_users(users, params):
+    """Apply the admin user filters ``q`` (telegram_id or username prefix) and ``banned``"""
+    search = str(params.get('q') or '').strip().lstrip('@')
+    if search.isdigit():
+        users = users.filter(telegram_id=int(search))
+    elif search:
+        users = users.filter(username__istartswith=search)
+    
+    banned = str(params.get('banned')).lower()
+    if banned in ('true', 'false'):
+        users = users.filter(is_banned=banned == 'true')
+    return users
 
 @api_view(['GET'])
+@admin_required
 def admin_get_users(request):
-    """Get all users (admin only)"""
-    telegram_id = request.GET.get('admin_id')
-    
-    try:
-        admin = User.objects.get(telegram_id=telegram_id)
-        if not admin.is_admin:
-            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
-    except User.DoesNotExist:
-        return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
-    
-    users = User.objects.all().order_by('-created_at')
-    serializer = UserSerializer(users, many=True)
-    return Response(serializer.data)
+    """List users, newest first (admin only); filters: q, banned, from, to"""
+    users = filter_users(User.objects.only(*ADMIN_USER_FIELDS), request.GET)
+    return admin_page(request, users, UserSerializer)
 
 @api_view(['POST'])
+@admin_session_required
 def admin_add_points(request):
     """Add points to user (admin only)"""
-    admin_id = request.data.get('admin_id')
     user_id = request.data.get('user_id')
-    points = request.data.get('points', 0)
+    points = parse_points(request.data.get('points', 0))
+    if points is None:
+        return Response({'error': 'points must be a number'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        admin = User.objects.get(telegram_id=admin_id)
-        if not admin.is_admin:
-            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
-    except User.DoesNotExist:
-        return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+        user = User.objects.only('id', 'username').get(id=user_id)
+    except (User.DoesNotExist, ValueError, TypeError):
+        return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    adjust_balances({user.pk: points}, f'admin:{admin_name(request.admin_id)}')
+    user.refresh_from_db(fields=['balance'])
+    return Response({'message': f'Added {points} points to {user.username}', 'new_balance': float(user.balance)})
+
+@api_view(['POST'])
+@admin_session_required
+def admin_adjust_balances(request):
+    """Add points to many users at once, never below zero (admin only).
+
+    Send ``adjustments`` as ``[{"user_id", "delta"}]``, or an ``amount`` with a
+    ``filter`` of q, banned, from, to as in the user listing (``{}`` for all users).
+    """
+    reference = f'admin:{admin_name(request.admin_id)}'
+    adjustments = request.data.get('adjustments')
+    
+    if adjustments is not None:
+        if not isinstance(adjustments, list):
+            return Response({'error': 'adjustments must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+        deltas = {}
+        for item in adjustments:
+            delta = parse_points(item.get('delta')) if isinstance(item, dict) else None
+            user_id = item.get('user_id') if isinstance(item, dict) else None
+            if delta is None or not isinstance(user_id, int):
+                return Response({'error': 'Each adjustment needs an integer user_id and a numeric delta'}, status=status.HTTP_400_BAD_REQUEST)
+            deltas[user_id] = deltas.get(user_id, 0) + delta
+        
+        adjusted = adjust_balances(deltas, reference)
+        return Response({'adjusted': adjusted, 'not_found': len(deltas) - adjusted})
+    
+    amount = parse_points(request.data.get('amount'))
+    user_filter = request.data.get('filter')
+    if amount is None or not isinstance(user_filter, dict):
+        return Response({'error': 'Send adjustments, or an amount with a filter ({} for all users)'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        user = User.objects.get(id=user_id)
-        user.balance += points
-        user.save()
-        return Response({'message': f'Added {points} points to {user.username}', 'new_balance': float(user.balance)})
-    except User.DoesNotExist:
-        return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+        users = filter_users(User.objects.all(), user_filter).filter(**parse_date_filters(user_filter))
+    except InvalidCursor as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({'adjusted': adjust_balances_where(users, amount, reference)})
 
 @api_view(['POST'])
+@admin_session_required
 def admin_ban_user(request):
     """Ban/unban user (admin only)"""
-    admin_id = request.data.get('admin_id')
-    user_id = request.data.get('user_id')
-    ban = request.data.get('ban', True)
-    
     try:
-        admin = User.objects.get(telegram_id=admin_id)
-        if not admin.is_admin:
-            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
-    except User.DoesNotExist:
-        return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+        ban = serializers.BooleanField().to_internal_value(request.data.get('ban', True))
+    except serializers.ValidationError:
+        return Response({'error': 'ban must be true or false'}, status=status.HTTP_400_BAD_REQUEST)
     
+    # Only the ban flags are written, so balance changes made meanwhile are kept
     try:
-        user = User.objects.get(id=user_id)
-        user.is_banned = ban
-        user.is_active = not ban
-        user.save()
-        return Response({'message': f'User {"banned" if ban else "unbanned"}'})
-    except User.DoesNotExist:
+        updated = set_banned(User.objects.filter(id=request.data.get('user_id')), ban)
+    except (ValueError, TypeError):
+        updated = 0
+    if not updated:
         return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({'message': f'User {"banned" if ban else "unbanned"}'})
 
 @api_view(['GET'])
+@admin_required
 def admin_get_deposits(request):
-    """Get all deposits (admin only)"""
-    admin_id = request.GET.get('admin_id')
-    
-    try:
-        admin = User.objects.get(telegram_id=admin_id)
-        if not admin.is_admin:
-            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
-    except User.DoesNotExist:
-        return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+    """List deposits, newest first (admin only); filters: status, from, to"""
+    deposits = Deposit.objects.select_related('user').only(
+        *ADMIN_DEPOSIT_FIELDS, 'user__username', 'user__telegram_id'
+    )
+    if request.GET.get('status'):
+        deposits = deposits.filter(status=request.GET['status'])
     
-    deposits = Deposit.objects.all().order_by('-created_at')
-    serializer = DepositSerializer(deposits, many=True)
-    return Response(serializer.data)
+    return admin_page(request, deposits, AdminDepositSerializer)
 
 @api_view(['POST'])
+@admin_session_required
 def admin_approve_deposit(request):
-    """Approve deposit (admin only)"""
-    admin_id = request.data.get('admin_id')
-    deposit_id = request.data.get('deposit_id')
+    """Approve deposits and add their points (admin only); send deposit_id, or deposit_ids for many"""
+    processed_by = admin_name(request.admin_id)
+    deposit_ids = request.data.get('deposit_ids')
     
-    try:
-        admin = User.objects.get(telegram_id=admin_id)
-        if not admin.is_admin:
-            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
-    except User.DoesNotExist:
-        return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+    if deposit_ids is not None:
+        if not isinstance(deposit_ids, list) or not all(isinstance(pk, int) for pk in deposit_ids):
+            return Response({'error': 'deposit_ids must be a list of integers'}, status=status.HTTP_400_BAD_REQUEST)
+        processed, skipped = approve_deposits(Deposit.objects.filter(id__in=deposit_ids), processed_by)
+        return Response({
+            'processed': processed,
+            'skipped': skipped,
+            'not_found': len(set(deposit_ids)) - processed - skipped
+        })
     
     try:
-        deposit = Deposit.objects.get(id=deposit_id)
-        if deposit.status != 'pending':
-            return Response({'error': 'Deposit already processed'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        deposit.status = 'approved'
-        deposit.processed_at = timezone.now()
-        deposit.processed_by = admin.username
-        deposit.save()
-        
-        # Add points to user
-        deposit.user.balance += deposit.points
-        deposit.user.save()
-        
+        processed, skipped = approve_deposits(Deposit.objects.filter(id=request.data.get('deposit_id')), processed_by)
+    except (ValueError, TypeError):
+        processed = skipped = 0
+    if processed:
         return Response({'message': 'Deposit approved and points added'})
-    except Deposit.DoesNotExist:
-        return Response({'error': 'Deposit not found'}, status=status.HTTP_404_NOT_FOUND)
+    if skipped:
+        return Response({'error': 'Deposit already processed'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'error': 'Deposit not found'}, status=status.HTTP_404_NOT_FOUND)
 
 @api_view(['GET'])
+@admin_required
 def admin_get_withdrawals(request):
-    """Get all withdrawals (admin only)"""
-    admin_id = request.GET.get('admin_id')
-    
-    try:
-        admin = User.objects.get(telegram_id=admin_id)
-        if not admin.is_admin:
-            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
-    except User.DoesNotExist:
-        return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+    """List withdrawals, newest first (admin only); filters: status, from, to"""
+    withdrawals = Withdrawal.objects.select_related('user').only(
+        *ADMIN_WITHDRAWAL_FIELDS, 'user__username', 'user__telegram_id'
+    )
+    if request.GET.get('status'):
+        withdrawals = withdrawals.filter(status=request.GET['status'])
     
-    withdrawals = Withdrawal.objects.all().order_by('-created_at')
-    serializer = WithdrawalSerializer(withdrawals, many=True)
-    return Response(serializer.data)
+    return admin_page(request, withdrawals, AdminWithdrawalSerializer)
+
 
 @api_view(['POST'])
+@admin_session_required
 def admin_process_withdrawal(request):
     """Approve/reject/mark as paid withdrawal (admin only)"""
-    admin_id = request.data.get('admin_id')
     withdrawal_id = request.data.get('withdrawal_id')
     action = request.data.get('action')  # 'approve', 'reject', 'paid'
     
     try:
-        admin = User.objects.get(telegram_id=admin_id)
-        if not admin.is_admin:
-            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
-    except User.DoesNotExist:
-        return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
-    
-    try:
-        withdrawal = Withdrawal.objects.get(id=withdrawal_id)
+        withdrawal = Withdrawal.objects.only('id').get(id=withdrawal_id)
+        withdrawals = Withdrawal.objects.filter(pk=withdrawal.pk)
         
         if action == 'approve':
-            withdrawal.status = 'approved'
-            withdrawal.processed_at = timezone.now()
-            withdrawal.processed_by = admin.username
-            withdrawal.save()
-            return Response({'message': 'Withdrawal approved'})
+            if advance_requests(
+                withdrawals, 'pending', 'approved', WITHDRAWAL_APPROVED, processed_by=admin_name(request.admin_id)
+            ):
+                return Response({'message': 'Withdrawal approved'})
+            return Response({'error': 'Can only approve pending withdrawals'}, status=status.HTTP_409_CONFLICT)
         
         elif action == 'reject':
-            if withdrawal.status == 'pending':
-                withdrawal.status = 'rejected'
-                withdrawal.processed_at = timezone.now()
-                withdrawal.processed_by = admin.username
-                withdrawal.save()
-                
-                # Refund points
-                withdrawal.user.balance += withdrawal.points
-                withdrawal.user.save()
-                
+            processed, _ = reject_withdrawals(withdrawals, admin_name(request.admin_id))
+            if processed:
                 return Response({'message': 'Withdrawal rejected and points refunded'})
-            return Response({'error': 'Can only reject pending withdrawals'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'error': 'Can only reject pending withdrawals'}, status=status.HTTP_409_CONFLICT)
         
         elif action == 'paid':
-            withdrawal.status = 'paid'
-            withdrawal.processed_at = timezone.now()
-            withdrawal.save()
-            return Response({'message': 'Marked as paid'})
+            if advance_requests(withdrawals, 'approved', 'paid', WITHDRAWAL_PAID):
+                return Response({'message': 'Marked as paid'})
+            return Response({'error': 'Can only mark approved withdrawals as paid'}, status=status.HTTP_409_CONFLICT)
         
         return Response({'error': 'Invalid action'}, status=status.HTTP_400_BAD_REQUEST)
     except Withdrawal.DoesNotExist:
         return Response({'error': 'Withdrawal not found'}, status=status.HTTP_404_NOT_FOUND)
+
+def stats_figures(row):
+    """JSON-ready rollup totals with the house's profit and edge"""
+    wagered = row['wagered'] or 0
+    paid_out = row['paid_out'] or 0
+    return {
+        'rounds': row['rounds'] or 0,
+        'wins': row['wins'] or 0,
+        'wagered': float(wagered),
+        'paid_out': float(paid_out),
+        'house_profit': float(wagered - paid_out),
+        'house_edge': float((wagered - paid_out) / wagered) if wagered else None
+    }
+
+@api_view(['GET'])
+@admin_required
+def admin_game_stats(request):
+    """Daily volume, house edge and players per game (admin only); filters: from, to, game_type, telegram_id"""
+    today = timezone.localdate()
+    try:
+        end = parse_date(request.GET['to']) if request.GET.get('to') else today + timedelta(days=1)
+        start = parse_date(request.GET['from']) if request.GET.get('from') else end - timedelta(days=STATS_DEFAULT_DAYS)
+    except ValueError:
+        start = end = None
+    if start is None or end is None:
+        return Response({'error': 'from and to must be ISO dates'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 0 < (end - start).days <= STATS_MAX_DAYS:
+        return Response({'error': f'from must be before to and at most {STATS_MAX_DAYS} days apart'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    rows = DailyGameStats.objects.filter(date__gte=start, date__lt=end)
+    if request.GET.get('game_type'):
+        rows = rows.filter(game_type=request.GET['game_type'])
+    if request.GET.get('telegram_id'):
+        try:
+            telegram_id = int(request.GET['telegram_id'])
+        except ValueError:
+            return Response({'error': 'telegram_id must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        rows = rows.filter(user__telegram_id=telegram_id)
+    else:
+        rows = rows.filter(user__isnull=True)
+    
+    # Bounded by days x games x buckets, however much history there is
+    days = list(
+        rows.values('date', 'game_type')
+        .annotate(**{field: Sum(field) for field in STATS_TOTALS})
+        .order_by('-date', 'game_type')
+    )
+    
+    by_game = {}
+    for day in days:
+        game = by_game.setdefault(day['game_type'], dict.fromkeys(STATS_TOTALS, 0))
+        for field in STATS_TOTALS:
+            game[field] += day[field]
+    totals = {field: sum(game[field] for game in by_game.values()) for field in STATS_TOTALS}
+    
+    return Response({
+        'from': start,
+        'to': end,
+        'totals': stats_figures(totals),
+        'by_game': {game_type: stats_figures(game) for game_type, game in by_game.items()},
+        'days': [
+            {'date': day['date'], 'game_type': day['game_type'], 'players': day['players'], **stats_figures(day)}
+            for day in days
+        ]
+    })
+
+@api_view(['GET', 'DELETE'])
+@admin_session_required
+def admin_cache_stats(request):
+    """Hit ratio of the balance/stats snapshot cache; DELETE resets the counters"""
+    if request.method == 'DELETE':
+        reset_cache_stats()
+    return Response(cache_stats())
+
+@api_view(['POST'])
+@admin_session_required
+def admin_broadcast(request):
+    """Queue a Telegram message to every active, unbanned user (admin only); the bot sends them"""
+    text = request.data.get('text')
+    if not isinstance(text, str) or not text.strip():
+        return Response({'error': 'text is required'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(text) > MAX_TEXT_LENGTH:
+        return Response(
+            {'error': f'text must be at most {MAX_TEXT_LENGTH} characters'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    return Response({'queued': queue_broadcast(text)})
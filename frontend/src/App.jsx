@@ -9,7 +9,7 @@ import Cards from './pages/Cards'
 import Transactions from './pages/Transactions'
 import Statistics from './pages/Statistics'
 import AdminDashboard from './pages/AdminDashboard'
-import { authenticateUser, getUserBalance, getGameStatus } from './api'
+import { authenticateUser, getUserBalance, getGameStatus, subscribeUserEvents } from './api'
 import { ToastContainer } from './components/Toast'
 import { useToast } from './hooks/useToast'
 
@@ -28,6 +28,16 @@ export default function App() {
     initApp()
   }, [])
 
+  // Balance pushed by the backend after rounds, deposits and withdrawals
+  useEffect(() => {
+    if (!telegramId) return
+    return subscribeUserEvents(telegramId, (event) => {
+      if (event.balance !== undefined) {
+        setBalance(Number(event.balance))
+      }
+    })
+  }, [telegramId])
+
   const initApp = async () => {
     if (tg) {
       tg.ready()
@@ -36,7 +46,7 @@ export default function App() {
       
       if (telegramUser?.id) {
         // Authenticate with backend
-      const authData = await authenticateUser(telegramUser)
+      const authData = await authenticateUser(telegramUser, tg.initData)
       if (authData?.error) {
         toast.error(authData.error)
         setLoading(false)
@@ -87,6 +97,10 @@ export default function App() {
     setBalance(newBalance)
   }
 
+  const refreshGameStatuses = async () => {
+    setGameStatuses(await getGameStatus())
+  }
+
   const updateBalance = (newBalance) => {
     setBalance(newBalance)
   }
@@ -115,7 +129,7 @@ export default function App() {
         </div>
         
         <Routes>
-          <Route path="/" element={<Lobby balance={balance} gameStatuses={gameStatuses} />} />
+          <Route path="/" element={<Lobby balance={balance} gameStatuses={gameStatuses} refreshGameStatuses={refreshGameStatuses} />} />
           <Route path="/plinko" element={<Plinko telegramId={telegramId} updateBalance={updateBalance} toast={toast} gameStatuses={gameStatuses} />} />
           <Route path="/mining" element={<Mining telegramId={telegramId} updateBalance={updateBalance} toast={toast} gameStatuses={gameStatuses} />} />
           <Route path="/slots" element={<Slots telegramId={telegramId} updateBalance={updateBalance} toast={toast} gameStatuses={gameStatuses} />} />
@@ -123,7 +137,7 @@ export default function App() {
           <Route path="/cards" element={<Cards telegramId={telegramId} updateBalance={updateBalance} toast={toast} gameStatuses={gameStatuses} />} />
           <Route path="/transactions" element={<Transactions telegramId={telegramId} balance={balance} updateBalance={updateBalance} toast={toast} />} />
           <Route path="/statistics" element={<Statistics telegramId={telegramId} toast={toast} />} />
-          <Route path="/admin" element={<AdminDashboard telegramId={telegramId} isAdmin={isAdmin} toast={toast} />} />
+          <Route path="/admin" element={<AdminDashboard isAdmin={isAdmin} toast={toast} />} />
         </Routes>
       </div>
     </>
@@ -1,12 +1,46 @@
 const API_BASE = import.meta.env.VITE_API_URL || 'http://localhost:8000'
 
-export async function authenticateUser(telegramUser) {
+const RETRY_DELAYS_MS = [300, 1000, 3000]
+
+// Session token from authenticateUser, sent with every player request
+let sessionToken = null
+
+function authHeaders(headers = {}) {
+  return sessionToken ? { ...headers, Authorization: `Bearer ${sessionToken}` } : headers
+}
+
+// POST that is safe to retry: every attempt carries the same Idempotency-Key,
+// so the backend applies it once and replays its response to the retries
+async function postIdempotent(path, body) {
+  const key = crypto.randomUUID()
+  for (let attempt = 0; ; attempt++) {
+    try {
+      const res = await fetch(`${API_BASE}${path}`, {
+        method: 'POST',
+        headers: authHeaders({ 'Content-Type': 'application/json', 'Idempotency-Key': key }),
+        body: JSON.stringify(body)
+      })
+      if (res.status < 500 || attempt >= RETRY_DELAYS_MS.length) {
+        return res
+      }
+    } catch (e) {
+      if (attempt >= RETRY_DELAYS_MS.length) {
+        throw e
+      }
+    }
+    await new Promise(resolve => setTimeout(resolve, RETRY_DELAYS_MS[attempt]))
+  }
+}
+
+// initData is the signed string Telegram hands the web app; the backend checks its signature
+export async function authenticateUser(telegramUser, initData) {
   try {
     console.log('Authenticating user:', telegramUser)
     const res = await fetch(`${API_BASE}/api/user/auth/`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify({
+        init_data: initData,
         telegram_id: telegramUser.id,
         username: telegramUser.username,
         first_name: telegramUser.first_name,
@@ -18,6 +52,7 @@ export async function authenticateUser(telegramUser) {
     if (data.error) {
       return { error: data.error }
     }
+    sessionToken = data.token
     return data
   } catch (e) {
     console.error('Auth error:', e)
@@ -27,15 +62,32 @@ export async function authenticateUser(telegramUser) {
 
 export async function playGame(telegramId, gameType, betAmount, gameData = {}) {
   try {
-    const res = await fetch(`${API_BASE}/games/api/play/`, {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({
-        telegram_id: telegramId,
-        game_type: gameType,
-        bet_amount: betAmount,
-        game_data: gameData
-      })
+    const res = await postIdempotent('/games/api/play/', {
+      telegram_id: telegramId,
+      game_type: gameType,
+      bet_amount: betAmount,
+      game_data: gameData
+    })
+    const data = await res.json()
+    if (data.error) {
+      return { error: data.error }
+    }
+    return data
+  } catch (e) {
+    return { error: 'Error playing game. Please try again.' }
+  }
+}
+
+export async function playBatch(telegramId, gameType, betAmount, rounds, gameData = {}, { stopLoss, takeProfit } = {}) {
+  try {
+    const res = await postIdempotent('/games/api/play/batch/', {
+      telegram_id: telegramId,
+      game_type: gameType,
+      bet_amount: betAmount,
+      rounds,
+      game_data: gameData,
+      stop_loss: stopLoss,
+      take_profit: takeProfit
     })
     const data = await res.json()
     if (data.error) {
@@ -49,7 +101,7 @@ export async function playGame(telegramId, gameType, betAmount, gameData = {}) {
 
 export async function getUserBalance(telegramId) {
   try {
-    const res = await fetch(`${API_BASE}/api/user/${telegramId}/balance/`)
+    const res = await fetch(`${API_BASE}/api/user/${telegramId}/balance/`, { headers: authHeaders() })
     const data = await res.json()
     return data.balance || 0
   } catch (e) {
@@ -60,7 +112,7 @@ export async function getUserBalance(telegramId) {
 
 export async function getUserStats(telegramId) {
   try {
-    const res = await fetch(`${API_BASE}/api/user/${telegramId}/stats/`)
+    const res = await fetch(`${API_BASE}/api/user/${telegramId}/stats/`, { headers: authHeaders() })
     return await res.json()
   } catch (e) {
     console.error('Stats error:', e)
@@ -70,15 +122,11 @@ export async function getUserStats(telegramId) {
 
 export async function requestWithdrawal(telegramId, points, paymentMethod, paymentDetails) {
   try {
-    const res = await fetch(`${API_BASE}/api/user/withdrawal/`, {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({
-        telegram_id: telegramId,
-        points,
-        payment_method: paymentMethod,
-        payment_details: paymentDetails
-      })
+    const res = await postIdempotent('/api/user/withdrawal/', {
+      telegram_id: telegramId,
+      points,
+      payment_method: paymentMethod,
+      payment_details: paymentDetails
     })
     const data = await res.json()
     return data
@@ -90,7 +138,7 @@ export async function requestWithdrawal(telegramId, points, paymentMethod, payme
 
 export async function getWithdrawals(telegramId) {
   try {
-    const res = await fetch(`${API_BASE}/api/user/${telegramId}/withdrawals/`)
+    const res = await fetch(`${API_BASE}/api/user/${telegramId}/withdrawals/`, { headers: authHeaders() })
     return await res.json()
   } catch (e) {
     console.error('Withdrawals error:', e)
@@ -100,7 +148,8 @@ export async function getWithdrawals(telegramId) {
 
 export async function getGameStatus() {
   try {
-    const res = await fetch(`${API_BASE}/games/api/status/`)
+    // The browser revalidates its cached copy by ETag, so unchanged statuses cost a bodyless 304
+    const res = await fetch(`${API_BASE}/games/api/status/`, { cache: 'no-cache' })
     return await res.json()
   } catch (e) {
     console.error('Game status error:', e)
@@ -108,13 +157,67 @@ export async function getGameStatus() {
   }
 }
 
+// Admin only: authorized by the signed-in admin's session token
+export async function updateGameConfig(gameType, changes) {
+  try {
+    const res = await fetch(`${API_BASE}/games/api/admin/config/`, {
+      method: 'POST',
+      headers: authHeaders({ 'Content-Type': 'application/json' }),
+      body: JSON.stringify({ game_type: gameType, ...changes })
+    })
+    return await res.json()
+  } catch (e) {
+    return { error: 'Error updating game. Please try again.' }
+  }
+}
 
-export async function getGameHistory(telegramId) {
+export async function getGameHistory(telegramId, before = null, limit = 50) {
   try {
-    const res = await fetch(`${API_BASE}/games/api/history/${telegramId}/`)
+    const params = new URLSearchParams({ limit })
+    if (before) params.set('before', before)
+    const res = await fetch(`${API_BASE}/games/api/history/${telegramId}/?${params}`, { headers: authHeaders() })
     return await res.json()
   } catch (e) {
     console.error('History error:', e)
-    return []
+    return { results: [], next_before: null }
+  }
+}
+
+// Server-pushed events over a WebSocket that reconnects with backoff.
+// Returns a function that closes it for good.
+function subscribe(path, onEvent) {
+  const url = API_BASE.replace(/^http/, 'ws') + path
+  let socket = null
+  let attempt = 0
+  let closed = false
+
+  const open = () => {
+    socket = new WebSocket(url)
+    socket.onopen = () => { attempt = 0 }
+    socket.onmessage = (message) => onEvent(JSON.parse(message.data))
+    socket.onclose = (event) => {
+      // 4403: refused (not an admin), retrying will not help
+      if (closed || event.code === 4403) return
+      const delay = RETRY_DELAYS_MS[Math.min(attempt++, RETRY_DELAYS_MS.length - 1)]
+      setTimeout(open, delay)
+    }
   }
+  open()
+
+  return () => {
+    closed = true
+    socket.close()
+  }
+}
+
+// Balance changes ({type: 'balance'}) and settled rounds ({type: 'rounds'}),
+// for the signed-in user only
+export function subscribeUserEvents(telegramId, onEvent) {
+  return subscribe(`/ws/user/${telegramId}/?token=${encodeURIComponent(sessionToken || '')}`, onEvent)
+}
+
+// New deposit and withdrawal requests ({type: 'deposit' | 'withdrawal'})
+// for a signed-in admin only
+export function subscribeAdminEvents(onEvent) {
+  return subscribe(`/ws/admin/?token=${encodeURIComponent(sessionToken || '')}`, onEvent)
 }
@@ -1,8 +1,9 @@
 import { useState, useEffect } from 'react'
 import { Link } from 'react-router-dom'
 import { motion } from 'framer-motion'
+import { subscribeAdminEvents, getGameStatus, updateGameConfig } from '../api'
 
-export default function AdminDashboard({ telegramId, isAdmin, toast }) {
+export default function AdminDashboard({ isAdmin, toast }) {
   const [activeTab, setActiveTab] = useState('users')
   const [users, setUsers] = useState([])
   const [deposits, setDeposits] = useState([])
@@ -17,6 +18,21 @@ export default function AdminDashboard({ telegramId, isAdmin, toast }) {
     loadData()
   }, [activeTab, isAdmin])
 
+  // New requests show up without a refresh
+  useEffect(() => {
+    if (!isAdmin) {
+      return
+    }
+    return subscribeAdminEvents((event) => {
+      const request = { ...event, user: event.telegram_id, status: 'pending', created_at: new Date(event.created_at) }
+      if (event.type === 'deposit') {
+        setDeposits(current => [request, ...current])
+      } else if (event.type === 'withdrawal') {
+        setWithdrawals(current => [request, ...current])
+      }
+    })
+  }, [isAdmin])
+
   if (!isAdmin) {
     return (
       <div className="text-center py-20">
@@ -100,23 +116,44 @@ export default function AdminDashboard({ telegramId, isAdmin, toast }) {
   )
 }
 
+const CONTROLLED_GAMES = [
+  { game_type: 'plinko', name: 'Plinko', icon: '🎯' },
+  { game_type: 'slots', name: 'Slots', icon: '🎰' },
+  { game_type: 'wheel', name: 'Wheel', icon: '🎡' },
+  { game_type: 'cards', name: 'Find Joker', icon: '🃏' },
+  { game_type: 'mining', name: 'Mines', icon: '⛏️' },
+]
+
 function GameControlTab({ toast }) {
-  const [gameControls, setGameControls] = useState([
-    { game_type: 'plinko', name: 'Plinko', icon: '🎯', is_enabled: true, maintenance_message: 'Plinko is temporarily under maintenance. We are adding new features!' },
-    { game_type: 'slots', name: 'Slots', icon: '🎰', is_enabled: true, maintenance_message: 'Slots is being upgraded. Please check back soon!' },
-    { game_type: 'wheel', name: 'Wheel', icon: '🎡', is_enabled: true, maintenance_message: 'Wheel of Fortune is under maintenance. Thank you for your patience!' },
-    { game_type: 'cards', name: 'Find Joker', icon: '🃏', is_enabled: true, maintenance_message: 'Find Joker is temporarily unavailable. We are fixing some issues!' },
-    { game_type: 'mining', name: 'Mines', icon: '⛏️', is_enabled: true, maintenance_message: 'Mines is under maintenance. Please try again later!' },
-  ])
+  const [gameControls, setGameControls] = useState(
+    CONTROLLED_GAMES.map(g => ({ ...g, is_enabled: true, maintenance_message: '' }))
+  )
   const [editingGame, setEditingGame] = useState(null)
   const [editMessage, setEditMessage] = useState('')
 
-  const toggleGame = (gameType) => {
-    setGameControls(gameControls.map(g => 
-      g.game_type === gameType ? { ...g, is_enabled: !g.is_enabled } : g
+  useEffect(() => {
+    getGameStatus().then(statuses => {
+      setGameControls(controls => controls.map(g => ({ ...g, ...statuses[g.game_type] })))
+    })
+  }, [])
+
+  const saveConfig = async (gameType, changes) => {
+    const data = await updateGameConfig(gameType, changes)
+    if (data.error) {
+      toast.error(data.error)
+      return false
+    }
+    setGameControls(controls => controls.map(g =>
+      g.game_type === gameType ? { ...g, ...data.status } : g
     ))
+    return true
+  }
+
+  const toggleGame = async (gameType) => {
     const game = gameControls.find(g => g.game_type === gameType)
-    toast.success(`${game.name} ${!game.is_enabled ? 'enabled' : 'disabled'}`)
+    if (await saveConfig(gameType, { is_enabled: !game.is_enabled })) {
+      toast.success(`${game.name} ${!game.is_enabled ? 'enabled' : 'disabled'}`)
+    }
   }
 
   const startEditMessage = (game) => {
@@ -124,12 +161,11 @@ function GameControlTab({ toast }) {
     setEditMessage(game.maintenance_message)
   }
 
-  const saveMessage = (gameType) => {
-    setGameControls(gameControls.map(g => 
-      g.game_type === gameType ? { ...g, maintenance_message: editMessage } : g
-    ))
-    setEditingGame(null)
-    toast.success('Maintenance message updated')
+  const saveMessage = async (gameType) => {
+    if (await saveConfig(gameType, { maintenance_message: editMessage })) {
+      setEditingGame(null)
+      toast.success('Maintenance message updated')
+    }
   }
 
   return (
@@ -69,23 +69,9 @@ export default function Cards({ telegramId, updateBalance, toast }) {
     setSelectedCard(position)
     setGamePhase('result')
     
-    // Find where joker actually is now
-    const jokerCurrentPos = cardPositions.indexOf(jokerPosition)
-    const won = position === jokerCurrentPos
-    
-    // Reveal all cards
-    setRevealedCards([0, 1, 2])
-    
-    // Vibrate on result
-    if (navigator.vibrate) {
-      navigator.vibrate(won ? [100, 50, 100] : [200])
-    }
-    
-    // API call
+    // The server decides where the joker ends up
     const res = await playGame(telegramId, 'cards', betAmount, {
-      jokerPosition: jokerCurrentPos,
-      selectedPosition: position,
-      won
+      selected_position: position
     })
     
     if (res?.error) {
@@ -94,13 +80,29 @@ export default function Cards({ telegramId, updateBalance, toast }) {
       return
     }
     
-    if (res) {
-      updateBalance(res.new_balance)
-      setResult({
-        won,
-        amount: Math.abs(res.points_change)
-      })
+    // Move the joker to the drawn position before revealing
+    const jokerCurrentPos = res.game_data.joker_position
+    const positions = [...cardPositions]
+    const from = positions.indexOf(jokerPosition)
+    positions[from] = positions[jokerCurrentPos]
+    positions[jokerCurrentPos] = jokerPosition
+    setCardPositions(positions)
+    
+    const won = res.result === 'win'
+    
+    // Reveal all cards
+    setRevealedCards([0, 1, 2])
+    
+    // Vibrate on result
+    if (navigator.vibrate) {
+      navigator.vibrate(won ? [100, 50, 100] : [200])
     }
+    
+    updateBalance(res.new_balance)
+    setResult({
+      won,
+      amount: Math.abs(res.points_change)
+    })
   }
 
   const getCardAtPosition = (position) => {
@@ -1,3 +1,4 @@
+import { useEffect } from 'react'
 import { useNavigate } from 'react-router-dom'
 
 const games = [
@@ -14,31 +15,41 @@ const menuItems = [
   { path: '/admin', icon: '🛡️', name: 'Admin Panel', desc: 'Manage users, deposits & withdrawals', adminOnly: true, requiresBalance: 0 },
 ]
 
-export default function Lobby({ balance, gameStatuses }) {
+export default function Lobby({ balance, gameStatuses, refreshGameStatuses }) {
   const navigate = useNavigate()
 
+  useEffect(() => {
+    refreshGameStatuses()
+  }, [])
+
   return (
     <div>
       <h2 className="text-2xl font-bold mb-4">Choose a Game</h2>
       
-      {games.map(game => (
-        <div 
-          key={game.path} 
-          className="game-card"
-          onClick={() => navigate(game.path)}
-        >
-          <div className="flex items-center justify-between">
-            <div className="flex-1">
-              <h3 className="text-xl font-semibold mb-2">
-                {game.icon} {game.name}
-              </h3>
-              <p className="text-gray-400 text-sm">
-                {game.desc}
-              </p>
+      {games.map(game => {
+        const status = gameStatuses[game.gameType]
+        const isDisabled = status && !status.is_enabled
+        
+        return (
+          <div 
+            key={game.path} 
+            className={`game-card ${isDisabled ? 'opacity-60' : ''}`}
+            onClick={() => !isDisabled && navigate(game.path)}
+          >
+            <div className="flex items-center justify-between">
+              <div className="flex-1">
+                <h3 className="text-xl font-semibold mb-2">
+                  {game.icon} {game.name}
+                  {isDisabled && <span className="ml-2 text-sm">🔧</span>}
+                </h3>
+                <p className="text-gray-400 text-sm">
+                  {isDisabled ? status.maintenance_message : game.desc}
+                </p>
+              </div>
             </div>
           </div>
-        </div>
-      ))}
+        )
+      })}
 
       <h2 className="text-2xl font-bold mb-4 mt-6">Account</h2>
       
@@ -2,68 +2,48 @@ import { useState } from 'react'
 import { Link } from 'react-router-dom'
 import { playGame } from '../api'
 
+const TILES = 25
+// Share of stakes a round returns on average (MINING_RTP on the server)
+const RTP = 0.97
+
+// What cashing out pays after `revealed` safe picks, as in MiningEngine.MULTIPLIERS
+function cashOutMultiplier(mines, revealed) {
+  let odds = 1
+  for (let i = 0; i < revealed; i++) {
+    odds *= (TILES - i) / (TILES - mines - i)
+  }
+  return Math.floor(RTP * odds * 100 + 1e-9) / 100
+}
+
 export default function Mining({ telegramId, updateBalance, toast }) {
   const [betAmount, setBetAmount] = useState(10)
   const [mineCount, setMineCount] = useState(3)
   const [gameActive, setGameActive] = useState(false)
   const [tiles, setTiles] = useState(Array(25).fill({ revealed: false, isMine: false }))
-  const [mines, setMines] = useState([])
+  const [picks, setPicks] = useState([])
   const [revealed, setRevealed] = useState(0)
   const [multiplier, setMultiplier] = useState(1.0)
   const [result, setResult] = useState(null)
 
   const startGame = () => {
-    const newMines = []
-    while (newMines.length < mineCount) {
-      const pos = Math.floor(Math.random() * 25)
-      if (!newMines.includes(pos)) newMines.push(pos)
-    }
-    
-    setMines(newMines)
     setTiles(Array(25).fill({ revealed: false, isMine: false }))
+    setPicks([])
     setGameActive(true)
     setRevealed(0)
     setMultiplier(1.0)
     setResult(null)
   }
 
-  const revealTile = async (index) => {
-    if (!gameActive || tiles[index].revealed) return
-
-    const newTiles = [...tiles]
-    const isMine = mines.includes(index)
-    newTiles[index] = { revealed: true, isMine }
-    setTiles(newTiles)
+  // Tiles are only picked here; the server lays the mines and settles on cash out
+  const revealTile = (index) => {
+    if (!gameActive || tiles[index].revealed || picks.includes(index)) return
+    if (picks.length >= 25 - mineCount) return
 
-    if (isMine) {
-      mines.forEach(m => {
-        newTiles[m] = { revealed: true, isMine: true }
-      })
-      setTiles([...newTiles])
-      setGameActive(false)
-
-      const res = await playGame(telegramId, 'mining', betAmount, {
-        mines: mineCount,
-        revealed,
-        hit_mine: true
-      })
-
-      if (res?.error) {
-        toast.error(res.error)
-        setGameActive(false)
-        return
-      }
-
-      if (res) {
-        updateBalance(res.new_balance)
-        setResult({ won: false, amount: betAmount })
-      }
-    } else {
-      const newRevealed = revealed + 1
-      setRevealed(newRevealed)
-      const newMult = 1.0 + (newRevealed * 0.2 * (mineCount / 3))
-      setMultiplier(Math.round(newMult * 100) / 100)
-    }
+    const newPicks = [...picks, index]
+    setPicks(newPicks)
+    const newRevealed = newPicks.length
+    setRevealed(newRevealed)
+    setMultiplier(cashOutMultiplier(mineCount, newRevealed))
   }
 
   const cashOut = async () => {
@@ -73,8 +53,7 @@ export default function Mining({ telegramId, updateBalance, toast }) {
 
     const res = await playGame(telegramId, 'mining', betAmount, {
       mines: mineCount,
-      revealed,
-      hit_mine: false
+      picks
     })
 
     if (res?.error) {
@@ -83,10 +62,14 @@ export default function Mining({ telegramId, updateBalance, toast }) {
       return
     }
 
-    if (res) {
-      updateBalance(res.new_balance)
-      setResult({ won: true, amount: res.points_change })
-    }
+    const mines = res.game_data.mines
+    setTiles(tiles.map((tile, i) => (
+      mines.includes(i) || picks.includes(i) ? { revealed: true, isMine: mines.includes(i) } : tile
+    )))
+
+    updateBalance(res.new_balance)
+    const won = res.result === 'win'
+    setResult({ won, amount: Math.abs(res.points_change) })
   }
 
   return (
@@ -145,12 +128,13 @@ export default function Mining({ telegramId, updateBalance, toast }) {
               onClick={() => revealTile(i)}
               className={`
                 aspect-square rounded-lg flex items-center justify-center text-2xl cursor-pointer transition-all
-                ${!tile.revealed ? 'bg-dark-600 hover:bg-dark-800' : ''}
+                ${!tile.revealed && picks.includes(i) ? 'bg-yellow-500' : ''}
+                ${!tile.revealed && !picks.includes(i) ? 'bg-dark-600 hover:bg-dark-800' : ''}
                 ${tile.revealed && tile.isMine ? 'bg-red-500' : ''}
                 ${tile.revealed && !tile.isMine ? 'bg-green-500' : ''}
               `}
             >
-              {tile.revealed ? (tile.isMine ? '💣' : '💎') : '?'}
+              {tile.revealed ? (tile.isMine ? '💣' : '💎') : (picks.includes(i) ? '⛏️' : '?')}
             </div>
           ))}
         </div>
@@ -20,20 +20,27 @@ export default function Plinko({ telegramId, updateBalance, toast }) {
     setDropping(true)
     setResult(null)
     
+    // The server decides the path; the animation replays it
+    const res = await playGame(telegramId, 'plinko', betAmount)
+    
+    if (res?.error) {
+      toast.error(res.error)
+      setDropping(false)
+      return
+    }
+    
     const ballId = ballIdRef.current++
     const path = []
     let position = 6 // Start center
     
     // Calculate path through pegs
-    for (let row = 0; row < ROWS; row++) {
-      const goRight = Math.random() > 0.5
+    res.game_data.path.forEach((goRight, row) => {
       position += goRight ? 0.5 : -0.5
       path.push({ row, position, goRight })
-    }
+    })
     
-    // Final slot (0-12)
-    const finalSlot = Math.round(position + 6)
-    const clampedSlot = Math.max(0, Math.min(12, finalSlot))
+    // Final slot (0-12) is the number of right bounces
+    const clampedSlot = res.game_data.final_slot
     const multiplier = MULTIPLIERS[clampedSlot]
     
     // Add ball with path
@@ -47,31 +54,12 @@ export default function Plinko({ telegramId, updateBalance, toast }) {
       ))
     }
     
-    // Calculate result
-    const won = multiplier >= 1
-    const winAmount = betAmount * multiplier
-    
-    // Call API
-    const res = await playGame(telegramId, 'plinko', betAmount, {
-      final_slot: clampedSlot,
-      multiplier: multiplier,
-      won: won
-    })
-    
-    if (res?.error) {
-      toast.error(res.error)
-      setDropping(false)
-      return
-    }
-    
-    if (res) {
-      updateBalance(res.new_balance)
-    }
+    updateBalance(res.new_balance)
     
     setResult({
-      won,
+      won: res.result === 'win',
       multiplier,
-      amount: won ? winAmount - betAmount : betAmount
+      amount: Math.abs(res.points_change)
     })
     
     // Remove ball after delay
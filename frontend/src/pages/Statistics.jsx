@@ -15,11 +15,11 @@ export default function Statistics({ telegramId, toast }) {
   const loadData = async () => {
     const [statsData, historyData] = await Promise.all([
       getUserStats(telegramId),
-      getGameHistory(telegramId)
+      getGameHistory(telegramId, null, 10)
     ])
     
     setStats(statsData)
-    setHistory(historyData)
+    setHistory(historyData.results || [])
     setLoading(false)
   }
 
@@ -3,6 +3,7 @@ import { Link } from 'react-router-dom'
 import { motion, AnimatePresence } from 'framer-motion'
 import { playGame } from '../api'
 
+// Same order as WheelEngine.SEGMENTS on the server, which decides the outcome
 const SEGMENTS = [
   { multiplier: 0, color: '#1e293b', label: '💀' },
   { multiplier: 1.5, color: '#3b82f6', label: '1.5x' },
@@ -10,16 +11,16 @@ const SEGMENTS = [
   { multiplier: 2, color: '#22c55e', label: '2x' },
   { multiplier: 0, color: '#1e293b', label: '💀' },
   { multiplier: 1.2, color: '#0ea5e9', label: '1.2x' },
+  { multiplier: 0, color: '#1e293b', label: '💀' },
+  { multiplier: 0.5, color: '#6366f1', label: '0.5x' },
   { multiplier: 3, color: '#eab308', label: '3x' },
   { multiplier: 0.5, color: '#6366f1', label: '0.5x' },
-  { multiplier: 5, color: '#f97316', label: '5x' },
-  { multiplier: 1.5, color: '#3b82f6', label: '1.5x' },
   { multiplier: 0, color: '#1e293b', label: '💀' },
-  { multiplier: 10, color: '#ef4444', label: '10x' },
-  { multiplier: 2, color: '#22c55e', label: '2x' },
+  { multiplier: 5, color: '#f97316', label: '🎰 5x' },
+  { multiplier: 0, color: '#1e293b', label: '💀' },
   { multiplier: 0.5, color: '#6366f1', label: '0.5x' },
-  { multiplier: 1.2, color: '#0ea5e9', label: '1.2x' },
-  { multiplier: 50, color: '#ec4899', label: '🎰 50x' },
+  { multiplier: 0.5, color: '#6366f1', label: '0.5x' },
+  { multiplier: 0, color: '#1e293b', label: '💀' },
 ]
 
 export default function Wheel({ telegramId, updateBalance, toast }) {
@@ -36,8 +37,16 @@ export default function Wheel({ telegramId, updateBalance, toast }) {
     setResult(null)
     setShowWin(false)
     
-    // Random segment
-    const winIndex = Math.floor(Math.random() * SEGMENTS.length)
+    // The server picks the segment; the spin lands on it
+    const res = await playGame(telegramId, 'wheel', betAmount)
+    
+    if (res?.error) {
+      toast.error(res.error)
+      setSpinning(false)
+      return
+    }
+    
+    const winIndex = res.game_data.segment
     const segment = SEGMENTS[winIndex]
     
     // Calculate rotation (5-8 full spins + land on segment)
@@ -51,30 +60,14 @@ export default function Wheel({ telegramId, updateBalance, toast }) {
     // Wait for spin to complete
     await new Promise(r => setTimeout(r, 5000))
     
-    const won = segment.multiplier > 0
-    const winAmount = betAmount * segment.multiplier
-    
-    // API call
-    const res = await playGame(telegramId, 'wheel', betAmount, {
-      segment: winIndex,
-      multiplier: segment.multiplier,
-      won
-    })
-    
-    if (res?.error) {
-      toast.error(res.error)
-      setSpinning(false)
-      return
-    }
+    const won = res.result === 'win'
     
-    if (res) {
-      updateBalance(res.new_balance)
-    }
+    updateBalance(res.new_balance)
     
     setResult({
       won,
       multiplier: segment.multiplier,
-      amount: won ? winAmount - betAmount : betAmount,
+      amount: Math.abs(res.points_change),
       label: segment.label
     })
     